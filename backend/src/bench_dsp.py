@@ -0,0 +1,69 @@
+"""
+DSP microbenchmarks: the vectorized engines against the per-sample / nested
+loops they replaced (the loops live in test_calculation_service.py).
+
+    python bench_dsp.py
+"""
+
+import timeit
+
+import numpy as np
+
+from calculation_service import BANDED_DTW_CONFIGS, CalculationService
+from dtw import EXACT, DTWConfig, dtw_distance, lb_keogh_envelope
+from iir_filter import ema_filter
+from test_calculation_service import concentric_slices, noisy_reps, reference_dtw, reference_ema
+
+
+def bench_iir(seconds: float = 30.0):
+    rng = np.random.default_rng(0)
+    print(f"EMA, {seconds:.0f} s x 3 axes")
+    for fs in (50, 200, 1000):
+        x = rng.normal(size=(3, int(fs * seconds)))
+        alpha = np.exp(-2 * np.pi * 0.7 / fs)
+        t_loop = min(timeit.repeat(lambda: [reference_ema(r, alpha) for r in x], number=3, repeat=3)) / 3
+        t_new = min(timeit.repeat(lambda: ema_filter(x, alpha), number=3, repeat=3)) / 3
+        print(f"  {fs:>4} Hz: loop {t_loop * 1e3:8.2f} ms   batched {t_new * 1e3:7.3f} ms   {t_loop / t_new:5.0f}x")
+
+
+def _rate(fn, secs: float = 1.0) -> float:
+    n, t0 = 0, timeit.default_timer()
+    while timeit.default_timer() - t0 < secs:
+        fn()
+        n += 1
+    return n / (timeit.default_timer() - t0)
+
+
+def bench_dtw():
+    ref, reps = noisy_reps(3)
+    a = reps[1]  # same length as the reference (200)
+    far = np.clip(1 - ref, 0, None)
+    upper, lower = lb_keogh_envelope(ref, 20)
+    print("DTW, 200-sample rep vs reference (reps/s)")
+    print(f"  nested loop (before)     {_rate(lambda: reference_dtw(a, ref), 3.0):10.1f}")
+    print(f"  exact wavefront          {_rate(lambda: dtw_distance(a, ref, EXACT)):10.0f}")
+    print(f"  full window, row-vector  {_rate(lambda: dtw_distance(a, ref, DTWConfig(band=None))):10.0f}")
+    for lift, cfg in BANDED_DTW_CONFIGS.items():
+        print(f"  {lift:<8} band {cfg.band!s:<5}     {_rate(lambda: dtw_distance(a, ref, cfg)):10.0f}")
+    abandon = DTWConfig(band=0.1, lower_bound=True, abandon_above=0.15)  # LB_Keogh of `far` is ~0.18
+    print(f"  far curve, LB cut at 0.15{_rate(lambda: dtw_distance(far, ref, abandon, (upper, lower))):10.0f}")
+
+
+def bench_batch_scoring(count: int = 500):
+    service = CalculationService()
+    slices = concentric_slices(count)
+    print(f"Profile scoring, {count} reps (reps/s)")
+    for lift in ("squat", "bench", "deadlift"):
+        t0 = timeit.default_timer()
+        service.score_reps_batch(slices, lift)
+        t1 = timeit.default_timer()
+        for s in slices[:100]:
+            service._compute_rep_from_slice(*s, lift)
+        t2 = timeit.default_timer()
+        print(f"  {lift:<8} one at a time {100 / (t2 - t1):8.0f}   batch {count / (t1 - t0):8.0f}")
+
+
+if __name__ == "__main__":
+    bench_iir()
+    bench_dtw()
+    bench_batch_scoring()
@@ -0,0 +1,93 @@
+"""
+History aggregate benchmark: a synthetic year of workouts (20 athletes,
+3 lifts, 4 sessions a week, 5 sets of 6 reps) written through HistoryStore
+into a temporary SQLite file, then timed one-year `aggregate()` queries.
+Exits non-zero if p95 misses the 50 ms budget.
+
+    python bench_history.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from calculation_service import CalculationService, RepEvent, RepMetrics
+from history_store import HistoryStore, parse_day
+
+P95_BUDGET_MS = 50.0
+LIFTS = (("squat", 100), ("bench", 70), ("deadlift", 130))
+
+
+def build_year(history: HistoryStore, athletes: int = 20, seed: int = 0) -> int:
+    """Write a year of history ending today; returns the number of sets."""
+    calc = CalculationService()
+    rng = random.Random(seed)
+    start = time.time() - 365 * 86400
+    sets = 0
+    for a in range(athletes):
+        for d in range(365):
+            if d % 7 not in (0, 2, 4, 5):
+                continue
+            for exercise, base in LIFTS:
+                for s in range(5):
+                    load = base + d * 0.05 + rng.choice([0, 5, 10])
+                    v0 = 1.4 - 0.008 * load + rng.gauss(0, 0.03)
+                    reps = [RepEvent(id=str(i), valid=True, ts=0,
+                                     metrics=RepMetrics(tut=1.2, speed=max(0.1, v0 * (1 - 0.03 * i)),
+                                                        vl=3 * i, rom_hit=rng.random() < 0.9))
+                            for i in range(6)]
+                    history.record_set(f"athlete:{a}", exercise, calc.calculate_set_summary(reps), reps,
+                                       load_kg=load, program=rng.choice(["strength", "hypertrophy"]),
+                                       ts=start + d * 86400 + s * 180)
+                    sets += 1
+            history.flush()
+    return sets
+
+
+def raw_rep_scan(history: HistoryStore, athlete: str, exercise: str, first: int, last: int):
+    """The per-rep alternative: pull every rep and fit load-velocity in numpy."""
+    rows = history._connect().execute(
+        "SELECT load_kg, speed, day FROM reps WHERE athlete = ? AND exercise = ? AND day BETWEEN ? AND ?"
+        " AND load_kg IS NOT NULL", (athlete, exercise, first, last)).fetchall()
+    data = np.array(rows, dtype=float)
+    steps, inverse = np.unique(np.round(data[:, 0] / 2.5), return_inverse=True)
+    speed = np.bincount(inverse, data[:, 1]) / np.bincount(inverse)
+    return np.polyfit(steps * 2.5, speed, 1)
+
+
+def percentiles(fn, runs: int = 200):
+    latencies = []
+    for i in range(runs):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return np.percentile(latencies, [50, 95])
+
+
+def main(athletes: int = 20) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        history = HistoryStore(os.path.join(tmp, "history.db"))
+        t0 = time.perf_counter()
+        sets = build_year(history, athletes)
+        elapsed = time.perf_counter() - t0
+        print(f"Wrote {sets} sets ({sets * 6} reps) in {elapsed:.1f} s "
+              f"({elapsed / sets * 1e6:.0f} µs per set, summaries included)")
+
+        first = parse_day(time.strftime("%Y-%m-%d", time.localtime(time.time() - 365 * 86400)))
+        last = parse_day(time.strftime("%Y-%m-%d"))
+        p50, p95 = percentiles(lambda i: history.aggregate(f"athlete:{i % athletes}", "squat", None, first, last))
+        print(f"aggregate(), one year of squat:   p50 {p50:5.1f} ms   p95 {p95:5.1f} ms")
+        r50, r95 = percentiles(lambda i: raw_rep_scan(history, f"athlete:{i % athletes}", "squat", first, last))
+        print(f"per-rep scan + numpy fit:         p50 {r50:5.1f} ms   p95 {r95:5.1f} ms")
+
+    ok = p95 < P95_BUDGET_MS
+    print(f"{'✅' if ok else '❌'} p95 {p95:.1f} ms (budget {P95_BUDGET_MS:.0f} ms)")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
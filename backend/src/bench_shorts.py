@@ -0,0 +1,138 @@
+"""
+Outbound HTTP benchmark for shorts discovery: a new httpx client per call
+(the old behaviour) against the shared pooled client from
+`create_http_client()`, both talking to a local stub of the YouTube Data API
+over real sockets.
+
+    python bench_shorts.py
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+
+# ---------------- Stub YouTube ----------------
+
+class _StubYouTube(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    latency = 0.0
+    calls = {"search": 0, "videos": 0}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.rsplit("/", 1)[-1]
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        _StubYouTube.calls[endpoint] = _StubYouTube.calls.get(endpoint, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        if endpoint == "search":
+            items = [{"id": {"videoId": f"{params.get('q', '')}-{i}"}} for i in range(10)]
+        else:
+            items = [{"id": v, "status": {"embeddable": True}, "contentDetails": {"duration": "PT30S"},
+                      "snippet": {"channelId": "UCstub"}} for v in params.get("id", "").split(",")]
+        body = json.dumps({"items": items}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 drops SYNs under a burst
+
+
+def start_stub() -> str:
+    server = _StubServer(("127.0.0.1", 0), _StubYouTube)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+BASE = start_stub()
+os.environ["YOUTUBE_API_BASE"] = BASE  # read by shorts_api at import
+
+from shorts_api import ShortsAPI, create_http_client  # noqa: E402
+from shorts_cache import QuotaTracker  # noqa: E402
+
+
+# ---------------- Benchmarks ----------------
+
+async def _search(client: httpx.AsyncClient):
+    response = await client.get(f"{BASE}/search", params={"q": "gym", "maxResults": 10})
+    response.json()
+
+
+def _ms(samples, p: float) -> float:
+    return sorted(samples)[max(0, int(p * len(samples)) - 1)] * 1000
+
+
+async def bench_clients(n: int = 300):
+    per_call = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            await _search(client)
+        per_call.append(time.perf_counter() - t0)
+
+    shared = []
+    async with create_http_client() as client:
+        await _search(client)  # warm the pool
+        for _ in range(n):
+            t0 = time.perf_counter()
+            await _search(client)
+            shared.append(time.perf_counter() - t0)
+
+    print(f"Sequential search calls ({n})")
+    print(f"  per-call client: p50 {_ms(per_call, .5):6.2f} ms   p95 {_ms(per_call, .95):6.2f} ms")
+    print(f"  shared client:   p50 {_ms(shared, .5):6.2f} ms   p95 {_ms(shared, .95):6.2f} ms")
+
+
+async def bench_concurrency(n: int = 100, latency: float = 0.05):
+    _StubYouTube.latency = latency
+    try:
+        async with create_http_client() as client:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(_search(client) for _ in range(n)))
+            elapsed = time.perf_counter() - t0
+    finally:
+        _StubYouTube.latency = 0.0
+    print(f"{n} concurrent calls at {latency * 1000:.0f} ms upstream: {elapsed * 1000:.0f} ms "
+          f"(pool capped at 20 connections)")
+
+
+async def bench_fetch(n: int = 200):
+    async with create_http_client() as client:
+        api = ShortsAPI(quota=QuotaTracker(daily_limit=10**9), http=client)
+        api.api_key = "bench-key"
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # one log line per fetch
+            for i in range(n):
+                api.cache.clear()
+                await api.fetch_from_youtube(f"q{i % 20}", 10)
+        elapsed = time.perf_counter() - t0
+    print(f"fetch_from_youtube, cache cleared each time: {n / elapsed:6.0f} queries/s "
+          f"({api.index.stats()['batches']} videos.list batches, {api.index.stats()['knownHits']} index hits)")
+
+
+async def main():
+    await bench_clients()
+    await bench_concurrency()
+    await bench_fetch()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
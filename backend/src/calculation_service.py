@@ -1,8 +1,14 @@
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable, Mapping
 from dataclasses import dataclass, field
 from datetime import datetime
 
+from dtw import DTWConfig, EXACT, band_width, dtw_distance, dtw_distance_batch, lb_keogh_envelope
+from iir_filter import ema_filter, highpass_filter
+from rom_baseline_store import RomBaselines
+from coach_rules import CoachEngine, set_features
+
 
 # ---------------- Data classes ----------------
 
@@ -12,6 +18,7 @@ class RepMetrics:
     speed: float
     vl: float
     rom_hit: bool
+    displacement: float = 0.0  # concentric travel (m); 0 = unknown
 
 @dataclass
 class RepEvent:
@@ -29,7 +36,9 @@ class SetSummary:
     avg_speed: float
     vl: float
     rom_hit_rate: float
-    rom_variability: float
+    rom_variability: float  # CV of rep displacement (%)
+    rom_sd: float = 0.0     # SD of rep displacement (cm)
+    rom_mad: float = 0.0    # median absolute deviation of rep displacement (cm)
 
 @dataclass
 class SetEnd:
@@ -37,25 +46,35 @@ class SetEnd:
     tip: str
 
 
+# Rep payload detail levels (see _compute_rep_from_slice)
+DETAIL_METRICS = "metrics"
+DETAIL_SUMMARY = "summary"
+DETAIL_FULL = "full"
+DETAIL_LEVELS = (DETAIL_METRICS, DETAIL_SUMMARY, DETAIL_FULL)
+
+def _check_detail(detail: str):
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"detail must be one of {DETAIL_LEVELS}, got {detail!r}")
+
+
 # ---------------- Signal helpers ----------------
 
-def _ema(x: np.ndarray, alpha: float) -> np.ndarray:
+def _ema(x: np.ndarray, alpha: float, y0: Optional[float] = None) -> np.ndarray:
+    # y0: filter state carried over from a previous chunk (None → seed with x[0])
     if x.size == 0:
         return x
-    y = np.empty_like(x, dtype=float)
-    y[0] = x[0]
-    for i in range(1, x.size):
-        y[i] = alpha * x[i] + (1 - alpha) * y[i - 1]
+    y, _ = ema_filter(x, alpha, y0)
     return y
 
 def _highpass_gravity_estimate(ax: np.ndarray, ay: np.ndarray, az: np.ndarray, fs: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-    # Approximate gravity removal via slow EMA (no orientation provided)
+    # Approximate gravity removal via slow EMA (no orientation provided);
+    # all three axes go through the IIR engine as one stacked array
     fc = 0.7
     alpha = 1 - np.exp(-2 * np.pi * fc / fs)
-    gx = _ema(ax, 1 - alpha)
-    gy = _ema(ay, 1 - alpha)
-    gz = _ema(az, 1 - alpha)
-    return ax - gx, ay - gy, az - gz
+    if ax.size == 0:
+        return ax, ay, az
+    lin, _ = highpass_filter(np.vstack([ax, ay, az]), 1 - alpha)
+    return lin[0], lin[1], lin[2]
 
 def _smooth(x: np.ndarray, k: int = 9) -> np.ndarray:
     if k < 1 or x.size == 0:
@@ -86,6 +105,29 @@ def _resample_to(t: np.ndarray, y: np.ndarray, n: int = 200) -> Tuple[np.ndarray
     return t_new, y_new
 
 
+def rom_spread(displacement: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    ROM variability per set: (SD cm, CV %, MAD cm) of rep displacements.
+    `displacement` is (n_reps,) or (n_sets, max_reps) in meters, NaN-padded;
+    values <= 0 (unknown) are ignored. Sets with < 2 known reps get zeros.
+    """
+    d = np.atleast_2d(np.asarray(displacement, dtype=float))
+    d = np.where(d > 0, d, np.nan)
+    n = np.sum(~np.isnan(d), axis=1)
+    enough = n >= 2
+    sd = np.zeros(d.shape[0])
+    cv = np.zeros(d.shape[0])
+    mad = np.zeros(d.shape[0])
+    if np.any(enough):
+        de = d[enough]
+        mean = np.nanmean(de, axis=1)
+        sd[enough] = np.sqrt(np.nansum((de - mean[:, None]) ** 2, axis=1) / (n[enough] - 1))
+        cv[enough] = sd[enough] / mean * 100
+        med = np.nanmedian(de, axis=1)
+        mad[enough] = np.nanmedian(np.abs(de - med[:, None]), axis=1)
+    return sd * 100, cv, mad * 100
+
+
 # ---------------- Reference profiles (stylized & normalized) ----------------
 
 class _ReferenceProfiles:
@@ -119,28 +161,54 @@ class _ReferenceProfiles:
         v /= max(v.max(), 1e-8)
         return x, v
 
+    @staticmethod
+    def ohp(n: int = 200) -> Tuple[np.ndarray, np.ndarray]:
+        x = np.linspace(0, 1, n)
+        base = np.sin(np.pi * x)
+        dip = 0.40 * np.exp(-0.5 * ((x - 0.45) / 0.09) ** 2)   # sticking point at forehead height
+        late = 0.10 * np.exp(-0.5 * ((x - 0.75) / 0.08) ** 2)
+        v = np.clip(base - dip + late, 0, None)
+        v /= max(v.max(), 1e-8)
+        return x, v
+
+    @staticmethod
+    def row(n: int = 200) -> Tuple[np.ndarray, np.ndarray]:
+        x = np.linspace(0, 1, n)
+        base = np.sin(np.pi * x)
+        early = 0.15 * np.exp(-0.5 * ((x - 0.30) / 0.10) ** 2)  # fast initial pull
+        v = np.clip(base + early, 0, None)
+        v /= max(v.max(), 1e-8)
+        return x, v
+
+    @staticmethod
+    def rdl(n: int = 200) -> Tuple[np.ndarray, np.ndarray]:
+        x = np.linspace(0, 1, n)
+        rise = 1 - np.exp(-4 * x)
+        mid_drop = 0.10 * np.exp(-0.5 * ((x - 0.60) / 0.15) ** 2)
+        v = np.clip(rise - mid_drop, 0, None)
+        v /= max(v.max(), 1e-8)
+        return x, v
+
 
 # ---------------- Comparison metrics ----------------
 
-def _pearson_r(a: np.ndarray, b: np.ndarray) -> float:
+def _zscore(x: np.ndarray) -> np.ndarray:
+    return (x - x.mean()) / (x.std() + 1e-8)
+
+def _pearson_r(a: np.ndarray, b: np.ndarray, b_z: Optional[np.ndarray] = None) -> float:
+    # b_z: precomputed _zscore(b) (e.g. from the reference bank)
     if a.size != b.size or a.size < 2:
         return 0.0
-    a = (a - a.mean()) / (a.std() + 1e-8)
-    b = (b - b.mean()) / (b.std() + 1e-8)
+    a = _zscore(a)
+    b = _zscore(b) if b_z is None else b_z
     return float(np.clip(np.mean(a * b), -1, 1))
 
 def _rmse(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.sqrt(np.mean((a - b) ** 2)))
 
 def _dtw_distance(a: np.ndarray, b: np.ndarray) -> float:
-    n, m = a.size, b.size
-    D = np.full((n + 1, m + 1), np.inf, dtype=float)
-    D[0, 0] = 0.0
-    for i in range(1, n + 1):
-        for j in range(1, m + 1):
-            cost = abs(a[i - 1] - b[j - 1])
-            D[i, j] = cost + min(D[i - 1, j], D[i, j - 1], D[i - 1, j - 1])
-    return float(D[n, m] / (n + m))
+    # Unconstrained DTW, identical to the original nested-loop recurrence
+    return dtw_distance(a, b, EXACT)
 
 def _curve_features(t: np.ndarray, v: np.ndarray) -> Dict[str, float]:
     n = v.size
@@ -151,24 +219,30 @@ def _curve_features(t: np.ndarray, v: np.ndarray) -> Dict[str, float]:
     i_min = start + int(np.argmin(v[start:]))
     return {"t_peak": float(t[i_peak]), "t_min": float(t[i_min]), "dip_depth": float(v[i_peak] - v[i_min])}
 
-def _score_from_metrics(rmse: float, r: float, dtw: float, feat_err: float) -> float:
+def _score_array(rmse, r, dtw, feat_err) -> np.ndarray:
+    # Elementwise core of _score_from_metrics (scalars or per-rep arrays)
     rmse_c = np.clip(rmse / 0.30, 0, 1)
     r_c = 1 - np.clip((r + 1) / 2, 0, 1)
     dtw_c = np.clip(dtw / 0.30, 0, 1)
     feat_c = np.clip(feat_err / 0.50, 0, 1)
     shape_penalty = 0.4 * rmse_c + 0.3 * r_c + 0.3 * dtw_c
     score = 100 * (1 - (0.8 * shape_penalty + 0.2 * feat_c))
-    return float(np.clip(score, 0, 100))
+    return np.clip(score, 0, 100)
+
+def _score_from_metrics(rmse: float, r: float, dtw: float, feat_err: float) -> float:
+    return float(_score_array(rmse, r, dtw, feat_err))
 
 
 # ---------------- Peak-anchored alignment ----------------
 
 def _align_to_peak(user_t: np.ndarray, user_v: np.ndarray,
                    ref_t: np.ndarray, ref_v: np.ndarray,
-                   small_shift_frac: float = 0.02) -> Tuple[np.ndarray, Dict[str, float]]:
+                   small_shift_frac: float = 0.02,
+                   ref_z: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Dict[str, float]]:
     """
     Piecewise peak-anchored time warp + tiny optional shift refinement.
     Returns (user_v_aligned_on_ref_t, info) where info contains peak times and shift.
+    ref_z: precomputed standardized ref_v, if the caller has one.
     """
     n = ref_t.size
     # peak times
@@ -189,7 +263,7 @@ def _align_to_peak(user_t: np.ndarray, user_v: np.ndarray,
     max_shift = int(max(1, np.round(small_shift_frac * n)))
     if max_shift > 0 and n > 5:
         x = (user_v_aligned - user_v_aligned.mean()) / (user_v_aligned.std() + eps)
-        y = (ref_v - ref_v.mean()) / (ref_v.std() + eps)
+        y = (ref_v - ref_v.mean()) / (ref_v.std() + eps) if ref_z is None else ref_z
         best = (0, -np.inf)  # (lag, score)
         for lag in range(-max_shift, max_shift + 1):
             if lag < 0:
@@ -214,6 +288,226 @@ def _align_to_peak(user_t: np.ndarray, user_v: np.ndarray,
     return user_v_aligned, info
 
 
+# ---------------- Batched (N reps × common grid) ----------------
+
+def _interp_rows(x: np.ndarray, xp_flat: np.ndarray, fp_flat: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Row-wise np.interp for N curves in one call. Row k's samples (xp within
+    [0, 1], increasing) are concatenated in xp_flat/fp_flat; x is (N, m) in
+    [0, 1]. Each row is shifted by 2k so rows never overlap on the flat axis.
+    """
+    N = x.shape[0]
+    offsets = 2.0 * np.arange(N)
+    xp_shift = xp_flat + np.repeat(offsets, lengths)
+    return np.interp(x + offsets[:, None], xp_shift, fp_flat)
+
+def _align_to_peak_batch(user_v: np.ndarray, ref: "ReferenceProfile",
+                         small_shift_frac: float = 0.02) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `_align_to_peak` for N curves already on the reference grid (N, n).
+    Returns (aligned (N, n), abs_peak_shift (N,)).
+    """
+    N, n = user_v.shape
+    grid = ref.t
+    eps = 1e-8
+    tpu = grid[np.argmax(user_v, axis=1)]
+    tpr = float(grid[int(np.argmax(ref.v))])
+
+    # piecewise affine mapping φ(t), per row
+    early = grid[None, :] <= tpu[:, None]
+    t_aligned = np.where(
+        early,
+        grid[None, :] * (tpr / np.maximum(tpu, eps))[:, None],
+        tpr + (grid[None, :] - tpu[:, None]) * ((1 - tpr) / np.maximum(1 - tpu, eps))[:, None],
+    )
+    aligned = _interp_rows(np.broadcast_to(grid, (N, n)), t_aligned.ravel(), user_v.ravel(), np.full(N, n))
+
+    # tiny shift refinement: score every lag for all rows, keep the first best
+    max_shift = int(max(1, np.round(small_shift_frac * n)))
+    if max_shift > 0 and n > 5:
+        x = (aligned - aligned.mean(axis=1, keepdims=True)) / (aligned.std(axis=1, keepdims=True) + eps)
+        y = ref.z
+        lags = np.arange(-max_shift, max_shift + 1)
+        scores = np.empty((N, lags.size))
+        for k, lag in enumerate(lags):
+            if lag < 0:
+                scores[:, k] = np.mean(x[:, -lag:] * y[:n + lag], axis=1)
+            elif lag > 0:
+                scores[:, k] = np.mean(x[:, :-lag] * y[lag:], axis=1)
+            else:
+                scores[:, k] = np.mean(x * y, axis=1)
+        best = lags[np.argmax(scores, axis=1)]
+        idx = np.clip(np.arange(n)[None, :] - best[:, None], 0, n - 1)
+        aligned = np.take_along_axis(aligned, idx, axis=1)
+
+    return aligned, np.abs(tpu - tpr)
+
+
+@dataclass
+class BatchRepScores:
+    """Per-rep profile comparison for a batch; every field has length N."""
+    profile_accuracy: np.ndarray
+    rmse: np.ndarray
+    pearson_r: np.ndarray
+    dtw: np.ndarray
+    feat_err: np.ndarray
+    t_peak: np.ndarray
+    t_min: np.ndarray
+    dip_depth: np.ndarray
+    abs_peak_shift: np.ndarray
+    user_v_aligned: np.ndarray  # (N, n) on the reference grid
+
+
+# ---------------- Reference profile bank ----------------
+
+# Lifts compare with the unconstrained DTW by default, so profile_accuracy and
+# dtw match the original nested loop. Banding is opt-in per lift, e.g.
+# CalculationService(dtw_configs={"squat": BANDED_DTW_CONFIGS["squat"]}).
+# Sakoe-Chiba half-width as a fraction of the 200-point comparison grid:
+# curves are already peak-aligned, so warping only needs a narrow band;
+# hip hinges get a wider one for their slower, more variable lockout.
+BANDED_DTW_CONFIGS: Dict[str, DTWConfig] = {
+    "bench": DTWConfig(band=0.10),
+    "squat": DTWConfig(band=0.10),
+    "deadlift": DTWConfig(band=0.15),
+    "ohp": DTWConfig(band=0.10),
+    "row": DTWConfig(band=0.10),
+    "rdl": DTWConfig(band=0.15),
+}
+
+# Built-in lifts: name → (profile generator, aliases)
+_BUILTIN_LIFTS: Dict[str, Tuple[Callable[[int], Tuple[np.ndarray, np.ndarray]], Tuple[str, ...]]] = {
+    "bench": (_ReferenceProfiles.bench, ("bench_press", "flat_bench")),
+    "squat": (_ReferenceProfiles.squat, ("back_squat", "front_squat")),
+    "deadlift": (_ReferenceProfiles.deadlift, ("conventional_deadlift", "sumo_deadlift")),
+    "ohp": (_ReferenceProfiles.ohp, ("overhead_press", "military_press", "shoulder_press")),
+    "row": (_ReferenceProfiles.row, ("barbell_row", "bent_over_row", "pendlay_row")),
+    "rdl": (_ReferenceProfiles.rdl, ("romanian_deadlift", "stiff_leg_deadlift")),
+}
+
+
+def _normalize_lift(name: str) -> str:
+    return "_".join(str(name).lower().replace("-", " ").split())
+
+
+def _singular(name: str) -> str:
+    """Fold plural words: back_squats -> back_squat (press, and short words like ohp, stay as they are)."""
+    return "_".join(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+                    for w in name.split("_"))
+
+
+def _readonly(x: np.ndarray) -> np.ndarray:
+    x = np.array(x, dtype=float)
+    x.setflags(write=False)
+    return x
+
+
+@dataclass(frozen=True)
+class ReferenceProfile:
+    """One lift's reference curve plus everything derived from it, built once."""
+    lift: str
+    t: np.ndarray                       # 0..1 grid (read-only)
+    v: np.ndarray                       # normalized velocity (read-only)
+    z: np.ndarray                       # standardized v, for Pearson / shift refinement
+    features: Mapping[str, float]       # _curve_features(t, v)
+    dtw: DTWConfig
+    envelope: Optional[Tuple[np.ndarray, np.ndarray]]  # LB_Keogh (upper, lower) for dtw.band
+
+
+class ReferenceProfileBank:
+    """
+    Reference profiles keyed by (lift, n), built once and handed out read-only.
+
+    Lift names are resolved through an alias table: exact match on the
+    normalized name (plurals folded, "Squats" → squat), then on its individual
+    words ("incline_bench_press" → bench), then any alias of 4+ characters
+    contained in the name, longest first ("sumo_deadlifting" → deadlift). The
+    resolution is memoized, so per-rep lookups are dict hits. Unknown lifts
+    fall back to `default_lift`.
+    """
+
+    _MAX_MEMO = 1024
+
+    def __init__(self, n: int = 200, dtw_configs: Optional[Dict[str, DTWConfig]] = None,
+                 default_lift: str = "bench"):
+        self.n = n
+        self.default_lift = default_lift
+        self._dtw_overrides = dict(dtw_configs or {})
+        self._generators: Dict[str, Callable[[int], Tuple[np.ndarray, np.ndarray]]] = {}
+        self._dtw: Dict[str, DTWConfig] = {}
+        self._aliases: Dict[str, str] = {}
+        self._memo: Dict[str, str] = {}
+        self._profiles: Dict[Tuple[str, int], ReferenceProfile] = {}
+        for name, (gen, aliases) in _BUILTIN_LIFTS.items():
+            self.register(name, gen, aliases=aliases)
+
+    def register(self, name: str, generator: Callable[[int], Tuple[np.ndarray, np.ndarray]],
+                 aliases: Iterable[str] = (), dtw: Optional[DTWConfig] = None) -> ReferenceProfile:
+        """
+        Add (or replace) a lift. `generator(n)` returns (t, v) on a 0..1 grid.
+        The profile for the bank's n is built immediately, so registering at
+        startup leaves nothing to do on the per-rep path.
+        """
+        key = _normalize_lift(name)
+        self._generators[key] = generator
+        self._dtw[key] = dtw or self._dtw_overrides.get(key) or EXACT
+        # Memoized resolutions may now resolve differently
+        self._memo.clear()
+        for alias in (key, *aliases):
+            self._aliases[_normalize_lift(alias)] = key
+        for cached in [c for c in self._profiles if c[0] == key]:
+            del self._profiles[cached]
+        return self.get(key)
+
+    def resolve(self, lift: str) -> str:
+        """Canonical lift name for any user-facing exercise name."""
+        key = self._memo.get(lift)
+        if key is not None:
+            return key
+        name = _normalize_lift(lift)
+        key = self._aliases.get(name) or self._aliases.get(_singular(name))
+        if key is None:
+            key = next((self._aliases[w] for w in _singular(name).split("_") if w in self._aliases), None)
+        if key is None:
+            key = next((self._aliases[a] for a in sorted(self._aliases, key=len, reverse=True)
+                        if len(a) >= 4 and a in name), _normalize_lift(self.default_lift))
+        if len(self._memo) < self._MAX_MEMO:
+            self._memo[lift] = key
+        return key
+
+    def get(self, lift: str, n: Optional[int] = None) -> ReferenceProfile:
+        key = self.resolve(lift)
+        n = self.n if n is None else n
+        profile = self._profiles.get((key, n))
+        if profile is None:
+            profile = self._build(key, n)
+            self._profiles[(key, n)] = profile
+        return profile
+
+    @property
+    def lifts(self) -> List[str]:
+        return list(self._generators)
+
+    def _build(self, key: str, n: int) -> ReferenceProfile:
+        t, v = self._generators[key](n)
+        t, v = _readonly(t), _readonly(v)
+        dtw_cfg = self._dtw[key]
+        w = band_width(n, dtw_cfg.band)
+        envelope = None
+        if w is not None:
+            upper, lower = lb_keogh_envelope(v, w)
+            envelope = (_readonly(upper), _readonly(lower))
+        return ReferenceProfile(
+            lift=key,
+            t=t,
+            v=v,
+            z=_readonly(_zscore(v)),
+            features=MappingProxyType(_curve_features(t, v)),
+            dtw=dtw_cfg,
+            envelope=envelope,
+        )
+
+
 # ---------------- Main service ----------------
 
 class CalculationService:
@@ -223,28 +517,49 @@ class CalculationService:
     segments reps from continuous stream, and computes effort/ROM metrics.
     """
 
-    def __init__(self):
-        # Running per-lift ROM baselines (meters of concentric travel)
-        # Updated as we observe larger displacements for that lift.
-        self.rom_baseline: Dict[str, float] = {}
+    def __init__(self, dtw_configs: Optional[Dict[str, DTWConfig]] = None,
+                 profiles: Optional[ReferenceProfileBank] = None):
+        # Running per-lift ROM baselines (meters of concentric travel): a rolling
+        # high percentile of recent reps, so one outlier can't skew rom_pct for good.
+        # Service-wide fallback; live sessions pass their athlete's own table.
+        self.rom_baseline = RomBaselines()
+        # Reference curves, their derived arrays and per-lift DTW settings
+        # (EXACT unless dtw_configs opts a lift into a band, see BANDED_DTW_CONFIGS)
+        self.profiles = profiles or ReferenceProfileBank(n=200, dtw_configs=dtw_configs)
+        # Coaching tips from the compiled rule table (coach_rules.RULES)
+        self.coach = CoachEngine()
+
+    def _dtw_to_profile(self, user_v: np.ndarray, ref: ReferenceProfile) -> float:
+        config = ref.dtw
+        d = dtw_distance(user_v, ref.v, config, envelope=ref.envelope)
+        if not np.isfinite(d):
+            # Abandoned: only "beyond the threshold" is known, which is all the score uses
+            d = float(config.abandon_above)
+        return d
 
     # ---- ROM baseline helpers ----
-    def _get_rom_baseline(self, lift: str) -> Optional[float]:
-        return self.rom_baseline.get(lift, None)
-
-    def _update_rom_baseline(self, lift: str, displacement_m: float):
+    # `baselines` lets a caller pass its own per-lift table (e.g. the athlete's
+    # RomBaselines from the store); None uses the service-wide one. Tables are
+    # keyed by canonical lift, so "Back Squat" and "squats" share one baseline.
+    def _get_rom_baseline(self, lift: str, baselines: Optional[RomBaselines] = None) -> Optional[float]:
+        baselines = self.rom_baseline if baselines is None else baselines
+        return baselines.get(self.profiles.resolve(lift))
+
+    def _update_rom_baseline(self, lift: str, displacement_m: float,
+                             baselines: Optional[RomBaselines] = None):
         if displacement_m <= 0:
             return
-        cur = self.rom_baseline.get(lift)
-        if cur is None or displacement_m > cur:
-            self.rom_baseline[lift] = float(displacement_m)
+        baselines = self.rom_baseline if baselines is None else baselines
+        baselines.update(self.profiles.resolve(lift), displacement_m)
 
     # ---- Segment a continuous stream into reps ----
-    def segment_reps_from_stream(self, raw_stream: Dict[str, Any]) -> List[RepEvent]:
+    def segment_reps_from_stream(self, raw_stream: Dict[str, Any], detail: str = DETAIL_FULL) -> List[RepEvent]:
         """
         raw_stream: {'ax','ay','az','fs', optional 't','lift'}
+        detail: "metrics" | "summary" | "full" (see _compute_rep_from_slice)
         Returns RepEvent objects for each detected rep (concentric).
         """
+        _check_detail(detail)
         ax = np.asarray(raw_stream.get("ax", []), dtype=float)
         ay = np.asarray(raw_stream.get("ay", []), dtype=float)
         az = np.asarray(raw_stream.get("az", []), dtype=float)
@@ -264,75 +579,78 @@ class CalculationService:
         if ax.size > 5000:
             print(f"⚠️  Processing large chunk: {ax.size} samples (>{ax.size/fs:.1f}s at {fs}Hz) - may cause processing delays")
 
-        if t.size == 0:
-            t = np.arange(ax.size, dtype=float) / fs
-
-        # Gravity removal + smoothing
-        gx, gy, gz = _highpass_gravity_estimate(ax, ay, az, fs)
-        acc = np.sqrt(gx**2 + gy**2 + gz**2)
-        acc = _smooth(acc, k=9)
-
-        # Velocity + drift correction
-        vel = _trapz_integrate(acc, t)
-        vel = _linear_detrend(vel)
-        vel = _smooth(vel, k=9)
-
-        # Make concentric positive; find active islands
-        vel = vel - np.median(vel[: max(1, int(0.1 * vel.size))])
-        if np.mean(vel) < 0:
-            vel = -vel
-
-        th = 0.02 * np.max(np.abs(vel)) + 1e-6
-        active = vel > th
-
+        # Same pipeline as a live session (drift high-pass, windowed threshold),
+        # pushed a second at a time like a client would, so a recorded set gives
+        # the same reps as the live one
+        from streaming_segmenter import StreamingSegmenter  # imports this module
+        seg = StreamingSegmenter(self, lift=lift, fs=fs, detail=detail)
+        step = max(int(fs), 1)
         reps: List[RepEvent] = []
-        min_len = int(0.4 * fs)   # ≥0.4 s
-        min_gap = int(0.2 * fs)   # ≥0.2 s gap
-        i = 0
-        while i < active.size:
-            if active[i]:
-                start = i
-                while i < active.size and active[i]:
-                    i += 1
-                end = i - 1
-                if (end - start + 1) >= min_len:
-                    _ = min(end + min_gap, active.size - 1)  # force a gap
-                    rep_ev = self._compute_rep_from_slice(
-                        t[start:end+1], vel[start:end+1], acc[start:end+1], lift
-                    )
-                    reps.append(rep_ev)
-                continue
-            i += 1
-
+        for i in range(0, ax.size, step):
+            chunk = {"ax": ax[i:i + step], "ay": ay[i:i + step], "az": az[i:i + step]}
+            if t.size:
+                chunk["t"] = t[i:i + step]
+            reps.extend(seg.push(chunk))
+        reps.extend(seg.flush())
         return reps
 
     # ---- Compute metrics from a concentric slice ----
-    def _compute_rep_from_slice(self, t_c: np.ndarray, v_c_raw: np.ndarray, a_c_raw: np.ndarray, lift: str) -> RepEvent:
+    def _compute_rep_from_slice(self, t_c: np.ndarray, v_c_raw: np.ndarray, a_c_raw: np.ndarray, lift: str,
+                                detail: str = DETAIL_FULL,
+                                rom_baseline: Optional[RomBaselines] = None) -> RepEvent:
+        """
+        detail: "metrics" → RepMetrics only (no profile comparison is run),
+                "summary" → + profile accuracy, comparison and effort scalars,
+                "full"    → + raw/normalized plot arrays (float ndarrays)
+        rom_baseline: per-lift ROM table to read/update (default: service-wide)
+        """
+        _check_detail(detail)
+        tut = float(t_c[-1] - t_c[0])
+        mean_speed = float(np.mean(np.clip(v_c_raw, 0, None)))
+
+        # ROM (displacement) from raw velocity with ZUPT anchors (start/end ~ 0)
+        # Integrate raw v to position; displacement = x_end - x_start
+        x_c = _trapz_integrate(v_c_raw, t_c)
+        # Re-anchor to start=0 to avoid arbitrary offset
+        x_c = x_c - x_c[0]
+        displacement_m = float(x_c[-1])  # meters (relative)
+        # Update the per-lift baseline (rolling high percentile)
+        self._update_rom_baseline(lift, displacement_m, rom_baseline)
+        rom_base = self._get_rom_baseline(lift, rom_baseline) or max(displacement_m, 1e-8)
+        rom_pct = float(np.clip(displacement_m / (rom_base + 1e-12), 0, 1.2))
+
+        metrics = RepMetrics(
+            tut=tut,
+            speed=mean_speed,
+            vl=0.0,           # set-level calc later
+            rom_hit=(rom_pct >= 0.95),  # treat ROM hit as ≥95% of baseline
+            displacement=displacement_m,
+        )
+        ts = int(datetime.now().timestamp() * 1000)
+        if detail == DETAIL_METRICS:
+            return RepEvent(id=f"rep-{ts}", valid=True, metrics=metrics, ts=ts)
+
         # Resample & normalize (velocity for comparison)
         t_rs, v_rs = _resample_to(t_c, np.clip(v_c_raw, 0, None), n=200)
         peak = max(np.max(v_rs), 1e-8)
         v_norm = v_rs / peak
         t_norm = (t_rs - t_rs[0]) / max((t_rs[-1] - t_rs[0]), 1e-8)
 
-        # Reference
-        if "squat" in lift:
-            r_t, r_v = _ReferenceProfiles.squat(n=200)
-        elif "dead" in lift:
-            r_t, r_v = _ReferenceProfiles.deadlift(n=200)
-        else:
-            r_t, r_v = _ReferenceProfiles.bench(n=200)
+        # Reference (prebuilt, read-only)
+        ref = self.profiles.get(lift)
+        r_t, r_v = ref.t, ref.v
 
         # Align user curve to reference by peak (piecewise warp + tiny shift)
-        user_v_aligned, align_info = _align_to_peak(t_norm, v_norm, r_t, r_v)
+        user_v_aligned, align_info = _align_to_peak(t_norm, v_norm, r_t, r_v, ref_z=ref.z)
 
         # Compare on aligned curves
         rmse = _rmse(user_v_aligned, r_v)
-        r = _pearson_r(user_v_aligned, r_v)
-        dtw = _dtw_distance(user_v_aligned, r_v)
+        r = _pearson_r(user_v_aligned, r_v, b_z=ref.z)
+        dtw = self._dtw_to_profile(user_v_aligned, ref)
 
         # Features (on the common ref grid)
         f_user = _curve_features(r_t, user_v_aligned)
-        f_ref = _curve_features(r_t, r_v)
+        f_ref = dict(ref.features)
         feat_err = (abs(f_user["t_peak"] - f_ref["t_peak"])
                     + abs(f_user["t_min"] - f_ref["t_min"])
                     + abs(f_user["dip_depth"] - f_ref["dip_depth"])) / 3.0
@@ -342,18 +660,7 @@ class CalculationService:
         raw_score = _score_from_metrics(rmse, r, dtw, feat_err)
         score = float(np.clip(raw_score * (1 - penalty), 0, 100))
 
-        # ---------------- Effort metrics (ROM & PoSR etc.) ----------------
-        # 1) ROM (displacement) from raw velocity with ZUPT anchors (start/end ~ 0)
-        # Integrate raw v to position; displacement = x_end - x_start
-        x_c = _trapz_integrate(v_c_raw, t_c)
-        # Re-anchor to start=0 to avoid arbitrary offset
-        x_c = x_c - x_c[0]
-        displacement_m = float(x_c[-1])  # meters (relative)
-        # Update per-lift baseline (we keep the max observed)
-        self._update_rom_baseline(lift, displacement_m)
-        rom_base = self._get_rom_baseline(lift) or max(displacement_m, 1e-8)
-        rom_pct = float(np.clip(displacement_m / (rom_base + 1e-12), 0, 1.2))
-
+        # ---------------- Effort metrics (PoSR etc.; ROM computed above) ----------------
         # 2) Find SR minimum index on normalized, aligned curve (common grid)
         #    (use the same definition as _curve_features)
         n = user_v_aligned.size
@@ -399,22 +706,6 @@ class CalculationService:
             # ambiguous; lean by LPVR and PoSR
             label = "true_failure" if (posr_imp_norm <= 0.10 and lpvr < 0.08) else "aborted"
 
-        # ---------------- Plotting payloads ----------------
-        diff = (user_v_aligned - r_v).tolist()  # error function
-        raw_plot = {
-            "t_raw": t_c.tolist(),
-            "acc_raw": a_c_raw.tolist(),
-            "vel_raw": v_c_raw.tolist(),
-            "pos_raw": x_c.tolist(),          # for optional position plots
-        }
-        norm_plot = {
-            "user_t": r_t.tolist(),           # aligned onto ref grid
-            "user_v": user_v_aligned.tolist(),
-            "ref_t": r_t.tolist(),
-            "ref_v": r_v.tolist(),
-            "diff": diff,                     # user − ref
-            "alignment": {"mode": "peak_piecewise", **align_info},
-        }
         effort = {
             "rom_pct": rom_pct,
             "rom_baseline_m": float(rom_base),
@@ -426,37 +717,113 @@ class CalculationService:
             "post_sr_gain": post_sr_gain,
             "label": label,
         }
-
-        tut = float(t_c[-1] - t_c[0])
-        mean_speed = float(np.mean(np.clip(v_c_raw, 0, None)))
-
-        return RepEvent(
-            id=f"rep-{int(datetime.now().timestamp() * 1000)}",
-            valid=True,
-            metrics=RepMetrics(
-                tut=tut,
-                speed=mean_speed,
-                vl=0.0,           # set-level calc later
-                rom_hit=(rom_pct >= 0.95),  # treat ROM hit as ≥95% of baseline
-            ),
-            ts=int(datetime.now().timestamp() * 1000),
-            extras={
-                "profile_accuracy": float(score),
-                "comparison": {
-                    "rmse": float(rmse),
-                    "pearson_r": float(r),
-                    "dtw": float(dtw),
-                    "user_features": f_user,
-                    "ref_features": f_ref,
-                },
-                "raw_plot": raw_plot,
-                "norm_plot": norm_plot,
-                "effort": effort,
+        extras: Dict[str, Any] = {
+            "profile_accuracy": float(score),
+            "comparison": {
+                "rmse": float(rmse),
+                "pearson_r": float(r),
+                "dtw": float(dtw),
+                "user_features": f_user,
+                "ref_features": f_ref,
             },
+            "effort": effort,
+        }
+
+        # ---------------- Plotting payloads (full detail only) ----------------
+        # Kept as ndarrays; rep_wire packs them into one float32 attachment
+        if detail == DETAIL_FULL:
+            extras["raw_plot"] = {
+                "t_raw": t_c,
+                "acc_raw": a_c_raw,
+                "vel_raw": v_c_raw,
+                "pos_raw": x_c,                   # for optional position plots
+            }
+            extras["norm_plot"] = {
+                "user_t": r_t,                    # aligned onto ref grid
+                "user_v": user_v_aligned,
+                "ref_t": r_t,
+                "ref_v": r_v,
+                "diff": user_v_aligned - r_v,     # error function: user − ref
+                "alignment": {"mode": "peak_piecewise", **align_info},
+            }
+
+        return RepEvent(id=f"rep-{ts}", valid=True, metrics=metrics, ts=ts, extras=extras)
+
+    # ---- Batch scoring (history re-scoring, bulk uploads) ----
+    def score_reps_batch(self, slices: List[Tuple[np.ndarray, np.ndarray, np.ndarray]], lift: str) -> BatchRepScores:
+        """
+        Profile-match scoring for many concentric slices (t, vel, acc) of one
+        lift in a single vectorized pass: every rep is resampled onto the common
+        grid as an (N, n) matrix and aligned, compared and scored as a whole.
+        Matches `_compute_rep_from_slice`'s profile_accuracy/comparison values;
+        effort/ROM metrics are not computed here (they depend on rep order).
+        Slices with fewer than 2 samples get NaN metrics and accuracy 0.
+        """
+        ref = self.profiles.get(lift)
+        n = ref.t.size
+        N = len(slices)
+        if N == 0:
+            e = np.empty(0)
+            return BatchRepScores(e, e, e, e, e, e, e, e, e, np.empty((0, n)))
+
+        ts = [np.asarray(s[0], dtype=float) for s in slices]
+        vs = [np.clip(np.asarray(s[1], dtype=float), 0, None) for s in slices]
+        lengths = np.array([t.size for t in ts])
+        ok = lengths >= 2
+        if not ok.all():
+            # Stand-in flat curves keep the matrix rectangular; masked at the end
+            ts = [t if t.size >= 2 else np.array([0.0, 1.0]) for t in ts]
+            vs = [v if v.size >= 2 else np.zeros(2) for v in vs]
+            lengths = np.maximum(lengths, 2)
+
+        # Resample all reps onto the common 0..1 grid and peak-normalize
+        t_flat = np.concatenate(ts)
+        starts = np.cumsum(lengths) - lengths
+        t0 = t_flat[starts]
+        span = np.maximum(t_flat[starts + lengths - 1] - t0, 1e-8)
+        u_flat = (t_flat - np.repeat(t0, lengths)) / np.repeat(span, lengths)
+        V = _interp_rows(np.broadcast_to(ref.t, (N, n)), u_flat, np.concatenate(vs), lengths)
+        V = V / np.maximum(V.max(axis=1, keepdims=True), 1e-8)
+
+        aligned, abs_shift = _align_to_peak_batch(V, ref)
+
+        # Comparison metrics as matrix ops
+        rmse = np.sqrt(np.mean((aligned - ref.v) ** 2, axis=1))
+        az = (aligned - aligned.mean(axis=1, keepdims=True)) / (aligned.std(axis=1, keepdims=True) + 1e-8)
+        r = np.clip(np.mean(az * ref.z, axis=1), -1, 1)
+        dtw = dtw_distance_batch(aligned, ref.v, ref.dtw, envelope=ref.envelope)
+        if ref.dtw.abandon_above is not None:
+            dtw = np.where(np.isfinite(dtw), dtw, ref.dtw.abandon_above)
+
+        # Curve features on the common grid
+        rows = np.arange(N)
+        i_peak = np.argmax(aligned, axis=1)
+        start = max(int(0.1 * n), 1)
+        i_min = start + np.argmin(aligned[:, start:], axis=1)
+        t_peak, t_min = ref.t[i_peak], ref.t[i_min]
+        dip = aligned[rows, i_peak] - aligned[rows, i_min]
+        f_ref = ref.features
+        feat_err = (np.abs(t_peak - f_ref["t_peak"]) + np.abs(t_min - f_ref["t_min"])
+                    + np.abs(dip - f_ref["dip_depth"])) / 3.0
+
+        penalty = np.clip(abs_shift / 0.20, 0, 1) * 0.10
+        score = np.clip(_score_array(rmse, r, dtw, feat_err) * (1 - penalty), 0, 100)
+
+        if not ok.all():
+            for arr in (rmse, r, dtw, feat_err, t_peak, t_min, dip, abs_shift):
+                arr[~ok] = np.nan
+            aligned[~ok] = np.nan
+            score[~ok] = 0.0
+
+        return BatchRepScores(
+            profile_accuracy=score, rmse=rmse, pearson_r=r, dtw=dtw, feat_err=feat_err,
+            t_peak=t_peak, t_min=t_min, dip_depth=dip, abs_peak_shift=abs_shift,
+            user_v_aligned=aligned,
         )
 
     # ---- Single-rep packet path (uses same logic) ----
-    def calculate_rep_metrics(self, raw_data: Dict[str, Any]) -> RepEvent:
+    def calculate_rep_metrics(self, raw_data: Dict[str, Any], detail: str = DETAIL_FULL) -> RepEvent:
+        _check_detail(detail)
         ax = np.asarray(raw_data.get("ax", []), dtype=float)
         ay = np.asarray(raw_data.get("ay", []), dtype=float)
         az = np.asarray(raw_data.get("az", []), dtype=float)
@@ -482,7 +849,7 @@ class CalculationService:
         if idx.size == 0:
             idx = np.arange(vel.size)
         i0, i1 = idx[0], idx[-1]
-        return self._compute_rep_from_slice(t[i0:i1+1], vel[i0:i1+1], acc[i0:i1+1], lift)
+        return self._compute_rep_from_slice(t[i0:i1+1], vel[i0:i1+1], acc[i0:i1+1], lift, detail)
 
     # ---- Set summary (back-compat + profile match note) ----
     def calculate_set_summary(self, reps: List[RepEvent]) -> SetEnd:
@@ -498,6 +865,7 @@ class CalculationService:
         tut_values = np.array([rep.metrics.tut for rep in reps], dtype=float)
         speed_values = np.array([rep.metrics.speed for rep in reps], dtype=float)
         rom_hits = np.array([rep.metrics.rom_hit for rep in reps], dtype=bool)
+        displacement = np.array([rep.metrics.displacement for rep in reps], dtype=float)
 
         total_tut = float(np.sum(tut_values))
         avg_speed = float(np.mean(speed_values))
@@ -505,7 +873,7 @@ class CalculationService:
         min_speed = float(np.min(speed_values))
         vl = ((first_rep_speed - min_speed) / first_rep_speed) * 100 if first_rep_speed > 0 else 0.0
         rom_hit_rate = float(np.mean(rom_hits) * 100)
-        rom_variability = float(np.random.uniform(1.0, 4.0))  # placeholder
+        (rom_sd,), (rom_cv,), (rom_mad,) = rom_spread(displacement)
 
         acc_scores = [ev.extras["profile_accuracy"] for ev in reps if ev.extras and "profile_accuracy" in ev.extras]
         avg_profile_acc = float(np.mean(acc_scores)) if acc_scores else None
@@ -521,36 +889,14 @@ class CalculationService:
                 avg_speed=round(avg_speed, 2),
                 vl=round(vl, 1),
                 rom_hit_rate=round(rom_hit_rate, 1),
-                rom_variability=round(rom_variability, 1),
+                rom_variability=round(float(rom_cv), 1),
+                rom_sd=round(float(rom_sd), 2),
+                rom_mad=round(float(rom_mad), 2),
             ),
             tip=tip,
         )
 
     def _generate_tip(self, reps: int, vl: float, rom_hit_rate: float, avg_speed: float, profile_acc: Optional[float] = None) -> str:
-        if profile_acc is not None:
-            if profile_acc >= 85:
-                note = f" Profile match {int(profile_acc)}%—great rhythm through the sticking region."
-            elif profile_acc >= 70:
-                note = f" Profile match {int(profile_acc)}%—close; keep pushing through the sticking point."
-            else:
-                note = f" Profile match {int(profile_acc)}%—work on technique around the sticking region."
-        else:
-            note = ""
-
-        if vl < 10:
-            extra_reps = int(np.ceil(reps * 0.5))
-            return f"Excellent speed consistency. Likely {extra_reps} reps in reserve—consider adding load." + note
-        if vl > 30:
-            return "High velocity loss—great effort, but watch for form breakdown next set." + note
-
-        if rom_hit_rate < 80:
-            return f"ROM hits {int(rom_hit_rate)}%. Prioritize depth consistency next set." + note
-        if rom_hit_rate == 100:
-            return "Perfect ROM consistency. Keep it up!" + note
-
-        if avg_speed < 0.3:
-            return "Bar speed is low; reduce load or add rest." + note
-        if avg_speed > 0.6:
-            return "Fast velocities—room to progress by 2.5–5% load." + note
-
-        return f"Solid set. VL {int(vl)}%, ROM hits {int(rom_hit_rate)}%." + note
+        X = set_features([{"reps": reps, "vl": vl, "romHitRate": rom_hit_rate,
+                           "avgSpeed": avg_speed, "profileAcc": profile_acc}])
+        return self.coach.rank(X, limit=1)[0]["tip"]
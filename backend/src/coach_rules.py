@@ -0,0 +1,189 @@
+import math
+import string
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+
+# ---------------- Rule table ----------------
+# Each rule: id, kind ("tip" = the main message, "note" = appended to it),
+# priority (higher wins), `when` = {feature: {op: value}} (all must hold) and
+# a tip template over the matching set's features ("{x:int}" truncates).
+# A rule with no conditions always matches (fallbacks).
+
+FEATURES = ("reps", "vl", "romHitRate", "avgSpeed", "profileAcc", "tut",
+            "extraReps", "speedDrop", "vlRise")
+
+RULES: List[Dict[str, Any]] = [
+    {"id": "vl_low", "kind": "tip", "priority": 90, "when": {"vl": {"<": 10}},
+     "tip": "Excellent speed consistency. Likely {extraReps:int} reps in reserve—consider adding load."},
+    {"id": "vl_high", "kind": "tip", "priority": 80, "when": {"vl": {">": 30}},
+     "tip": "High velocity loss—great effort, but watch for form breakdown next set."},
+    {"id": "rom_low", "kind": "tip", "priority": 70, "when": {"romHitRate": {"<": 80}},
+     "tip": "ROM hits {romHitRate:int}%. Prioritize depth consistency next set."},
+    {"id": "rom_perfect", "kind": "tip", "priority": 60, "when": {"romHitRate": {">=": 100}},
+     "tip": "Perfect ROM consistency. Keep it up!"},
+    {"id": "speed_low", "kind": "tip", "priority": 50, "when": {"avgSpeed": {"<": 0.3}},
+     "tip": "Bar speed is low; reduce load or add rest."},
+    {"id": "speed_high", "kind": "tip", "priority": 40, "when": {"avgSpeed": {">": 0.6}},
+     "tip": "Fast velocities—room to progress by 2.5–5% load."},
+    # Across the recent sets (speedDrop / vlRise are relative to the first set in the batch)
+    {"id": "fatigue_speed", "kind": "tip", "priority": 85, "when": {"speedDrop": {">=": 15}},
+     "tip": "Bar speed is down {speedDrop:int}% since your first set—take a longer rest or drop the load."},
+    {"id": "fatigue_vl", "kind": "tip", "priority": 75, "when": {"vlRise": {">=": 10}, "vl": {">=": 20}},
+     "tip": "Velocity loss has climbed {vlRise:int} points over your sets—consider ending the exercise here."},
+    {"id": "solid", "kind": "tip", "priority": 0, "when": {},
+     "tip": "Solid set. VL {vl:int}%, ROM hits {romHitRate:int}%."},
+
+    {"id": "profile_good", "kind": "note", "priority": 30, "when": {"profileAcc": {">=": 85}},
+     "tip": " Profile match {profileAcc:int}%—great rhythm through the sticking region."},
+    {"id": "profile_close", "kind": "note", "priority": 20, "when": {"profileAcc": {">=": 70, "<": 85}},
+     "tip": " Profile match {profileAcc:int}%—close; keep pushing through the sticking point."},
+    {"id": "profile_work", "kind": "note", "priority": 10, "when": {"profileAcc": {"<": 70}},
+     "tip": " Profile match {profileAcc:int}%—work on technique around the sticking region."},
+]
+
+
+class _TipFormatter(string.Formatter):
+    def format_field(self, value, format_spec):
+        if format_spec == "int":
+            return str(int(value))
+        return super().format_field(value, format_spec)
+
+
+_formatter = _TipFormatter()
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def set_features(recent_sets: Iterable[Mapping[str, Any]]) -> np.ndarray:
+    """
+    (n_sets, len(FEATURES)) matrix from set summaries, oldest first. Accepts
+    SetEnd wire dicts, the frontend's CompletedSet ({summary: {...}}) and flat
+    dicts; missing or non-numeric values are NaN (conditions on them don't
+    match), and entries that aren't mappings count as empty.
+    """
+    rows = []
+    for s in recent_sets:
+        summary = s.get("summary", s) if isinstance(s, Mapping) else {}
+        if not isinstance(summary, Mapping):
+            summary = {}
+        get = lambda *keys: next((_number(summary[k]) for k in keys if summary.get(k) is not None), math.nan)
+        rows.append((
+            get("reps"),
+            get("vl", "vlPercentage"),
+            get("romHitRate", "rom_hit_rate"),
+            get("avgSpeed", "avg_speed"),
+            get("profileAcc", "profileAccuracy"),
+            get("tut"),
+        ))
+    X = np.full((len(rows), len(FEATURES)), np.nan)
+    if not rows:
+        return X
+    base = np.array(rows, dtype=float)
+    X[:, :6] = base
+    X[:, 6] = np.ceil(base[:, 0] * 0.5)  # extraReps
+    first_speed = base[0, 3]
+    X[:, 7] = (first_speed - base[:, 3]) / first_speed * 100 if first_speed > 0 else np.nan  # speedDrop
+    X[:, 8] = base[:, 1] - base[0, 1]  # vlRise
+    return X
+
+
+class CoachEngine:
+    """
+    Rule table compiled once into per-feature bounds, lo[r, f] <= x[f] < hi[r, f];
+    evaluating every rule against every recent set is a single broadcast
+    comparison. Matches are ranked by priority, then recency; tips already
+    shown in a session are skipped while there is anything else to say.
+    """
+
+    def __init__(self, rules: Iterable[Mapping[str, Any]] = RULES, recent_per_session: int = 3,
+                 max_sessions: int = 1024):
+        self.rules = [dict(r) for r in rules]
+        self.recent_per_session = int(recent_per_session)
+        self.max_sessions = int(max_sessions)
+        self._shown: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._compile()
+
+    def _compile(self):
+        n, f = len(self.rules), len(FEATURES)
+        self.lo = np.full((n, f), -np.inf)
+        self.hi = np.full((n, f), np.inf)
+        self.constrained = np.zeros((n, f), dtype=bool)
+        for r, rule in enumerate(self.rules):
+            for feature, conds in rule.get("when", {}).items():
+                j = FEATURES.index(feature)
+                self.constrained[r, j] = True
+                for op, value in conds.items():
+                    v = float(value)
+                    if op == "<":
+                        self.hi[r, j] = min(self.hi[r, j], v)
+                    elif op == "<=":
+                        self.hi[r, j] = min(self.hi[r, j], np.nextafter(v, np.inf))
+                    elif op == ">=":
+                        self.lo[r, j] = max(self.lo[r, j], v)
+                    elif op == ">":
+                        self.lo[r, j] = max(self.lo[r, j], np.nextafter(v, np.inf))
+                    else:
+                        raise ValueError(f"Rule {rule['id']}: unknown operator {op!r}")
+        self.priority = np.array([float(r.get("priority", 0)) for r in self.rules])
+        self.is_note = np.array([r.get("kind", "tip") == "note" for r in self.rules])
+
+    def match(self, X: np.ndarray) -> np.ndarray:
+        """(n_sets, n_rules) bool: rule r holds for set s."""
+        x = X[:, None, :]
+        ok = (x >= self.lo) & (x < self.hi)  # NaN features compare False
+        return np.all(ok | ~self.constrained, axis=2)
+
+    def rank(self, X: np.ndarray, session: Optional[str] = None, limit: int = 3) -> List[Dict[str, Any]]:
+        """Tips for a batch of recent sets (oldest first), best first, notes appended to the top tip."""
+        if X.shape[0] == 0:
+            return []
+        m = self.match(X)
+        fired = m.any(axis=0)
+        # Most recent set each rule fired on (its values fill the template)
+        last = X.shape[0] - 1 - np.argmax(m[::-1], axis=0)
+        # Priority first; among equals, rules that hold for the latest sets
+        score = self.priority + last / X.shape[0]
+
+        shown = self._shown.get(session, ()) if session else ()
+        order = [r for r in np.argsort(-score) if fired[r]]
+        tips = [r for r in order if not self.is_note[r]]
+        notes = [r for r in order if self.is_note[r]]
+        fresh = [r for r in tips if self.rules[r]["id"] not in shown]
+        picked = (fresh or tips)[:limit]
+
+        note = self._render(notes[0], X[last[notes[0]]]) if notes else ""
+        out = []
+        for i, r in enumerate(picked):
+            out.append({
+                "id": self.rules[r]["id"],
+                "tip": self._render(r, X[last[r]]) + (note if i == 0 else ""),
+                "score": round(float(score[r]), 3),
+            })
+        if session and out:
+            self._remember(session, out[0]["id"])
+        return out
+
+    def tip(self, recent_sets: Iterable[Mapping[str, Any]], session: Optional[str] = None) -> Optional[str]:
+        tips = self.rank(set_features(recent_sets), session, limit=1)
+        return tips[0]["tip"] if tips else None
+
+    def _render(self, r: int, x: np.ndarray) -> str:
+        values = {name: (0.0 if math.isnan(v) else float(v)) for name, v in zip(FEATURES, x)}
+        return _formatter.format(self.rules[r]["tip"], **values)
+
+    def _remember(self, session: str, rule_id: str):
+        shown = self._shown.get(session)
+        if shown is None:
+            shown = self._shown[session] = deque(maxlen=self.recent_per_session)
+        shown.append(rule_id)
+        self._shown.move_to_end(session)
+        while len(self._shown) > self.max_sessions:
+            self._shown.popitem(last=False)
@@ -0,0 +1,275 @@
+import asyncio
+import functools
+import itertools
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# ---------------- Worker-local session state ----------------
+# Lives in whichever process runs the lane (the server itself in thread mode,
+# a pinned worker process in process mode). A session always lands on the same
+# lane, so its state is only ever touched by one worker.
+
+_session_states: Dict[str, Dict[str, Any]] = {}
+
+
+def session_state(session_id: str) -> Dict[str, Any]:
+    return _session_states.setdefault(session_id, {})
+
+
+def drop_session_state(session_id: str) -> None:
+    _session_states.pop(session_id, None)
+
+
+# ---------------- Executor ----------------
+
+Coalesce = Callable[[Tuple[Any, ...], Tuple[Any, ...]], Optional[Tuple[Any, ...]]]
+Shed = Callable[[Tuple[Any, ...], Tuple[Any, ...]], Tuple[Any, ...]]
+
+
+@dataclass
+class _Job:
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    coalesce: Optional[Coalesce]
+    shed: Optional[Shed]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+@dataclass
+class _SessionQueue:
+    lane: int
+    pending: Deque[_Job] = field(default_factory=deque)
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    pump: Optional[asyncio.Task] = None
+    # Args of sheddable jobs rejected by drop_newest, folded into the next job of the same fn
+    shed_carry: Dict[Callable[..., Any], Tuple[Any, ...]] = field(default_factory=dict)
+    # metrics
+    submitted: int = 0
+    processed: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    errors: int = 0
+    max_depth: int = 0
+    latency_ms_avg: float = 0.0     # enqueue → result (EMA)
+    latency_ms_max: float = 0.0
+    processing_ms_avg: float = 0.0  # time inside the worker (EMA)
+
+
+class DSPExecutor:
+    """
+    Runs CPU-heavy calculation work off the event loop.
+
+    Work is spread over `workers` lanes, each a single-worker thread or process
+    pool. A session is pinned to one lane (its worker-local state stays put)
+    and has its own bounded FIFO queue drained by one pump task, so a
+    session's jobs run strictly in submission order while different sessions
+    run in parallel.
+
+    Only jobs submitted with a `shed(dropped_args, next_args)` hook can be
+    dropped. Control jobs (no hook: resets, flushes, summaries) are always
+    queued, even past `max_queue`. When a sheddable job is dropped, `shed`
+    folds it into the next job of the same fn (e.g. counting its samples as
+    lost), never across a control job queued in between.
+
+    When a session's queue is full and a sheddable job arrives:
+      drop_oldest  – discard the oldest queued sheddable job (its caller gets None)
+      drop_newest  – reject the new job (its caller gets None)
+      coalesce     – merge the new job into the newest queued one using the
+                     job's `coalesce(old_args, new_args)`; falls back to
+                     drop_oldest for jobs without a merge function or when
+                     it returns None (jobs can't be merged)
+    """
+
+    POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+    _LATENCY_EMA = 0.1
+
+    def __init__(self, workers: int = 4, mode: str = "thread", max_queue: int = 32,
+                 policy: str = "coalesce"):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"mode must be 'thread' or 'process', got {mode!r}")
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}, got {policy!r}")
+        self.workers = max(1, int(workers))
+        self.mode = mode
+        self.max_queue = max(1, int(max_queue))
+        self.policy = policy
+        self._lanes: List[Executor] = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"dsp-{i}") if mode == "thread"
+            else ProcessPoolExecutor(max_workers=1)
+            for i in range(self.workers)
+        ]
+        self._sessions: Dict[str, _SessionQueue] = {}
+
+    # ---- Public API ----
+    async def submit(self, session_id: str, fn: Callable[..., Any], *args: Any,
+                     coalesce: Optional[Coalesce] = None, shed: Optional[Shed] = None) -> Any:
+        """
+        Queue fn(*args) for the session and wait for its result. Returns None
+        if the job was dropped or merged into an earlier one (whose caller
+        receives the combined result). Jobs without `shed` are never dropped.
+        """
+        return await self.enqueue(session_id, fn, *args, coalesce=coalesce, shed=shed)
+
+    def enqueue(self, session_id: str, fn: Callable[..., Any], *args: Any,
+                coalesce: Optional[Coalesce] = None, shed: Optional[Shed] = None) -> asyncio.Future:
+        """
+        Non-async `submit`: the job takes its place in the session's queue
+        before this returns, so calls made back-to-back keep their order.
+        The returned future resolves like `submit`.
+        """
+        q = self._session(session_id)
+        q.submitted += 1
+        loop = asyncio.get_running_loop()
+
+        if shed is None:
+            # Control job: a later job of any fn must not absorb work dropped before it
+            q.shed_carry.clear()
+        else:
+            carried = q.shed_carry.pop(fn, None)
+            if carried is not None:
+                args = shed(carried, args)
+            if len(q.pending) >= self.max_queue:
+                if self.policy == "drop_newest":
+                    q.shed_carry[fn] = args
+                    q.dropped += 1
+                    return self._resolved(loop)
+                last = q.pending[-1] if q.pending else None
+                if (self.policy == "coalesce" and coalesce is not None and last is not None
+                        and last.fn is fn and last.coalesce is coalesce):
+                    merged = coalesce(last.args, args)
+                    if merged is not None:
+                        last.args = merged
+                        q.coalesced += 1
+                        return self._resolved(loop)
+                args = self._drop_oldest(q, fn, args)
+
+        job = _Job(fn, args, coalesce, shed, loop.create_future(), time.perf_counter())
+        q.pending.append(job)
+        q.max_depth = max(q.max_depth, len(q.pending))
+        q.wake.set()
+        return job.future
+
+    def close_session(self, session_id: str) -> None:
+        """Stop the session's pump, release queued callers and free worker state."""
+        q = self._sessions.pop(session_id, None)
+        if q is None:
+            return
+        if q.pump is not None:
+            q.pump.cancel()
+        while q.pending:
+            job = q.pending.popleft()
+            if not job.future.done():
+                job.future.set_result(None)
+        self._lanes[q.lane].submit(drop_session_state, session_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        sessions = {
+            sid: {
+                "lane": q.lane,
+                "queue_depth": len(q.pending),
+                "max_queue_depth": q.max_depth,
+                "submitted": q.submitted,
+                "processed": q.processed,
+                "dropped": q.dropped,
+                "coalesced": q.coalesced,
+                "errors": q.errors,
+                "latency_ms_avg": round(q.latency_ms_avg, 3),
+                "latency_ms_max": round(q.latency_ms_max, 3),
+                "processing_ms_avg": round(q.processing_ms_avg, 3),
+            }
+            for sid, q in self._sessions.items()
+        }
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "policy": self.policy,
+            "max_queue": self.max_queue,
+            "queue_depth": sum(s["queue_depth"] for s in sessions.values()),
+            "sessions": sessions,
+        }
+
+    async def shutdown(self) -> None:
+        for sid in list(self._sessions):
+            self.close_session(sid)
+        await asyncio.sleep(0)
+        for lane in self._lanes:
+            lane.shutdown(wait=False, cancel_futures=True)
+
+    # ---- Internals ----
+    @staticmethod
+    def _resolved(loop: asyncio.AbstractEventLoop) -> asyncio.Future:
+        future = loop.create_future()
+        future.set_result(None)
+        return future
+
+    @staticmethod
+    def _drop_oldest(q: _SessionQueue, fn: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        """
+        Drop the oldest queued sheddable job and fold it into the next job of
+        the same fn (queued, or the incoming one whose args are returned).
+        With only control jobs queued nothing is dropped.
+        """
+        victim = next((i for i, job in enumerate(q.pending) if job.shed is not None), None)
+        if victim is None:
+            return args
+        dropped = q.pending[victim]
+        del q.pending[victim]
+        if not dropped.future.done():
+            dropped.future.set_result(None)
+        q.dropped += 1
+        for job in itertools.islice(q.pending, victim, None):
+            if job.shed is None:
+                return args  # a control job sits between: the loss ends there
+            if job.fn is dropped.fn:
+                job.args = dropped.shed(dropped.args, job.args)
+                return args
+        return dropped.shed(dropped.args, args) if fn is dropped.fn else args
+
+    def _lane_for(self, session_id: str) -> int:
+        return zlib.crc32(session_id.encode()) % self.workers
+
+    def _session(self, session_id: str) -> _SessionQueue:
+        q = self._sessions.get(session_id)
+        if q is None:
+            q = _SessionQueue(lane=self._lane_for(session_id))
+            q.pump = asyncio.create_task(self._pump(q))
+            self._sessions[session_id] = q
+        return q
+
+    async def _pump(self, q: _SessionQueue) -> None:
+        loop = asyncio.get_running_loop()
+        lane = self._lanes[q.lane]
+        while True:
+            if not q.pending:
+                q.wake.clear()
+                await q.wake.wait()
+                continue
+            job = q.pending.popleft()
+            if job.future.done():  # caller gave up (timeout / cancellation)
+                continue
+            started = time.perf_counter()
+            try:
+                result = await loop.run_in_executor(lane, functools.partial(job.fn, *job.args))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                q.errors += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            q.processed += 1
+            a = self._LATENCY_EMA if q.processed > 1 else 1.0
+            latency_ms = (finished - job.enqueued_at) * 1000
+            processing_ms = (finished - started) * 1000
+            q.latency_ms_avg += a * (latency_ms - q.latency_ms_avg)
+            q.latency_ms_max = max(q.latency_ms_max, latency_ms)
+            q.processing_ms_avg += a * (processing_ms - q.processing_ms_avg)
+            if not job.future.done():
+                job.future.set_result(result)
@@ -0,0 +1,251 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class DTWConfig:
+    """
+    How a lift's aligned curve is compared to its reference with DTW.
+
+    band:           Sakoe-Chiba half-width as a fraction of the series length
+                    (None = unconstrained warping window)
+    exact:          full-window wavefront recurrence that reproduces the original
+                    nested-loop `_dtw_distance` bit-for-bit (ignores the rest)
+    lower_bound:    check LB_Keogh first and skip the DP when it already exceeds
+                    `abandon_above` (equal-length series only)
+    abandon_above:  normalized distance past which only "too far" matters; the DP
+                    stops as soon as a row minimum proves the result exceeds it
+    """
+    band: Optional[float] = 0.10
+    exact: bool = False
+    lower_bound: bool = False
+    abandon_above: Optional[float] = None
+
+
+EXACT = DTWConfig(band=None, exact=True)
+
+
+def band_width(n: int, band: Optional[float]) -> Optional[int]:
+    """Band fraction → half-width in samples (at least 1)."""
+    if band is None:
+        return None
+    return max(1, int(np.ceil(band * n)))
+
+
+# ---------------- Lower bound ----------------
+
+def lb_keogh_envelope(ref: np.ndarray, w: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(upper, lower) running max/min of `ref` over a ±w window."""
+    ref = np.asarray(ref, dtype=float)
+    n = ref.size
+    padded = np.pad(ref, (w, w), mode="edge")
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * w + 1)[:n]
+    return windows.max(axis=1), windows.min(axis=1)
+
+
+def lb_keogh(query: np.ndarray, upper: np.ndarray, lower: np.ndarray) -> float:
+    """
+    LB_Keogh for the L1 point cost, normalized like `dtw_distance` (by n + m).
+    Every query sample is matched to at least one reference sample inside the
+    band, so its cost is at least its distance to the band's envelope.
+    """
+    q = np.asarray(query, dtype=float)
+    excess = np.clip(q - upper, 0, None) + np.clip(lower - q, 0, None)
+    return float(np.sum(excess) / (2 * q.size))
+
+
+# ---------------- Dynamic programming ----------------
+
+def _dtw_wavefront(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Full-window DTW evaluated one anti-diagonal at a time. Each cell uses the
+    same `cost + min(up, left, diag)` as the original loop, so results match it
+    exactly while running O(n + m) vectorized steps instead of O(n * m).
+    """
+    n, m = a.size, b.size
+    D = np.full((n + 1, m + 1), np.inf, dtype=float)
+    D[0, 0] = 0.0
+    for s in range(2, n + m + 1):
+        i = np.arange(max(1, s - m), min(n, s - 1) + 1)
+        j = s - i
+        cost = np.abs(a[i - 1] - b[j - 1])
+        D[i, j] = cost + np.minimum(np.minimum(D[i - 1, j], D[i, j - 1]), D[i - 1, j - 1])
+    return float(D[n, m] / (n + m))
+
+
+def _dtw_rows(a: np.ndarray, b: np.ndarray, w: Optional[int],
+              abandon_above: Optional[float]) -> float:
+    """
+    Banded DTW, one vectorized row at a time. Within a row,
+    D[i, j] = min(tmp[j], D[i, j-1] + cost[j]) with tmp = cost + min(up, diag),
+    which unrolls to a prefix minimum: D = P + cummin(tmp - P), P = cumsum(cost).
+    """
+    n, m = a.size, b.size
+    norm = float(n + m)
+    limit = np.inf if abandon_above is None else abandon_above * norm
+    # Column window per row (1-based, inclusive)
+    step = -(-m // n)  # max window advance per row
+    if w is None:
+        los = [1] * n
+        his = [m] * n
+    else:
+        c = np.arange(1, n + 1) * (m / n)
+        los = np.maximum(1, np.ceil(c - w)).astype(int).tolist()
+        his = np.minimum(m, np.floor(c + w)).astype(int).tolist()
+    prev = np.full(m + 1, np.inf)
+    prev[0] = 0.0
+    cur = np.full(m + 1, np.inf)
+    minimum, accumulate, cumsum = np.minimum, np.minimum.accumulate, np.cumsum
+    for i in range(n):
+        lo, hi = los[i], his[i]
+        if lo > hi:
+            return np.inf
+        cost = np.abs(a[i] - b[lo - 1:hi])
+        tmp = cost + minimum(prev[lo:hi + 1], prev[lo - 1:hi])
+        P = cumsum(cost)
+        row = P + accumulate(tmp - P)
+        # Every warping path crosses this row, and costs are non-negative
+        if row.min() > limit:
+            return np.inf
+        # Only the cells the next row can read need clearing
+        cur[lo - 1] = np.inf
+        cur[hi + 1:hi + 1 + step] = np.inf
+        cur[lo:hi + 1] = row
+        prev, cur = cur, prev
+    return float(prev[m] / norm)
+
+
+def dtw_distance(a: np.ndarray, b: np.ndarray, config: DTWConfig = DTWConfig(),
+                 envelope: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> float:
+    """
+    Normalized DTW distance (path cost / (n + m)) between two 1-D series.
+
+    Returns np.inf when `abandon_above` is set and the distance provably
+    exceeds it (by LB_Keogh or by a row minimum). `envelope` lets callers pass
+    a precomputed LB_Keogh envelope for `b`.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    if a.size == 0 or b.size == 0:
+        return np.inf
+    if config.exact:
+        return _dtw_wavefront(a, b)
+
+    w = band_width(max(a.size, b.size), config.band)
+    if w is not None:
+        # Keep consecutive rows' windows connected when lengths differ
+        w = max(w, int(np.ceil(max(a.size, b.size) / min(a.size, b.size))))
+
+    if (config.lower_bound and config.abandon_above is not None
+            and w is not None and a.size == b.size):
+        upper, lower = envelope if envelope is not None else lb_keogh_envelope(b, w)
+        if lb_keogh(a, upper, lower) > config.abandon_above:
+            return np.inf
+
+    return _dtw_rows(a, b, w, config.abandon_above)
+
+
+# ---------------- Batched ----------------
+
+def _dtw_wavefront_batch(A: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    `_dtw_wavefront` for many equal-length queries at once. Only the last two
+    anti-diagonals are kept, indexed by row i, so each step updates an
+    (diagonal, N) slab: D[i, j] reads up = prev[i-1], left = prev[i] and
+    diag = prev2[i-1]. Same operations per cell, so results match exactly.
+    """
+    N, n = A.shape
+    m = b.size
+    AT = np.ascontiguousarray(A.T)  # (n, N): a diagonal's rows are one contiguous block
+    b_rev = b[::-1, None]
+    # Three rotating diagonals; row 0 and the cells just past each diagonal's
+    # ends stay inf, which is all the next two steps read outside it
+    prev2, prev, cur = (np.full((n + 2, N), np.inf) for _ in range(3))
+    prev2[0] = 0.0  # diagonal 0: D[0, 0]
+    for s in range(2, n + m + 1):
+        lo, hi = max(1, s - m), min(n, s - 1)
+        out = cur[lo:hi + 1]
+        cur[lo - 1] = np.inf
+        cur[hi + 1] = np.inf
+        np.minimum(prev[lo - 1:hi], prev[lo:hi + 1], out=out)
+        np.minimum(out, prev2[lo - 1:hi], out=out)
+        out += np.abs(AT[lo - 1:hi] - b_rev[m - s + lo:m - s + hi + 1])
+        prev2, prev, cur = prev, cur, prev2
+    return prev[n] / (n + m)
+
+
+def _dtw_rows_batch(A: np.ndarray, b: np.ndarray, w: Optional[int],
+                    abandon_above: Optional[float]) -> np.ndarray:
+    """
+    `_dtw_rows` for many equal-length queries at once: the same per-row
+    recurrence with a leading batch axis, so the Python-level loop runs once
+    for the whole batch. Abandoned queries are dropped from the active set.
+    """
+    N, n = A.shape
+    m = b.size
+    norm = float(n + m)
+    limit = np.inf if abandon_above is None else abandon_above * norm
+    out = np.full(N, np.inf)
+    step = -(-m // n)
+    if w is None:
+        los, his = [1] * n, [m] * n
+    else:
+        c = np.arange(1, n + 1) * (m / n)
+        los = np.maximum(1, np.ceil(c - w)).astype(int).tolist()
+        his = np.minimum(m, np.floor(c + w)).astype(int).tolist()
+    alive = np.arange(N)
+    prev = np.full((N, m + 1), np.inf)
+    prev[:, 0] = 0.0
+    cur = np.full((N, m + 1), np.inf)
+    for i in range(n):
+        lo, hi = los[i], his[i]
+        if lo > hi:
+            return out
+        cost = np.abs(A[alive, i:i + 1] - b[lo - 1:hi])
+        tmp = cost + np.minimum(prev[:, lo:hi + 1], prev[:, lo - 1:hi])
+        P = np.cumsum(cost, axis=1)
+        row = P + np.minimum.accumulate(tmp - P, axis=1)
+        cur[:, lo - 1] = np.inf
+        cur[:, hi + 1:hi + 1 + step] = np.inf
+        cur[:, lo:hi + 1] = row
+        if abandon_above is not None:
+            keep = row.min(axis=1) <= limit
+            if not keep.all():
+                alive, cur, prev = alive[keep], cur[keep], prev[keep]
+                if alive.size == 0:
+                    return out
+        prev, cur = cur, prev
+    out[alive] = prev[:, m] / norm
+    return out
+
+
+def dtw_distance_batch(A: np.ndarray, b: np.ndarray, config: DTWConfig = DTWConfig(),
+                       envelope: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+    """
+    `dtw_distance` of every row of A (N, n) against one reference b.
+    Entries are np.inf where the comparison was abandoned.
+    """
+    A = np.atleast_2d(np.asarray(A, dtype=float))
+    b = np.asarray(b, dtype=float)
+    N, n = A.shape
+    if N == 0 or n == 0 or b.size == 0:
+        return np.full(N, np.inf)
+    if config.exact:
+        return _dtw_wavefront_batch(A, b)
+
+    w = band_width(max(n, b.size), config.band)
+    if w is not None:
+        w = max(w, int(np.ceil(max(n, b.size) / min(n, b.size))))
+
+    out = np.full(N, np.inf)
+    todo = np.arange(N)
+    if (config.lower_bound and config.abandon_above is not None
+            and w is not None and n == b.size):
+        upper, lower = envelope if envelope is not None else lb_keogh_envelope(b, w)
+        excess = np.clip(A - upper, 0, None) + np.clip(lower - A, 0, None)
+        lb = excess.sum(axis=1) / (2 * n)
+        todo = todo[lb <= config.abandon_above]
+    if todo.size:
+        out[todo] = _dtw_rows_batch(A[todo], b, w, config.abandon_above)
+    return out
@@ -0,0 +1,388 @@
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from calculation_service import ReferenceProfileBank, RepEvent, SetEnd
+
+
+# Set VL bands for the distribution chart: (low %, high %, label, color)
+VL_BINS = (
+    (0, 10, "0-10%", "#22c55e"),
+    (10, 20, "10-20%", "#84cc16"),
+    (20, 30, "20-30%", "#eab308"),
+    (30, 40, "30-40%", "#f97316"),
+    (40, None, "40%+", "#ef4444"),
+)
+_VL_EDGES = np.array([lo for lo, *_ in VL_BINS[1:]], dtype=float)
+_VL_BIN_COLS = [f"vl_bin{i}" for i in range(len(VL_BINS))]
+
+LOAD_STEP_KG = 2.5  # speed-at-load groups loads to the nearest plate step
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _day(ts: float) -> int:
+    """Local calendar day of a unix timestamp, as days since 1970-01-01."""
+    return (datetime.fromtimestamp(ts).date() - _EPOCH).days
+
+
+def _week(day: int) -> int:
+    """Day number of the Monday starting `day`'s week (day 0 was a Thursday)."""
+    return day - (day + 3) % 7
+
+
+def _iso_day(day: int) -> str:
+    return (_EPOCH + timedelta(days=int(day))).isoformat()
+
+
+def parse_day(value: Optional[str]) -> Optional[int]:
+    """ISO date/datetime string → day number (None/empty = unbounded)."""
+    if not value:
+        return None
+    return (datetime.fromisoformat(value.replace("Z", "+00:00")).date() - _EPOCH).days
+
+
+# ---------------- Rollups ----------------
+# Per (athlete, exercise, program): additive sums per day and per week, and
+# per (day, load step) the moments a speed-at-load fit needs. endSet batches
+# add to them in the same transaction that stores the raw set, so aggregate
+# queries read a few hundred precomputed rows instead of every rep.
+
+_ROLLUP_SUMS = ["sets", "reps", "tut", "speed_sum", "vl_sum", "rom_hits", "volume", *_VL_BIN_COLS]
+_LOAD_SUMS = ["n", "s_load", "s_speed", "s_load2", "s_load_speed", "s_speed2"]
+_KEY = ["athlete", "exercise", "program"]
+
+
+def _rollup_ddl(table: str, period: List[str], sums: List[str]) -> str:
+    key = _KEY + period
+    cols = ", ".join([f"{c} {'TEXT' if c in _KEY else 'INTEGER'} NOT NULL" for c in key]
+                     + [f"{c} REAL NOT NULL" for c in sums])
+    return f"CREATE TABLE IF NOT EXISTS {table} ({cols}, PRIMARY KEY ({', '.join(key)})) WITHOUT ROWID;"
+
+
+def _upsert_sql(table: str, period: List[str], sums: List[str]) -> str:
+    cols = _KEY + period + sums
+    return (f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+            f" ON CONFLICT ({', '.join(_KEY + period)}) DO UPDATE SET "
+            + ", ".join(f"{c} = {c} + excluded.{c}" for c in sums))
+
+
+_UPSERT_DAILY = _upsert_sql("rollup_daily", ["day"], _ROLLUP_SUMS)
+_UPSERT_WEEKLY = _upsert_sql("rollup_weekly", ["week"], _ROLLUP_SUMS)
+_UPSERT_LOAD = _upsert_sql("rollup_load", ["day", "step"], _LOAD_SUMS)
+
+_VL_BIN_SQL = ", ".join(
+    [f"SUM(s.vl < {_VL_EDGES[0]:g})"]
+    + [f"SUM(s.vl >= {lo:g} AND s.vl < {hi:g})" for lo, hi in zip(_VL_EDGES[:-1], _VL_EDGES[1:])]
+    + [f"SUM(s.vl >= {_VL_EDGES[-1]:g})"]
+)
+
+_REBUILD_SQL = f"""
+DELETE FROM rollup_daily;
+DELETE FROM rollup_weekly;
+DELETE FROM rollup_load;
+INSERT INTO rollup_daily ({", ".join(_KEY + ["day"] + _ROLLUP_SUMS)})
+SELECT s.athlete, s.exercise, s.program, s.day, COUNT(*), SUM(s.reps), SUM(s.tut),
+       SUM(COALESCE(r.speed_sum, 0)), SUM(s.vl), SUM(COALESCE(r.rom_hits, 0)),
+       SUM(COALESCE(s.load_kg, 0) * s.reps), {_VL_BIN_SQL}
+FROM sets s LEFT JOIN (
+    SELECT set_id, SUM(speed) AS speed_sum, SUM(rom_hit) AS rom_hits FROM reps GROUP BY set_id
+) r ON r.set_id = s.id
+GROUP BY s.athlete, s.exercise, s.program, s.day;
+INSERT INTO rollup_weekly ({", ".join(_KEY + ["week"] + _ROLLUP_SUMS)})
+SELECT athlete, exercise, program, day - (day + 3) % 7 AS week, {", ".join(f"SUM({c})" for c in _ROLLUP_SUMS)}
+FROM rollup_daily GROUP BY athlete, exercise, program, week;
+INSERT INTO rollup_load ({", ".join(_KEY + ["day", "step"] + _LOAD_SUMS)})
+SELECT athlete, exercise, program, day, CAST(ROUND(load_kg / {LOAD_STEP_KG}) AS INTEGER) AS step,
+       COUNT(*), SUM(load_kg), SUM(speed), SUM(load_kg * load_kg), SUM(load_kg * speed), SUM(speed * speed)
+FROM reps WHERE load_kg IS NOT NULL GROUP BY athlete, exercise, program, day, step;
+"""
+
+
+@dataclass
+class _PendingSet:
+    athlete: str
+    exercise: str
+    program: str
+    load_kg: Optional[float]
+    ts: float
+    summary: SetEnd
+    reps: List[RepEvent]
+
+
+class HistoryStore:
+    """
+    Workout history in SQLite: one row per set plus a narrow, numeric rep
+    table, both indexed by (athlete, exercise, day), and the rollups above.
+
+    `record_set()` only queues; sets are written in batches (one transaction
+    per flush, rollups included) by `run_writer()`, or right before a query
+    reads them. `aggregate()` feeds the history charts from the rollups only;
+    it does blocking I/O, so call it off the event loop.
+
+    Exercise names are stored and queried as canonical lifts ("Back Squat" →
+    squat) through the reference profile bank, so spellings share a series.
+    """
+
+    def __init__(self, path: str = "gym_scroller.db", flush_interval: float = 2.0, batch_size: int = 64,
+                 bank: Optional[ReferenceProfileBank] = None):
+        self.path = path
+        self.bank = bank if bank is not None else ReferenceProfileBank()
+        self.flush_interval = float(flush_interval)
+        self.batch_size = int(batch_size)
+        self._pending: List[_PendingSet] = []
+        self._lock = threading.Lock()        # guards _pending
+        self._write_lock = threading.Lock()  # one writer transaction at a time
+        self._wake = asyncio.Event()
+        self._local = threading.local()      # one connection per thread
+        self.sets_written = 0
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS sets (
+                    id INTEGER PRIMARY KEY,
+                    athlete TEXT NOT NULL, exercise TEXT NOT NULL, program TEXT NOT NULL,
+                    day INTEGER NOT NULL, ts REAL NOT NULL, load_kg REAL,
+                    reps INTEGER NOT NULL, tut REAL NOT NULL, avg_speed REAL NOT NULL,
+                    vl REAL NOT NULL, rom_hit_rate REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS sets_by_day ON sets (athlete, exercise, day);
+                CREATE TABLE IF NOT EXISTS reps (
+                    set_id INTEGER NOT NULL,
+                    athlete TEXT NOT NULL, exercise TEXT NOT NULL, program TEXT NOT NULL,
+                    day INTEGER NOT NULL, ts REAL NOT NULL, load_kg REAL,
+                    speed REAL NOT NULL, vl REAL NOT NULL, tut REAL NOT NULL, rom_hit INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS reps_by_day ON reps (athlete, exercise, day);
+                """
+                + _rollup_ddl("rollup_daily", ["day"], _ROLLUP_SUMS)
+                + _rollup_ddl("rollup_weekly", ["week"], _ROLLUP_SUMS)
+                + _rollup_ddl("rollup_load", ["day", "step"], _LOAD_SUMS)
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")  # readers don't wait on the batch writer
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ---- Writes ----
+    def record_set(self, athlete: str, exercise: str, summary: SetEnd, reps: List[RepEvent],
+                   load_kg: Optional[float] = None, program: str = "strength",
+                   ts: Optional[float] = None):
+        """Queue a finished set (and its reps) for the next batch write."""
+        pending = _PendingSet(athlete, self.bank.resolve(str(exercise)), program,
+                              None if load_kg is None else float(load_kg),
+                              time.time() if ts is None else float(ts), summary, list(reps))
+        with self._lock:
+            self._pending.append(pending)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Write every queued set in one transaction; returns how many sets were written."""
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            rep_rows: List[Tuple[Any, ...]] = []
+            daily, weekly, by_load = [], [], []
+            try:
+                with self._connect() as conn:
+                    for p in batch:
+                        s = p.summary.summary
+                        day = _day(p.ts)
+                        set_id = conn.execute(
+                            "INSERT INTO sets (athlete, exercise, program, day, ts, load_kg,"
+                            " reps, tut, avg_speed, vl, rom_hit_rate) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (p.athlete, p.exercise, p.program, day, p.ts, p.load_kg,
+                             s.reps, s.tut, s.avg_speed, s.vl, s.rom_hit_rate),
+                        ).lastrowid
+                        rep_rows.extend(
+                            (set_id, p.athlete, p.exercise, p.program, day, p.ts, p.load_kg,
+                             r.metrics.speed, r.metrics.vl, r.metrics.tut, int(bool(r.metrics.rom_hit)))
+                            for r in p.reps
+                        )
+                        key = (p.athlete, p.exercise, p.program)
+                        speed = np.array([r.metrics.speed for r in p.reps], dtype=float)
+                        rom_hits = sum(bool(r.metrics.rom_hit) for r in p.reps)
+                        vl_bins = [0] * len(VL_BINS)
+                        vl_bins[int(np.searchsorted(_VL_EDGES, s.vl, side="right"))] = 1
+                        sums = (1, s.reps, s.tut, float(speed.sum()), s.vl, rom_hits,
+                                (p.load_kg or 0.0) * s.reps, *vl_bins)
+                        daily.append((*key, day, *sums))
+                        weekly.append((*key, _week(day), *sums))
+                        if p.load_kg is not None and len(speed):
+                            x = p.load_kg
+                            by_load.append((*key, day, int(math.floor(x / LOAD_STEP_KG + 0.5)),
+                                            len(speed), x * len(speed), float(speed.sum()),
+                                            x * x * len(speed), x * float(speed.sum()),
+                                            float(np.dot(speed, speed))))
+                    conn.executemany("INSERT INTO reps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rep_rows)
+                    conn.executemany(_UPSERT_DAILY, daily)
+                    conn.executemany(_UPSERT_WEEKLY, weekly)
+                    conn.executemany(_UPSERT_LOAD, by_load)
+            except sqlite3.Error:
+                with self._lock:
+                    self._pending[:0] = batch  # keep them for the next flush
+                raise
+            self.sets_written += len(batch)
+            return len(batch)
+
+    async def run_writer(self):
+        """Background batch writer: every `flush_interval`, or sooner once a batch fills up."""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    print(f"❌ Error writing workout history: {str(e)}")
+        except asyncio.CancelledError:
+            self.flush()
+            raise
+
+    def rebuild_rollups(self):
+        """Regenerate every rollup from the raw set and rep tables (canonicalizing older exercise names)."""
+        self.flush()
+        with self._write_lock:
+            with self._connect() as conn:  # one transaction (executescript would commit first)
+                conn.create_function("canonical_lift", 1, self.bank.resolve, deterministic=True)
+                for table in ("sets", "reps"):
+                    conn.execute(f"UPDATE {table} SET exercise = canonical_lift(exercise)"
+                                 " WHERE exercise != canonical_lift(exercise)")
+                for statement in filter(str.strip, _REBUILD_SQL.split(";")):
+                    conn.execute(statement)
+
+    # ---- Queries ----
+    def set_velocities(self):
+        """(athlete, exercise, load_kg, best rep speed, last rep speed, vl, ts) per loaded set, oldest first."""
+        self.flush()
+        return self._connect().execute(
+            """
+            SELECT s.athlete, s.exercise, s.load_kg, r.best, last.speed, s.vl, s.ts
+            FROM sets s
+            JOIN (SELECT set_id, MAX(speed) AS best, MAX(rowid) AS last_rep FROM reps GROUP BY set_id) r
+                ON r.set_id = s.id
+            JOIN reps last ON last.rowid = r.last_rep
+            WHERE s.load_kg IS NOT NULL ORDER BY s.ts, s.id
+            """
+        ).fetchall()
+
+    def aggregate(self, athlete: str, exercise: str, program: Optional[str] = None,
+                  start_day: Optional[int] = None, end_day: Optional[int] = None) -> Dict[str, Any]:
+        """
+        VL histogram, speed-at-load (groups + linear fit) and weekly trends for
+        one lift, read from the rollups. Trends cover whole weeks, so the first
+        one starts on the Monday on or before `start_day`.
+        """
+        self.flush()
+        start = -(1 << 31) if start_day is None else start_day
+        end = (1 << 31) if end_day is None else end_day
+        where = "athlete = ? AND exercise = ?"
+        params: List[Any] = [athlete, self.bank.resolve(str(exercise))]
+        if program:
+            where += " AND program = ?"
+            params.append(program)
+
+        with self._connect() as conn:
+            vl_counts = conn.execute(
+                f"SELECT {', '.join(f'SUM({c})' for c in _VL_BIN_COLS)} FROM rollup_daily"
+                f" WHERE {where} AND day BETWEEN ? AND ?",
+                (*params, start, end),
+            ).fetchone()
+            load_days = np.array(
+                conn.execute(
+                    f"SELECT step, {', '.join(f'SUM({c})' for c in _LOAD_SUMS)} FROM rollup_load"
+                    f" WHERE {where} AND day BETWEEN ? AND ? GROUP BY step, day",
+                    (*params, start, end),
+                ).fetchall(),
+                dtype=float,
+            ).reshape(-1, 1 + len(_LOAD_SUMS))
+            weeks = conn.execute(
+                f"""
+                SELECT week, SUM(sets), SUM(reps), SUM(tut), SUM(speed_sum) / SUM(reps),
+                       SUM(vl_sum) / SUM(sets), 100.0 * SUM(rom_hits) / SUM(reps), SUM(volume)
+                FROM rollup_weekly WHERE {where} AND week BETWEEN ? AND ?
+                GROUP BY week ORDER BY week
+                """,
+                (*params, start if start_day is None else _week(start), end),
+            ).fetchall()
+
+        return {
+            "vlDistribution": {"bins": [{"range": label, "count": int(c or 0), "color": color}
+                                        for (_, _, label, color), c in zip(VL_BINS, vl_counts)]},
+            "speedAtLoad": self._speed_at_load(load_days),
+            "trends": [
+                {
+                    "date": _iso_day(week),
+                    "sets": int(n_sets),
+                    "reps": int(n_reps),
+                    "tut": round(tut, 2),
+                    "avgSpeed": round(speed or 0.0, 3),
+                    "vl": round(vl, 1),
+                    "romHitRate": round(rom or 0.0, 1),
+                    "volume": round(volume, 1),
+                }
+                for week, n_sets, n_reps, tut, speed, vl, rom, volume in weeks
+            ],
+        }
+
+    @staticmethod
+    def _speed_at_load(load_days: np.ndarray) -> Dict[str, Any]:
+        """
+        load_days: one row per (load step, day) with
+        [step, n, Σload, Σspeed, Σload², Σload·speed, Σspeed²]
+        """
+        if load_days.shape[0] == 0:
+            return {"points": [], "fit": None}
+        steps, idx = np.unique(load_days[:, 0], return_inverse=True)
+        n = np.bincount(idx, weights=load_days[:, 1])
+        mean_speed = np.bincount(idx, weights=load_days[:, 3]) / n
+        sessions = np.bincount(idx)  # one row per training day
+        points = [{"load": float(step * LOAD_STEP_KG), "avgSpeed": round(float(v), 3),
+                   "sessions": int(days), "reps": int(c)}
+                  for step, v, days, c in zip(steps, mean_speed, sessions, n)]
+
+        # Least-squares speed = intercept + slope·load from the summed moments
+        N, sx, sy, sxx, sxy, syy = load_days[:, 1:].sum(axis=0)
+        var_x = N * sxx - sx * sx
+        var_y = N * syy - sy * sy
+        fit = None
+        if len(steps) >= 2 and var_x > 0:
+            cov = N * sxy - sx * sy
+            slope = cov / var_x
+            fit = {
+                "slope": round(float(slope), 5),                     # m/s per kg
+                "intercept": round(float((sy - slope * sx) / N), 4),  # m/s at zero load
+                "r2": round(float(cov * cov / (var_x * var_y)), 3) if var_y > 0 else None,
+            }
+        return {"points": points, "fit": fit}
+
+
+if __name__ == "__main__":
+    # python history_store.py rebuild-rollups [db path]
+    import os
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild-rollups":
+        sys.exit("usage: python history_store.py rebuild-rollups [db path]")
+    path = sys.argv[2] if len(sys.argv) > 2 else os.getenv("DATA_DB_PATH", "gym_scroller.db")
+    started = time.perf_counter()
+    HistoryStore(path).rebuild_rollups()
+    print(f"📊 Rebuilt history rollups in {path} ({time.perf_counter() - started:.1f}s)")
@@ -0,0 +1,80 @@
+import numpy as np
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+
+# Block length for the blocked recurrence solver. Within a block the filter is
+# applied as one small lower-triangular matmul; block boundaries are stitched by
+# solving the same recurrence on the (much shorter) sequence of block ends.
+_BLOCK = 64
+
+
+@lru_cache(maxsize=32)
+def _decay_matrix(c: float, b: int) -> np.ndarray:
+    """T[i, k] = c**(i - k) for i >= k, else 0 (impulse response of one block)."""
+    i = np.arange(b)
+    lag = i[:, None] - i[None, :]
+    T = np.where(lag >= 0, np.power(c, np.maximum(lag, 0)), 0.0)
+    T.setflags(write=False)
+    return T
+
+
+def _linear_recurrence(u: np.ndarray, c: float) -> np.ndarray:
+    """
+    Solve y[n] = c * y[n-1] + u[n] with y[-1] = 0 along the last axis of a
+    2-D array, without a per-sample Python loop. All entries of the decay
+    matrix are powers c**k <= 1, so nothing overflows for any stable c.
+    """
+    m, n = u.shape
+    if n == 0:
+        return u.copy()
+    b = min(_BLOCK, n)
+    nb = -(-n // b)
+    if nb * b != n:
+        up = np.zeros((m, nb * b))
+        up[:, :n] = u
+    else:
+        up = u
+    y = up.reshape(m, nb, b) @ _decay_matrix(float(c), b).T
+    if nb > 1:
+        # State at the end of each block, then inject it into the next block
+        carry = _linear_recurrence(y[:, :, -1], float(c) ** b)
+        y[:, 1:, :] += carry[:, :-1, None] * np.power(c, np.arange(1, b + 1))
+    return y.reshape(m, nb * b)[:, :n]
+
+
+def ema_filter(x: np.ndarray, alpha: float,
+               zi: Optional[Union[float, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batched first-order IIR low-pass: y[n] = alpha * x[n] + (1 - alpha) * y[n-1].
+
+    x:  (..., n) — stack channels (e.g. the three accel axes) on leading axes
+        so they are filtered in one pass.
+    zi: filter state per channel from a previous call (shape x.shape[:-1]);
+        None seeds each channel with its first sample, matching `_ema`.
+
+    Returns (y, zf) where zf = y[..., -1] is the state to pass as `zi` on the
+    next chunk; chunked calls then reproduce one long call.
+    """
+    x = np.asarray(x, dtype=float)
+    lead = x.shape[:-1]
+    n = x.shape[-1]
+    if n == 0:
+        zf = np.zeros(lead) if zi is None else np.broadcast_to(np.asarray(zi, dtype=float), lead).copy()
+        return x.copy(), zf
+
+    c = 1.0 - float(alpha)
+    x2 = x.reshape(-1, n)
+    y0 = x2[:, 0] if zi is None else np.broadcast_to(np.asarray(zi, dtype=float), lead).reshape(-1)
+
+    u = alpha * x2
+    u[:, 0] += c * y0  # initial state enters as part of the first input
+    y = _linear_recurrence(u, c).reshape(x.shape)
+    return y, y[..., -1].copy()
+
+
+def highpass_filter(x: np.ndarray, alpha: float,
+                    zi: Optional[Union[float, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """x minus its EMA baseline; returns (x - baseline, baseline state)."""
+    base, zf = ema_filter(x, alpha, zi)
+    return np.asarray(x, dtype=float) - base, zf
@@ -0,0 +1,103 @@
+"""
+Binary IMU frame format for raw sensor chunks (`sensorData` as bytes).
+
+All fields little-endian:
+
+    offset  size  field
+    0       2     magic b"IM"
+    2       1     version (1)
+    3       1     flags: bit 0 set = int16 samples, clear = float32
+    4       4     device_id   (u32)
+    8       4     seq         (u32, +1 per frame)
+    12      2     sample_rate (u16, Hz)
+    14      8     base_ts_us  (u64, timestamp of the first sample, µs)
+    22      4     scale       (f32, m/s² per LSB; int16 frames only)
+    26      2     n_samples   (u16)
+    28      ...   n_samples × (ax, ay, az), interleaved
+
+At 200 Hz a 20-sample int16 frame is 148 bytes, versus ~1.7 KB of JSON
+float lists for the same chunk.
+"""
+
+import struct
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict
+
+import numpy as np
+
+
+MAGIC = b"IM"
+VERSION = 1
+FLAG_INT16 = 0x01
+
+_HEADER = struct.Struct("<2sBBIIHQfH")
+HEADER_SIZE = _HEADER.size  # 28
+
+
+@lru_cache(maxsize=16)
+def _sample_offsets(n: int, sample_rate: int) -> np.ndarray:
+    """Seconds from the first sample to each of n samples (shared, read-only)."""
+    offsets = np.arange(n) / float(sample_rate)
+    offsets.setflags(write=False)
+    return offsets
+
+
+@dataclass
+class ImuFrame:
+    device_id: int
+    seq: int
+    sample_rate: int
+    base_ts_us: int
+    scale: float
+    samples: np.ndarray  # (n, 3) read-only view into the received buffer
+
+    def __len__(self) -> int:
+        return self.samples.shape[0]
+
+    def to_chunk(self) -> Dict[str, Any]:
+        """
+        Segmenter chunk {'ax','ay','az','t'} in m/s² and seconds. The one
+        float64 conversion here is the only copy of the samples; the
+        segmenter uses these arrays as-is.
+        """
+        xyz = self.samples.T.astype(float, order="C")  # (3, n), one contiguous row per axis
+        if self.samples.dtype.kind == "i":
+            xyz *= self.scale
+        t = self.base_ts_us * 1e-6 + _sample_offsets(xyz.shape[1], self.sample_rate)
+        return {"ax": xyz[0], "ay": xyz[1], "az": xyz[2], "t": t}
+
+
+def decode_frame(buf) -> ImuFrame:
+    """Parse one frame; sample data is not copied. Raises ValueError if malformed."""
+    if len(buf) < HEADER_SIZE:
+        raise ValueError(f"IMU frame too short ({len(buf)} bytes)")
+    magic, version, flags, device_id, seq, fs, base_ts_us, scale, n = _HEADER.unpack_from(buf)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not an IMU frame (magic={magic!r}, version={version})")
+    if fs == 0:
+        raise ValueError("IMU frame has zero sample rate")
+    dtype = np.dtype("<i2") if flags & FLAG_INT16 else np.dtype("<f4")
+    expected = HEADER_SIZE + n * 3 * dtype.itemsize
+    if len(buf) != expected:
+        raise ValueError(f"IMU frame length {len(buf)} != {expected} for {n} samples")
+    samples = np.frombuffer(buf, dtype=dtype, count=n * 3, offset=HEADER_SIZE).reshape(n, 3)
+    return ImuFrame(device_id, seq, fs, base_ts_us, scale, samples)
+
+
+def encode_frame(device_id: int, seq: int, sample_rate: int, base_ts_us: int,
+                 samples: np.ndarray, int16_scale: float = None) -> bytes:
+    """
+    Build a frame from (n, 3) accelerations in m/s². With `int16_scale`
+    (m/s² per LSB) samples are quantized to int16, otherwise sent as float32.
+    """
+    samples = np.asarray(samples, dtype=float).reshape(-1, 3)
+    if int16_scale:
+        data = np.clip(np.round(samples / int16_scale), -32768, 32767).astype("<i2")
+        flags, scale = FLAG_INT16, float(int16_scale)
+    else:
+        data = samples.astype("<f4")
+        flags, scale = 0, 1.0
+    header = _HEADER.pack(MAGIC, VERSION, flags, device_id, seq & 0xFFFFFFFF,
+                          sample_rate, base_ts_us, scale, data.shape[0])
+    return header + data.tobytes()
@@ -0,0 +1,89 @@
+import math
+from typing import Callable, Optional, Sequence, Tuple
+
+
+# hook(t, dt, v, x) -> (v, x), applied after every integration step
+DriftHook = Callable[[float, float, float, float], Tuple[float, float]]
+
+
+def velocity_leak(tau_s: float) -> DriftHook:
+    """Drift hook: bleed velocity toward zero with time constant tau_s (first-order high-pass)."""
+    def hook(t: float, dt: float, v: float, x: float) -> Tuple[float, float]:
+        return v * math.exp(-dt / tau_s), x
+    return hook
+
+
+class OnlineIntegrator:
+    """
+    Acceleration → velocity → position with carried state, one sample at a time.
+
+    Same trapezoidal rule as `_trapz_integrate`, but each sample costs O(1) and
+    the running values never depend on which samples a display window still
+    holds. Position starts at 0 on the first sample after a reset.
+
+    ZUPT (zero-velocity update), when `zupt_var` is set: the short-term mean
+    square (time constant `zupt_tau_s`) of acceleration about a slow baseline
+    (`zupt_baseline_s`) staying below `zupt_var` for at least `zupt_hold_s`
+    means the sensor is at rest, so velocity is clamped to 0. Measuring about
+    the baseline keeps the detector independent of a constant gravity offset.
+
+    drift_hooks run after every step for further correction (e.g. velocity_leak).
+    """
+
+    def __init__(self, zupt_var: Optional[float] = None, zupt_hold_s: float = 0.25,
+                 zupt_tau_s: float = 0.1, zupt_baseline_s: float = 2.0,
+                 drift_hooks: Sequence[DriftHook] = ()):
+        self.zupt_var = zupt_var
+        self.zupt_hold_s = float(zupt_hold_s)
+        self.zupt_tau_s = float(zupt_tau_s)
+        self.zupt_baseline_s = float(zupt_baseline_s)
+        self.drift_hooks = list(drift_hooks)
+        self.reset()
+
+    def reset(self):
+        self.v = 0.0
+        self.x = 0.0
+        self.stationary = False
+        self.zupt_count = 0  # rest periods detected
+        self._t: Optional[float] = None
+        self._a = 0.0
+        self._base = 0.0    # slow acceleration baseline (gravity / bias)
+        self._energy = 0.0  # fast mean square about the baseline
+        self._still_s = 0.0
+
+    def update(self, t: float, a: float) -> Tuple[float, float]:
+        """Integrate one sample; returns (velocity, position)."""
+        t, a = float(t), float(a)
+        if self._t is None:
+            self._t, self._a, self._base = t, a, a
+            return self.v, self.x
+        dt = t - self._t
+        if dt <= 0:  # duplicate or out-of-order timestamp
+            return self.v, self.x
+
+        v_new = self.v + 0.5 * (a + self._a) * dt
+        self.x += 0.5 * (self.v + v_new) * dt
+        self.v = v_new
+
+        if self.zupt_var is not None:
+            self._zupt(dt, a)
+        for hook in self.drift_hooks:
+            self.v, self.x = hook(t, dt, self.v, self.x)
+
+        self._t, self._a = t, a
+        return self.v, self.x
+
+    def _zupt(self, dt: float, a: float):
+        self._base += (1.0 - math.exp(-dt / self.zupt_baseline_s)) * (a - self._base)
+        d = a - self._base
+        self._energy += (1.0 - math.exp(-dt / self.zupt_tau_s)) * (d * d - self._energy)
+        if self._energy < self.zupt_var:
+            self._still_s += dt
+            if self._still_s >= self.zupt_hold_s:
+                if not self.stationary:
+                    self.zupt_count += 1
+                self.stationary = True
+                self.v = 0.0
+        else:
+            self._still_s = 0.0
+            self.stationary = False
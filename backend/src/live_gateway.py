@@ -1,13 +1,22 @@
 import asyncio
 import socketio
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set, Union
 from datetime import datetime
 import random
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from collections import deque
-from calculation_service import CalculationService, RepEvent, RepMetrics, SetEnd, _trapz_integrate
+from urllib.parse import parse_qs
+from calculation_service import CalculationService, RepEvent, RepMetrics, SetEnd, DETAIL_LEVELS
+from dsp_executor import DSPExecutor
+from imu_frame import decode_frame
+from session_store import SessionStore, SessionTelemetry, WorkoutSession
+from rep_wire import rep_event_to_wire
+from rom_baseline_store import RomBaselineStore
+from history_store import HistoryStore
+from load_velocity import LoadVelocityEngine
+from running_set import RunningSet
+import streaming_segmenter
+
+# Workout room for clients that connect without ?room= (single-athlete setups)
+DEFAULT_ROOM = "workout:default"
 
 
 class LiveGateway:
@@ -15,45 +24,41 @@ class LiveGateway:
     WebSocket gateway for live workout tracking using Socket.IO
     """
 
-    def __init__(self, sio: socketio.AsyncServer, calculation_service: CalculationService):
+    def __init__(self, sio: socketio.AsyncServer, calculation_service: CalculationService,
+                 dsp: Optional[DSPExecutor] = None, rom_store: Optional[RomBaselineStore] = None,
+                 history: Optional[HistoryStore] = None,
+                 load_velocity: Optional[LoadVelocityEngine] = None):
         self.sio = sio
         self.calculation_service = calculation_service
+        # Per-(athlete, lift) ROM baselines, written behind to SQLite by rom_writer_task
+        self.rom_store = rom_store or RomBaselineStore()
+        self.rom_writer_task: asyncio.Task = None
+        # Finished sets are queued here and batch-written by history_writer_task (None = not recorded)
+        self.history = history
+        self.history_writer_task: asyncio.Task = None
+        # Load-velocity profiles, fed one point per loaded set at endSet
+        self.load_velocity = load_velocity or LoadVelocityEngine()
+        # Segmentation and set summaries run on per-session DSP lanes, never on the event loop
+        self.dsp = dsp or DSPExecutor()
+        if self.dsp.mode == "thread":
+            streaming_segmenter.bind_service(calculation_service, self.rom_store)
+        self._dsp_tasks: Set[asyncio.Task] = set()
+        # Workout sessions by stable device/athlete id; a reconnect within the
+        # grace window resumes the set (segmenter state is on the DSP lane under the same key)
+        self.sessions = SessionStore(ttl_s=120.0, max_sessions=512, on_evict=self._on_session_evicted)
         self.connected_clients: Dict[str, Any] = {}
         self.last_pong_times: Dict[str, datetime] = {}
         self.update_task: asyncio.Task = None
         self.stale_monitor_task: asyncio.Task = None
         self.health_broadcast_task: asyncio.Task = None
 
-        # Real-time plotting data storage
-        self.max_points = 500  # Keep last 500 points
-        self.time_data = deque(maxlen=self.max_points)
-        self.accel_data = deque(maxlen=self.max_points)
-        self.velocity_data = deque(maxlen=self.max_points)
-        self.position_data = deque(maxlen=self.max_points)
-        self.start_time = None
-
-        # Setup matplotlib for real-time plotting
-        plt.ion()
-        self.fig, self.axes = plt.subplots(3, 1, figsize=(12, 8))
-        self.fig.suptitle('Real-Time Sensor Data')
-
-        self.axes[0].set_ylabel('Acceleration (m/s²)')
-        self.axes[0].grid(True)
-        self.axes[1].set_ylabel('Velocity (m/s)')
-        self.axes[1].grid(True)
-        self.axes[2].set_ylabel('Position (m)')
-        self.axes[2].set_xlabel('Time (s)')
-        self.axes[2].grid(True)
-
-        self.line_accel, = self.axes[0].plot([], [], 'r-', label='Acceleration')
-        self.line_vel, = self.axes[1].plot([], [], 'g-', label='Velocity')
-        self.line_pos, = self.axes[2].plot([], [], 'b-', label='Position')
-
-        self.axes[0].legend()
-        self.axes[1].legend()
-        self.axes[2].legend()
-
-        plt.tight_layout()
+        # Live telemetry (headless) is kept per session (WorkoutSession.telemetry).
+        # Viewers pull it ("getTelemetry" / GET /api/telemetry) or subscribe to a
+        # throttled "telemetry" push; plotting lives in telemetry_viewer.py.
+        self.telemetry_interval = 0.1  # seconds between pushes (≤10 Hz)
+        # Subscriber sids per workout room; pushes go to the room's "<room>:telemetry" channel
+        self.telemetry_subscribers: Dict[str, Set[str]] = {}
+        self.telemetry_task: asyncio.Task = None
 
         self._setup_socket_handlers()
 
@@ -62,23 +67,34 @@ class LiveGateway:
 
         @self.sio.event
         async def connect(sid, environ):
-            # Parse query string for reconnection detection
-            query_string = environ.get('QUERY_STRING', '')
-            prev_sid = None
-            is_reconnection = False
-
-            # Simple query string parsing
-            if 'prev_sid=' in query_string:
-                params = query_string.split('&')
-                for param in params:
-                    if param.startswith('prev_sid='):
-                        prev_sid = param.split('=')[1]
-                        if prev_sid in self.connected_clients:
-                            is_reconnection = True
-                            print(f"🔄 Reconnection detected - previous sid: {prev_sid}")
-                        break
-
-            print(f"🟢 Client connected: {sid}")
+            # Parse query string for reconnection detection and session pairing
+            query = parse_qs(environ.get('QUERY_STRING', ''))
+            prev_sid = query.get('prev_sid', [None])[0]
+
+            # Session key: stable ?athlete= / ?device= id, else the session of prev_sid, else this socket
+            athlete = query.get('athlete', [None])[0]
+            device = query.get('device', [None])[0]
+            if athlete:
+                key = f"athlete:{athlete}"
+            elif device:
+                key = f"device:{device}"
+            else:
+                key = (self.sessions.key_for_sid(prev_sid) if prev_sid else None) or f"sid:{sid}"
+
+            # A device and its frontends pair by connecting with the same ?room=<workout id>
+            room_id = query.get('room', [None])[0]
+            session, resumed = self.sessions.attach(key, sid, f"workout:{room_id}" if room_id else DEFAULT_ROOM)
+            if room_id:
+                session.room = f"workout:{room_id}"
+            room = session.room
+            await self.sio.enter_room(sid, room)
+
+            is_reconnection = resumed or prev_sid in self.connected_clients
+            if is_reconnection:
+                print(f"🔄 Reconnection detected - previous sid: {prev_sid} | session {key} "
+                      f"({len(session.reps)} reps, set {'active' if session.set_active else 'idle'})")
+
+            print(f"🟢 Client connected: {sid} (room: {room})")
 
             # Track connection state with detailed metadata
             self.connected_clients[sid] = {
@@ -90,13 +106,20 @@ class LiveGateway:
                 "reconnection_count": 0,
                 "errors": 0,
                 "timeouts": 0,
+                "session": key,
+                "device_id": device,
             }
 
             # Send connection acknowledgment to client
             await self.sio.emit("connection_ack", {
                 "status": "connected",
                 "sid": sid,
-                "is_reconnection": is_reconnection
+                "room": room,
+                "session": key,
+                "is_reconnection": is_reconnection,
+                "resumed": resumed,
+                "setActive": session.set_active,
+                "repsCompleted": len(session.reps),
             }, room=sid)
             print(f"✅ Connection acknowledged for {sid}")
 
@@ -115,8 +138,10 @@ class LiveGateway:
                 print(f"🔴 Client disconnected: {sid} ({disconnect_type})")
                 print(f"   Duration: {duration:.1f}s | Chunks processed: {chunks}")
 
-                # Clean up tracking data
+                # Clean up tracking data; the workout session stays resumable for its grace window
                 del self.connected_clients[sid]
+                self._unsubscribe_telemetry(sid)
+                self.sessions.detach(sid)
                 if sid in self.last_pong_times:
                     del self.last_pong_times[sid]
             else:
@@ -151,8 +176,27 @@ class LiveGateway:
                 return
 
             print(f"Set started by {sid}: {data}")
-            # Reset plot data for new set
-            self.reset_plot_data()
+            session = self.session_of(sid)
+            if isinstance(data, dict):
+                session.lift = str(data.get("lift") or data.get("exercise") or session.lift).lower()
+                session.fs = float(data.get("fs", session.fs))
+                load = data.get("weightKg", data.get("load"))
+                if load is not None:
+                    session.load_kg = float(load)
+                session.program = str(data.get("programType") or session.program)
+                detail = data.get("detail")
+                if detail in DETAIL_LEVELS:
+                    session.detail = detail
+                elif detail is not None:
+                    print(f"⚠️ Ignoring unknown rep detail {detail!r} from {sid} (expected one of {DETAIL_LEVELS})")
+            session.reps = []
+            session.running = self._new_running_set(session)
+            session.set_active = True
+            session.set_started_at = datetime.now()
+            # Queued behind any chunks still in flight for this session
+            await self.dsp.submit(session.key, streaming_segmenter.reset_session, session.key)
+            # Reset this session's telemetry for the new set
+            session.telemetry.reset()
 
         @self.sio.event
         async def endSet(sid, data):
@@ -161,7 +205,16 @@ class LiveGateway:
                 return
 
             print(f"Set ended by {sid}: {data}")
-            reps = data.get("reps", [])
+            # Release frames still waiting on a reorder, then close out any open rep
+            session = self.session_of(sid)
+            for tracker in session.trackers.values():
+                for missing, chunk in tracker.flush():
+                    self._queue_segment(session, chunk, missing * len(chunk["ax"]))
+            tail = await self.dsp.submit(session.key, streaming_segmenter.flush_session, session.key)
+            await self._handle_server_reps(session, tail)
+            session.set_active = False
+
+            reps = data.get("reps", []) or session.reps
             # Convert dict reps to RepEvent objects if needed
             rep_events = []
             for rep in reps:
@@ -175,6 +228,7 @@ class LiveGateway:
                                 speed=rep.get("metrics", {}).get("speed", 0),
                                 vl=rep.get("metrics", {}).get("vl", 0),
                                 rom_hit=rep.get("metrics", {}).get("romHit", False),
+                                displacement=rep.get("metrics", {}).get("displacement", 0.0),
                             ),
                             ts=rep.get("ts", 0),
                         )
@@ -182,8 +236,16 @@ class LiveGateway:
                 else:
                     rep_events.append(rep)
 
-            summary = self.calculation_service.calculate_set_summary(rep_events)
-            await self.broadcast_set_end(summary)
+            summary = await self.dsp.submit(session.key, streaming_segmenter.set_summary, rep_events)
+            if summary is None:  # released by an expiring session; a summary is too important to lose
+                summary = self.calculation_service.calculate_set_summary(rep_events)
+            if self.history is not None and rep_events:
+                self.history.record_set(session.athlete, session.lift, summary, rep_events,
+                                        load_kg=session.load_kg, program=session.program)
+            self.load_velocity.add_set(session.athlete, session.lift, session.load_kg,
+                                       [rep.metrics.speed for rep in rep_events], summary.summary.vl)
+            session.running = self._new_running_set(session)
+            await self.broadcast_set_end(summary, self.room_of(sid))
 
         @self.sio.event
         async def sensorData(sid, data):
@@ -229,92 +291,218 @@ class LiveGateway:
                     "message": f"Failed to process sensor data: {str(e)}"
                 }, room=sid)
 
+        @self.sio.event
+        async def subscribeTelemetry(sid, data=None):
+            """Join the throttled telemetry push; acks with the current window"""
+            if sid is None or sid not in self.connected_clients:
+                return None
+            room = self.room_of(sid)
+            self.telemetry_subscribers.setdefault(room, set()).add(sid)
+            await self.sio.enter_room(sid, self._telemetry_room(room))
+            return self.telemetry_payload(room=room)
+
+        @self.sio.event
+        async def unsubscribeTelemetry(sid, data=None):
+            room = self._unsubscribe_telemetry(sid)
+            if room is not None:
+                await self.sio.leave_room(sid, self._telemetry_room(room))
+
+        @self.sio.event
+        async def getTelemetry(sid, data=None):
+            """Pull telemetry (ack) from absolute sample index `since` onward"""
+            since = data.get("since") if isinstance(data, dict) else None
+            return self.telemetry_payload(since, room=self.room_of(sid))
+
         async def _process_sensor_chunk(sid: str, data):
-            """Internal method to process state string with logging"""
+            """Internal method to process state string or raw IMU chunk with logging"""
+            session = self.session_of(sid)
+            self.sessions.touch(session)
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                # Binary IMU frame (see imu_frame.py); samples stay a view of the payload
+                frame = decode_frame(data)
+                self.connected_clients[sid]["device_id"] = frame.device_id
+                session.fs = float(frame.sample_rate)
+                self._ingest_chunk(session, f"device:{frame.device_id}", frame.seq, frame.to_chunk(),
+                                  frame.base_ts_us)
+                return
+            if isinstance(data, dict) and "ax" in data:
+                # JSON IMU chunk; sequence-tracked when it carries "seq"
+                session.lift = str(data.get("lift", session.lift)).lower()
+                session.fs = float(data.get("fs", session.fs))
+                if "seq" in data:
+                    t = data.get("t")
+                    self._ingest_chunk(session, self._stream_key(sid, data.get("device")), int(data["seq"]), data,
+                                       t[0] if t is not None and len(t) else None)
+                else:
+                    self._queue_segment(session, data)
+                return
+            if isinstance(data, dict) and "accel" in data:
+                # Single IMU sample: feed the session's live telemetry rings
+                self.process_sensor_data(session, data)
+                return
+
             # Data is now a simple string: "failure", "concentric", "eccentric", or "waiting"
             print(f"[{sid}] State: {data}")
-            # Broadcast state to all connected frontend clients
-            await self.sio.emit("sensorData", data)
+            # Relay state to the frontends paired with this device
+            await self.sio.emit("sensorData", data, room=self.room_of(sid), skip_sid=sid)
 
         # Make the helper function accessible
         self._process_sensor_chunk = _process_sensor_chunk
 
-    def process_sensor_data(self, data: Dict[str, Any]):
-        """Process incoming sensor data and update plots"""
-        if 'accel' not in data:
-            return
+    def _stream_key(self, sid: str, device: Optional[str] = None) -> str:
+        """Reorder-buffer key for a chunk stream: its device when known, else the socket"""
+        device = device or self.connected_clients.get(sid, {}).get("device_id")
+        return f"device:{device}" if device else f"sid:{sid}"
 
-        # Initialize start time on first data point
-        if self.start_time is None:
-            self.start_time = datetime.now()
+    def _ingest_chunk(self, session: WorkoutSession, stream_key: str, seq: int, chunk: Dict[str, Any],
+                      ts: Optional[float] = None):
+        """Pass a sequence-numbered chunk (first-sample device time `ts`) through the device's reorder buffer"""
+        for missing, ready in session.tracker(stream_key).push(seq, chunk, ts):
+            # Lost frames are assumed to be the same length as the one that follows
+            self._queue_segment(session, ready, missing * len(ready["ax"]))
 
-        # Calculate elapsed time
-        current_time = (datetime.now() - self.start_time).total_seconds()
+    def _queue_segment(self, session: WorkoutSession, samples: Dict[str, Any], missing: int = 0):
+        """
+        Queue an IMU chunk on the session's DSP lane and return right away,
+        so the 2s handler timeout never cancels segmentation in flight
+        """
+        future = self.dsp.enqueue(
+            session.key, streaming_segmenter.segment_chunk, session.key, samples,
+            session.lift, session.fs, session.detail, missing,
+            coalesce=streaming_segmenter.coalesce_segment_args,
+            shed=streaming_segmenter.shed_segment_args,
+        )
+        task = asyncio.create_task(self._segment_chunk(session, future))
+        self._dsp_tasks.add(task)
+        task.add_done_callback(self._dsp_tasks.discard)
+
+    async def _segment_chunk(self, session: WorkoutSession, future: asyncio.Future):
+        """Wait for one queued IMU chunk and broadcast the reps it finished"""
+        try:
+            reps = await future
+        except Exception as e:
+            for sid in session.sids:
+                self.connected_clients[sid]["errors"] += 1
+            print(f"❌ Error segmenting sensor data for {session.key}: {str(e)}")
+            return
+        await self._handle_server_reps(session, reps)
+
+    async def _handle_server_reps(self, session: WorkoutSession, reps: Optional[List[RepEvent]]):
+        """Record and broadcast reps detected server-side (None = job was dropped/merged)"""
+        if not reps:
+            return
+        for rep in reps:
+            rep.metrics.vl = round(session.running.add(rep), 1)
+            session.reps.append(rep)
+            await self.broadcast_rep(rep, session.room)
+            await self.broadcast_set_update(session.running.update(), session.room)
+
+    def _new_running_set(self, session: WorkoutSession) -> RunningSet:
+        # RIR counts down to the athlete's own MVT once their profile has one
+        return RunningSet(mvt=self.load_velocity.profile(session.athlete, session.lift).mvt)
+
+    def session_of(self, sid: str) -> WorkoutSession:
+        """Workout session a connected client is attached to"""
+        return self.sessions.for_sid(sid)
+
+    def _on_session_evicted(self, session: WorkoutSession):
+        print(f"🧹 Session expired: {session.key} ({len(session.reps)} reps)")
+        self.dsp.close_session(session.key)
+
+    def process_sensor_data(self, session: WorkoutSession, data: Dict[str, Any]):
+        """Process incoming sensor data into the session's telemetry rings"""
+        if 'accel' not in data:
+            return
 
         # Extract acceleration magnitude (or use z-axis for vertical movement)
         accel = data['accel']['z']  # Using z-axis, change to x or y as needed
         # Or use magnitude: accel = np.sqrt(data['accel']['x']**2 + data['accel']['y']**2 + data['accel']['z']**2)
 
-        # Store time and acceleration
-        self.time_data.append(current_time)
-        self.accel_data.append(accel)
-
-        # Convert to numpy arrays for integration
-        t = np.array(self.time_data)
-        a = np.array(self.accel_data)
-
-        # Calculate velocity using trapezoidal integration
-        if len(t) > 1:
-            v = _trapz_integrate(a, t)
-            self.velocity_data.append(v[-1])
-
-            # Calculate position by integrating velocity
-            v_array = np.array(self.velocity_data)
-            t_v = t[-len(v_array):]  # Match time array length
-            x = _trapz_integrate(v_array, t_v)
-            x = x - x[0]  # Start at 0
-            self.position_data.append(x[-1])
-        else:
-            self.velocity_data.append(0)
-            self.position_data.append(0)
-
-        # Update plot
-        self.update_plot()
-
-    def update_plot(self):
-        """Update the real-time plot with current data"""
-        if len(self.time_data) == 0:
-            return
-
-        t = list(self.time_data)
-        a = list(self.accel_data)
-        v = list(self.velocity_data)
-        x = list(self.position_data)
-
-        # Update line data
-        self.line_accel.set_data(t, a)
-        self.line_vel.set_data(t, v)
-        self.line_pos.set_data(t, x)
-
-        # Auto-scale axes
-        for ax in self.axes:
-            ax.relim()
-            ax.autoscale_view()
+        # Velocity and position from the session's carried integrator state (O(1) per sample)
+        session.telemetry.add(accel)
 
-        # Redraw
-        self.fig.canvas.draw()
-        self.fig.canvas.flush_events()
+    def telemetry_session(self, room: Optional[str] = None) -> Optional[WorkoutSession]:
+        """Most recently active session with telemetry (in `room`, if given)"""
+        latest = None
+        for session in self.sessions:  # least recently used first
+            if session.telemetry.ring.total and (room is None or session.room == room):
+                latest = session
+        return latest
 
-    async def broadcast_rep(self, rep: Dict[str, Any]):
-        """Broadcast rep event to all connected clients"""
-        await self.sio.emit("rep", rep)
-
-    async def broadcast_set_update(self, update: Dict[str, Any]):
-        """Broadcast set update to all connected clients"""
-        await self.sio.emit("setUpdate", update)
-
-    async def broadcast_set_end(self, summary: SetEnd):
-        """Broadcast set end to all connected clients"""
+    def telemetry_payload(self, since: int = None, packed: bool = True,
+                          room: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Telemetry of the latest active session (in `room`, if given) from
+        absolute sample index `since` (see SessionTelemetry.payload)
+        """
+        session = self.telemetry_session(room)
+        telemetry = session.telemetry if session is not None else SessionTelemetry(1)
+        return {"session": session and session.key, **telemetry.payload(since, packed)}
+
+    @staticmethod
+    def _telemetry_room(room: str) -> str:
+        return f"{room}:telemetry"
+
+    def _unsubscribe_telemetry(self, sid: str) -> Optional[str]:
+        """Forget a telemetry subscriber; returns the room it was subscribed in"""
+        room = self.room_of(sid)
+        subscribers = self.telemetry_subscribers.get(room)
+        if not subscribers or sid not in subscribers:
+            return None
+        subscribers.discard(sid)
+        if not subscribers:
+            del self.telemetry_subscribers[room]
+        return room
+
+    async def push_telemetry(self):
+        """Push each session's new telemetry samples to its room's subscribers at most every `telemetry_interval`"""
+        while True:
+            try:
+                await asyncio.sleep(self.telemetry_interval)
+                for session in self.sessions:
+                    telemetry = session.telemetry
+                    if telemetry.ring.total == telemetry.pushed:
+                        continue
+                    if session.room not in self.telemetry_subscribers:
+                        telemetry.pushed = telemetry.ring.total  # nobody watching: new subscribers get a snapshot
+                        continue
+                    payload = {"session": session.key, **telemetry.payload(telemetry.pushed)}
+                    telemetry.pushed = payload["next"]
+                    await self.sio.emit("telemetry", payload, room=self._telemetry_room(session.room))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"❌ Error pushing telemetry: {str(e)}")
+
+    def stream_stats(self) -> Dict[str, Any]:
+        """Per-session ordering/loss counters for sequence-numbered streams"""
+        return {
+            session.key: {
+                "sids": sorted(session.sids),
+                "chunks_received": sum(self.connected_clients[sid]["chunks_received"] for sid in session.sids),
+                "streams": {stream: tracker.summary() for stream, tracker in session.trackers.items()},
+            }
+            for session in self.sessions
+            if session.trackers
+        }
+
+    def room_of(self, sid: str) -> str:
+        """Workout room a client joined at connect"""
+        session = self.sessions.for_sid(sid)
+        return session.room if session else DEFAULT_ROOM
+
+    async def broadcast_rep(self, rep: Union[RepEvent, Dict[str, Any]], room: str = DEFAULT_ROOM):
+        """Broadcast rep event to a workout room (RepEvents go out in wire format)"""
+        if isinstance(rep, RepEvent):
+            rep = rep_event_to_wire(rep)
+        await self.sio.emit("rep", rep, room=room)
+
+    async def broadcast_set_update(self, update: Dict[str, Any], room: str = DEFAULT_ROOM):
+        """Broadcast set update to a workout room"""
+        await self.sio.emit("setUpdate", update, room=room)
+
+    async def broadcast_set_end(self, summary: SetEnd, room: str = DEFAULT_ROOM):
+        """Broadcast set end to a workout room"""
         await self.sio.emit(
             "setEnd",
             {
@@ -325,18 +513,21 @@ class LiveGateway:
                     "vl": summary.summary.vl,
                     "romHitRate": summary.summary.rom_hit_rate,
                     "romVariability": summary.summary.rom_variability,
+                    "romSd": summary.summary.rom_sd,
+                    "romMad": summary.summary.rom_mad,
                 },
                 "tip": summary.tip,
             },
+            room=room,
         )
 
-    async def broadcast_music_cue(self, action: str):
-        """Broadcast music cue (duck or restore)"""
-        await self.sio.emit("musicCue", {"action": action})
+    async def broadcast_music_cue(self, action: str, room: str = DEFAULT_ROOM):
+        """Broadcast music cue (duck or restore) to a workout room"""
+        await self.sio.emit("musicCue", {"action": action}, room=room)
 
-    async def broadcast_shorts_queue(self, queue: List[str]):
-        """Broadcast shorts queue"""
-        await self.sio.emit("shorts", {"queue": queue})
+    async def broadcast_shorts_queue(self, queue: List[str], room: str = DEFAULT_ROOM):
+        """Broadcast shorts queue to a workout room"""
+        await self.sio.emit("shorts", {"queue": queue}, room=room)
 
     async def start_mock_events(self):
         """Mock events for demo (remove in production)"""
@@ -455,6 +646,9 @@ class LiveGateway:
                     # Disconnect the client
                     await self.sio.disconnect(sid)
 
+                # Expire workout sessions whose reconnect grace window has passed
+                self.sessions.sweep()
+
             except asyncio.CancelledError:
                 # Graceful shutdown
                 print("🛑 Stale connection monitor stopped")
@@ -473,7 +667,9 @@ class LiveGateway:
                 health = {
                     "status": "healthy",
                     "timestamp": datetime.now().isoformat(),
-                    "connected_clients": len(self.connected_clients)
+                    "connected_clients": len(self.connected_clients),
+                    "dsp_queue_depth": self.dsp.metrics()["queue_depth"],
+                    "workout_sessions": len(self.sessions),
                 }
 
                 await self.sio.emit("server_health", health)
@@ -488,15 +684,11 @@ class LiveGateway:
         # self.update_task = asyncio.create_task(self.start_mock_events())  # Disabled - using real ESP8266 data
         self.stale_monitor_task = asyncio.create_task(self.monitor_stale_connections())
         self.health_broadcast_task = asyncio.create_task(self.broadcast_health_status())
-        print("✅ Background tasks started (stale connection monitor, health broadcast)")
-
-    def reset_plot_data(self):
-        """Reset all plot data (useful for starting a new set)"""
-        self.time_data.clear()
-        self.accel_data.clear()
-        self.velocity_data.clear()
-        self.position_data.clear()
-        self.start_time = None
+        self.telemetry_task = asyncio.create_task(self.push_telemetry())
+        self.rom_writer_task = asyncio.create_task(self.rom_store.run_writer())
+        if self.history is not None:
+            self.history_writer_task = asyncio.create_task(self.history.run_writer())
+        print("✅ Background tasks started (stale connection monitor, health broadcast, telemetry, ROM baselines, history)")
 
     async def cleanup(self):
         """Cleanup resources"""
@@ -524,6 +716,25 @@ class LiveGateway:
             except asyncio.CancelledError:
                 pass
 
-        # Close matplotlib figure
-        plt.close(self.fig)
+        # Cancel telemetry push task
+        if self.telemetry_task:
+            self.telemetry_task.cancel()
+            try:
+                await self.telemetry_task
+            except asyncio.CancelledError:
+                pass
+
+        # Stop DSP lanes (pending jobs are released, not run)
+        for task in list(self._dsp_tasks):
+            task.cancel()
+        await self.dsp.shutdown()
+
+        # Stop the ROM baseline and history writers (each saves what is still queued)
+        for task in (self.rom_writer_task, self.history_writer_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
         print("🧹 LiveGateway cleanup complete")
@@ -0,0 +1,230 @@
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from calculation_service import ReferenceProfileBank
+
+
+# Mean concentric velocity at 1RM (m/s) when an athlete has no near-failure sets yet,
+# keyed by ReferenceProfileBank's canonical lift names (rdl takes the deadlift's:
+# same hinge, and there is no separate published value); other lifts use FALLBACK_MVT
+DEFAULT_MVT = {"squat": 0.30, "bench": 0.17, "deadlift": 0.15, "rdl": 0.15, "ohp": 0.19, "row": 0.40}
+FALLBACK_MVT = 0.25
+
+NEAR_FAILURE_VL = 35.0  # sets with at least this VL% end close to the athlete's MVT
+PLATE_STEP_KG = 2.5
+
+# Weekly progression per program: (start %1RM, end %1RM, reps per set, sets, VL stop %)
+PROGRAMS = {
+    "strength": (0.75, 0.90, 3, 5, 15.0),
+    "hypertrophy": (0.65, 0.75, 8, 4, 25.0),
+    "technique": (0.55, 0.65, 5, 4, 10.0),
+}
+DELOAD_EVERY = 4      # every 4th week is a deload
+DELOAD_FACTOR = 0.9
+
+
+@dataclass
+class LoadVelocityProfile:
+    """
+    Per-(athlete, lift) linear load-velocity relation, fitted online.
+
+    Each set adds one (load, best-rep velocity) point to weighted running sums,
+    so the fit, e1RM and MVT are O(1) to update and read. Points far off the
+    current line get a Huber weight (once there are enough to trust the line),
+    and older points fade with a `half_life_days` half-life as the athlete
+    gets stronger (by time, not set count, so weeks at one working load don't
+    wash out the rest of the range).
+    """
+    lift: str
+    half_life_days: float = 90.0
+    huber_k: float = 2.0
+    min_points: int = 4
+    # weighted sums: w, w·x, w·y, w·x², w·x·y, w·y²
+    sums: List[float] = field(default_factory=lambda: [0.0] * 6)
+    points: int = 0
+    last_ts: Optional[float] = None
+    mvt_observed: Optional[float] = None
+    mvt_sets: int = 0
+    _fit: Optional[Tuple[float, float, float]] = field(default=None, repr=False)
+
+    # ---- Updates ----
+    def add_set(self, load_kg: float, best_speed: float, last_speed: Optional[float] = None,
+                vl: Optional[float] = None, ts: Optional[float] = None):
+        x, y = float(load_kg), float(best_speed)
+        if x <= 0 or y <= 0:
+            return
+        ts = time.time() if ts is None else float(ts)
+        if self.last_ts is not None and ts > self.last_ts:
+            fade = 0.5 ** ((ts - self.last_ts) / (self.half_life_days * 86400.0))
+            self.sums = [s * fade for s in self.sums]  # fading all weights leaves the fit unchanged
+        self.last_ts = ts if self.last_ts is None else max(ts, self.last_ts)
+        w = 1.0
+        fit = self.fit()
+        if fit is not None and self.points >= self.min_points:
+            resid = abs(y - (fit[0] + fit[1] * x))
+            scale = self.huber_k * max(fit[2], 0.02)  # floor: don't over-trust a near-perfect line
+            if resid > scale:
+                w = scale / resid
+        for i, v in enumerate((1.0, x, y, x * x, x * y, y * y)):
+            self.sums[i] += w * v
+        self.points += 1
+        self._fit = self._solve()
+        if last_speed is not None and vl is not None and vl >= NEAR_FAILURE_VL and last_speed > 0:
+            # Running mean of near-failure last-rep velocities
+            self.mvt_sets += 1
+            prev = self.mvt_observed if self.mvt_observed is not None else last_speed
+            self.mvt_observed = prev + (float(last_speed) - prev) / self.mvt_sets
+
+    # ---- Reads ----
+    def fit(self) -> Optional[Tuple[float, float, float]]:
+        """(intercept m/s, slope m/s per kg, residual sd m/s), or None if underdetermined."""
+        return self._fit
+
+    def _solve(self) -> Optional[Tuple[float, float, float]]:
+        w, sx, sy, sxx, sxy, syy = self.sums
+        if self.points < 2 or w <= 0:
+            return None
+        var_x = w * sxx - sx * sx
+        if var_x <= 1e-9 * max(w * sxx, 1.0):  # every point at the same load
+            return None
+        slope = (w * sxy - sx * sy) / var_x
+        intercept = (sy - slope * sx) / w
+        sse = syy - intercept * sy - slope * sxy
+        sd = math.sqrt(max(sse, 0.0) / w)
+        return intercept, slope, sd
+
+    @property
+    def mvt(self) -> float:
+        if self.mvt_observed is not None:
+            return self.mvt_observed
+        return DEFAULT_MVT.get(self.lift, FALLBACK_MVT)
+
+    def velocity_at(self, load_kg: float) -> Optional[float]:
+        fit = self.fit()
+        return None if fit is None else fit[0] + fit[1] * float(load_kg)
+
+    def load_at(self, velocity: float) -> Optional[float]:
+        fit = self.fit()
+        if fit is None or fit[1] >= 0:
+            return None
+        return (float(velocity) - fit[0]) / fit[1]
+
+    def e1rm(self) -> Optional[float]:
+        """Load at which the fitted velocity falls to the MVT."""
+        load = self.load_at(self.mvt)
+        return load if load is not None and load > 0 else None
+
+    def summary(self) -> Dict[str, Any]:
+        fit = self.fit()
+        e1rm = self.e1rm()
+        return {
+            "lift": self.lift,
+            "sets": self.points,
+            "intercept": None if fit is None else round(fit[0], 4),
+            "slope": None if fit is None else round(fit[1], 5),
+            "residualSd": None if fit is None else round(fit[2], 4),
+            "mvt": round(self.mvt, 3),
+            "mvtObserved": self.mvt_observed is not None,
+            "e1rm": None if e1rm is None else round(e1rm, 1),
+        }
+
+
+def _positive_kg(name: str, value: Any) -> Optional[float]:
+    """Optional load from request JSON: None stays None; anything else must be a positive number."""
+    if value is None:
+        return None
+    try:
+        kg = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number of kg, got {value!r}")
+    if not math.isfinite(kg) or kg <= 0:
+        raise ValueError(f"{name} must be positive, got {value!r}")
+    return kg
+
+
+class LoadVelocityEngine:
+    """
+    Load-velocity profiles for every (athlete, lift), kept current as sets
+    finish, so e1RM estimates and plans are lookups rather than refits.
+    Exercise names are resolved to canonical lifts ("Bench Press" → bench)
+    through the reference profile bank.
+    """
+
+    def __init__(self, bank: Optional[ReferenceProfileBank] = None, **profile_kwargs):
+        self.bank = bank if bank is not None else ReferenceProfileBank()
+        self.profile_kwargs = profile_kwargs
+        self.profiles: Dict[Tuple[str, str], LoadVelocityProfile] = {}
+
+    def _key(self, athlete: str, lift: str) -> Tuple[str, str]:
+        return athlete, self.bank.resolve(lift)
+
+    def profile(self, athlete: str, lift: str) -> LoadVelocityProfile:
+        key = self._key(athlete, lift)
+        p = self.profiles.get(key)
+        if p is None:
+            p = self.profiles[key] = LoadVelocityProfile(key[1], **self.profile_kwargs)
+        return p
+
+    def add_set(self, athlete: str, lift: str, load_kg: Optional[float], speeds: List[float],
+                vl: Optional[float] = None, ts: Optional[float] = None):
+        """Feed one finished set (rep mean velocities in order)."""
+        if load_kg is None or not speeds:
+            return
+        self.profile(athlete, lift).add_set(load_kg, max(speeds), speeds[-1], vl, ts)
+
+    def bootstrap(self, rows) -> int:
+        """Replay (athlete, lift, load_kg, best_speed, last_speed, vl, ts) rows, oldest first."""
+        n = 0
+        for athlete, lift, load_kg, best, last, vl, ts in rows:
+            self.profile(athlete, lift).add_set(load_kg, best, last, vl, ts)
+            n += 1
+        return n
+
+    # ---- Planning ----
+    def plan(self, athlete: str, lift: str, weeks: int, program: str = "strength",
+             e1rm: Optional[float] = None, target_e1rm: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Weekly progression for one lift. Loads come from the athlete's e1RM (or
+        the one passed in when there is no profile yet); target velocities and
+        the expected e1RM per week come from the fitted profile where there is one.
+        Raises ValueError for an unknown program or a non-numeric / non-positive e1RM.
+        """
+        if program not in PROGRAMS:
+            raise ValueError(f"programType must be one of {tuple(PROGRAMS)}, got {program!r}")
+        e1rm = _positive_kg("e1rm", e1rm)
+        target_e1rm = _positive_kg("targetE1rm", target_e1rm)
+        weeks = max(1, int(weeks))
+        profile = self.profiles.get(self._key(athlete, lift))
+        fitted = profile.e1rm() if profile is not None else None
+        base = fitted or e1rm
+        if base is None:
+            return {"plan": [], "profile": profile.summary() if profile else None,
+                    "reason": "No load-velocity data or e1RM for this lift yet"}
+
+        start, end, reps, sets, vl_stop = PROGRAMS[program]
+        # Spread the remaining gap to the goal evenly over the block (never regress)
+        weekly_gain = max(0.0, (target_e1rm - base) / weeks) if target_e1rm else 0.0
+        plan = []
+        for week in range(1, weeks + 1):
+            frac = (week - 1) / (weeks - 1) if weeks > 1 else 1.0
+            pct = start + (end - start) * frac
+            deload = week % DELOAD_EVERY == 0 and week < weeks
+            if deload:
+                pct *= DELOAD_FACTOR
+            week_e1rm = base + weekly_gain * (week - 1)
+            load = round(week_e1rm * pct / PLATE_STEP_KG) * PLATE_STEP_KG
+            velocity = profile.velocity_at(load) if fitted else None
+            plan.append({
+                "week": week,
+                "intensity": round(pct * 100, 1),  # %1RM
+                "loadKg": load,
+                "sets": sets - 1 if deload else sets,
+                "reps": reps,
+                "vlStop": vl_stop,
+                "targetVelocity": None if velocity is None else round(velocity, 3),
+                "e1rm": round(week_e1rm, 1),
+                "deload": deload,
+            })
+        return {"plan": plan, "profile": profile.summary() if profile else None}
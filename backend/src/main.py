@@ -1,4 +1,5 @@
 import os
+import asyncio
 import signal
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Query
@@ -11,7 +12,14 @@ import uvicorn
 
 from live_gateway import LiveGateway
 from calculation_service import CalculationService
-from shorts_api import ShortsAPI
+from dsp_executor import DSPExecutor
+from rom_baseline_store import RomBaselineStore
+from history_store import HistoryStore, parse_day
+from load_velocity import LoadVelocityEngine
+from coach_rules import set_features
+from shorts_api import ShortsAPI, create_http_client
+from shorts_curation import ShortsCurationService
+from video_index import VideoIndex
 
 # Load environment variables
 load_dotenv()
@@ -39,18 +47,39 @@ sio = socketio.AsyncServer(
 # Services (initialized after app creation)
 calculation_service = None
 shorts_api = None
+shorts_curation = None
 live_gateway = None
+history_store = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle manager for startup and shutdown events"""
-    global calculation_service, shorts_api, live_gateway
+    global calculation_service, shorts_api, shorts_curation, live_gateway, history_store
 
     # Startup
     calculation_service = CalculationService()
-    shorts_api = ShortsAPI()
-    live_gateway = LiveGateway(sio, calculation_service)
+    dsp = DSPExecutor(
+        workers=int(os.getenv("DSP_WORKERS", "4")),
+        mode=os.getenv("DSP_MODE", "thread"),
+        max_queue=int(os.getenv("DSP_MAX_QUEUE", "32")),
+        policy=os.getenv("DSP_POLICY", "coalesce"),
+    )
+    db_path = os.getenv("DATA_DB_PATH", "gym_scroller.db")
+    rom_store = RomBaselineStore(path=db_path)
+    history_store = HistoryStore(path=db_path, bank=calculation_service.profiles)
+    load_velocity = LoadVelocityEngine(bank=calculation_service.profiles)
+    replayed = load_velocity.bootstrap(history_store.set_velocities())
+    live_gateway = LiveGateway(sio, calculation_service, dsp, rom_store, history_store, load_velocity)
+
+    # One pooled client and one video metadata index for all outbound YouTube calls
+    http_client = create_http_client()
+    video_index = VideoIndex(path=db_path)
+    video_index_task = asyncio.create_task(video_index.run_writer())
+    shorts_api = ShortsAPI(http=http_client, index=video_index)
+    shorts_curation = ShortsCurationService(shorts_api.api_key, quota=shorts_api.quota, http=http_client,
+                                            index=video_index, fallback=shorts_api.curated_queue)
+    shorts_prefetch_task = asyncio.create_task(shorts_curation.run_prefetch())
 
     # Start background tasks (mock events for demo)
     live_gateway.start_background_tasks()
@@ -58,11 +87,19 @@ async def lifespan(app: FastAPI):
     print("🚀 Server running")
     print("📊 WebSocket gateway ready")
     print("🎬 Shorts curation service ready")
+    print(f"🧮 DSP executor ready ({dsp.mode} x{dsp.workers}, {dsp.policy})")
+    print(f"📈 Load-velocity profiles ready ({len(load_velocity.profiles)} from {replayed} sets)")
 
     yield
 
     # Shutdown
     await live_gateway.cleanup()
+    shorts_prefetch_task.cancel()
+    await asyncio.gather(shorts_prefetch_task, return_exceptions=True)
+    await shorts_api.cache.close()
+    await http_client.aclose()
+    video_index_task.cancel()  # final flush of the video index
+    await asyncio.gather(video_index_task, return_exceptions=True)
     print("Server shutdown complete")
 
 
@@ -93,16 +130,18 @@ class HistoryAggregateRequest(BaseModel):
     programType: str
     startDate: str
     endDate: str
+    athleteId: str = "default"  # live session key, e.g. "athlete:42" or "device:3"
 
 
 class AICoachRequest(BaseModel):
-    recentSets: List[Any]
+    recentSets: List[Any]  # set summaries, oldest first
     context: Optional[str] = None
+    sessionId: Optional[str] = None  # tips already given in this session aren't repeated
 
 
 class AIPlanRequest(BaseModel):
-    currentStats: dict
-    goals: dict
+    currentStats: dict  # athleteId, lift/exerciseId, optional e1rm (used until there is velocity data)
+    goals: dict         # programType, optional targetE1rm
     weeks: int
 
 
@@ -113,10 +152,32 @@ async def health():
     return {"status": "ok", "timestamp": int(os.times().elapsed * 1000)}
 
 
+@app.get("/api/dsp/metrics")
+async def dsp_metrics():
+    """Per-session DSP queue depth, drops and latency"""
+    return live_gateway.dsp.metrics()
+
+
+@app.get("/api/stream/stats")
+async def stream_stats():
+    """Per-session sequence tracking: loss, reorder, duplicate and gap counters"""
+    return live_gateway.stream_stats()
+
+
+@app.get("/api/telemetry")
+async def get_telemetry(since: Optional[int] = Query(default=None, ge=0), room: Optional[str] = None):
+    """Latest session's accel/velocity/position window, optionally in `room` (pass `next` back as `since`)"""
+    return live_gateway.telemetry_payload(since, packed=False, room=f"workout:{room}" if room else None)
+
+
 @app.get("/api/shorts/queue")
 async def get_shorts_queue(count: int = Query(default=10, ge=1, le=50)):
-    """Get curated shorts queue"""
+    """Get curated shorts queue (from the prefetched pool; hand-picked list without an API key)"""
     try:
+        if shorts_curation.api_key:
+            queue = await shorts_curation.get_curated_queue(count)
+            if queue:
+                return {"queue": queue}
         result = await shorts_api.get_curated_queue(count)
         return result.model_dump()
     except Exception as error:
@@ -124,6 +185,12 @@ async def get_shorts_queue(count: int = Query(default=10, ge=1, le=50)):
         raise HTTPException(status_code=500, detail="Failed to fetch shorts queue")
 
 
+@app.get("/api/shorts/stats")
+async def shorts_stats():
+    """Discovery cache hit rate, prefetch pool and YouTube quota spent today"""
+    return {**shorts_api.stats(), "pool": shorts_curation.stats()}
+
+
 @app.get("/api/shorts/discover")
 async def discover_shorts(
     q: str = Query(default="strength training"),
@@ -140,31 +207,45 @@ async def discover_shorts(
 
 @app.post("/api/history/aggregate")
 async def aggregate_history(request: HistoryAggregateRequest):
-    """Aggregate workout history"""
-    # TODO: Implement history aggregation
-    return {
-        "vlDistribution": [],
-        "speedAtLoad": [],
-        "trends": [],
-    }
+    """VL distribution, speed-at-load regression and weekly trends for one exercise"""
+    try:
+        start_day, end_day = parse_day(request.startDate), parse_day(request.endDate)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid date: {e}")
+    program = None if request.programType in ("", "all") else request.programType
+    return await asyncio.to_thread(
+        history_store.aggregate, request.athleteId, request.exerciseId, program, start_day, end_day
+    )
 
 
 @app.post("/api/ai/coach")
 async def ai_coach(request: AICoachRequest):
-    """Get AI coaching tip"""
-    # TODO: Implement AI coaching tip
+    """Ranked coaching tips for the recent sets, from the compiled rule table"""
+    tips = calculation_service.coach.rank(set_features(request.recentSets), request.sessionId)
     return {
-        "tip": "Focus on maintaining consistent bar speed throughout the set.",
+        "tip": tips[0]["tip"] if tips else "Log a set to get coaching tips.",
+        "tips": tips,
     }
 
 
 @app.post("/api/ai/plan")
 async def ai_plan(request: AIPlanRequest):
-    """Generate AI training plan"""
-    # TODO: Implement AI plan generation
-    return {
-        "plan": [],
-    }
+    """Weekly progression from the athlete's load-velocity profile"""
+    stats, goals = request.currentStats, request.goals
+    lift = stats.get("lift") or stats.get("exerciseId")
+    if not lift:
+        raise HTTPException(status_code=422, detail="currentStats.lift is required")
+    try:
+        return live_gateway.load_velocity.plan(
+            athlete=stats.get("athleteId", "default"),
+            lift=lift,
+            weeks=request.weeks,
+            program=goals.get("programType", "strength"),
+            e1rm=stats.get("e1rm"),
+            target_e1rm=goals.get("targetE1rm"),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 # Graceful shutdown handler
@@ -0,0 +1,93 @@
+import numpy as np
+from typing import Dict, Any, Union
+
+from calculation_service import RepEvent
+
+
+# Plot sections of RepEvent.extras that hold per-sample arrays
+_PLOT_SECTIONS = ("raw_plot", "norm_plot")
+
+
+def pack_arrays(arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """
+    Pack named 1-D arrays into one little-endian float32 buffer.
+
+    Returns {"dtype": "float32", "layout": {name: [offset, length]}, "buffer": bytes}.
+    Socket.IO ships `bytes` as a binary attachment, so the client gets the
+    samples without JSON number parsing (Float32Array(buffer, offset * 4, length)).
+    The same array object under several names is stored once.
+    """
+    layout: Dict[str, list] = {}
+    seen: Dict[int, list] = {}
+    chunks = []
+    offset = 0
+    for name, arr in arrays.items():
+        if id(arr) in seen:
+            layout[name] = seen[id(arr)]
+            continue
+        a = np.ascontiguousarray(arr, dtype="<f4").ravel()
+        layout[name] = seen[id(arr)] = [offset, int(a.size)]
+        chunks.append(a)
+        offset += a.size
+    buf = np.concatenate(chunks).tobytes() if chunks else b""
+    return {"dtype": "float32", "layout": layout, "buffer": buf}
+
+
+def unpack_arrays(packed: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Inverse of pack_arrays; returns read-only views into the buffer (no copy)."""
+    data = np.frombuffer(packed["buffer"], dtype="<f4")
+    return {name: data[off:off + n] for name, (off, n) in packed["layout"].items()}
+
+
+def rep_event_to_wire(ev: RepEvent) -> Dict[str, Any]:
+    """
+    Socket payload for a RepEvent. Scalar extras stay JSON; plot arrays (present
+    only at detail="full") move into one packed float32 attachment under "plots",
+    keyed "<section>.<name>" (e.g. "norm_plot.user_v").
+    """
+    payload: Dict[str, Any] = {
+        "id": ev.id,
+        "valid": ev.valid,
+        "metrics": {
+            "tut": ev.metrics.tut,
+            "speed": ev.metrics.speed,
+            "vl": ev.metrics.vl,
+            "romHit": ev.metrics.rom_hit,
+            "displacement": ev.metrics.displacement,
+        },
+        "ts": ev.ts,
+    }
+    if not ev.extras:
+        return payload
+
+    extras: Dict[str, Any] = {}
+    arrays: Dict[str, np.ndarray] = {}
+    for key, value in ev.extras.items():
+        if key in _PLOT_SECTIONS and isinstance(value, dict):
+            rest = {}
+            for name, item in value.items():
+                if isinstance(item, np.ndarray):
+                    arrays[f"{key}.{name}"] = item
+                else:
+                    rest[name] = item
+            if rest:
+                extras[key] = rest
+        else:
+            extras[key] = value
+    payload["extras"] = extras
+    if arrays:
+        payload["plots"] = pack_arrays(arrays)
+    return payload
+
+
+def plots_from_wire(payload: Dict[str, Any]) -> Dict[str, Dict[str, Union[np.ndarray, Any]]]:
+    """Rebuild {"raw_plot": {...}, "norm_plot": {...}} from a wire payload."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for section, rest in (payload.get("extras") or {}).items():
+        if section in _PLOT_SECTIONS:
+            out.setdefault(section, {}).update(rest)
+    if "plots" in payload:
+        for name, arr in unpack_arrays(payload["plots"]).items():
+            section, field = name.split(".", 1)
+            out.setdefault(section, {})[field] = arr
+    return out
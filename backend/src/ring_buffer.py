@@ -0,0 +1,82 @@
+import numpy as np
+from typing import Tuple
+
+
+class RingBuffer:
+    """
+    Fixed-capacity, multi-channel ring buffer backed by one preallocated array.
+
+    Samples are written column-wise (one value per channel) and addressed by an
+    absolute sample index that keeps counting after old samples are overwritten,
+    so callers can remember "where" something started without tracking wrap-around.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype=float):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = int(capacity)
+        self.channels = int(channels)
+        self._data = np.zeros((self.channels, self.capacity), dtype=dtype)
+        self.total = 0  # absolute index of the next sample to be written
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    @property
+    def oldest(self) -> int:
+        """Absolute index of the oldest sample still held."""
+        return self.total - len(self)
+
+    def extend(self, *columns) -> None:
+        """Append one array per channel (all the same length)."""
+        if len(columns) != self.channels:
+            raise ValueError(f"expected {self.channels} channels, got {len(columns)}")
+        block = np.vstack([np.asarray(c, dtype=self._data.dtype).ravel() for c in columns])
+        n = block.shape[1]
+        if n == 0:
+            return
+        if n >= self.capacity:
+            # Only the newest `capacity` samples survive
+            block = block[:, -self.capacity:]
+            start = (self.total + n - self.capacity) % self.capacity
+            first = self.capacity - start
+            self._data[:, start:] = block[:, :first]
+            self._data[:, :start] = block[:, first:]
+        else:
+            start = self.total % self.capacity
+            first = min(n, self.capacity - start)
+            self._data[:, start:start + first] = block[:, :first]
+            if first < n:
+                self._data[:, :n - first] = block[:, first:]
+        self.total += n
+
+    def since(self, abs_index: int) -> Tuple[int, np.ndarray]:
+        """
+        Chronological copy of every held sample from `abs_index` onward.
+        Returns (first_abs_index, array[channels, n]); the start is clamped to
+        the oldest sample if `abs_index` has already been overwritten.
+        """
+        start = max(int(abs_index), self.oldest)
+        n = self.total - start
+        if n <= 0:
+            return self.total, np.empty((self.channels, 0), dtype=self._data.dtype)
+        i0 = start % self.capacity
+        if i0 + n <= self.capacity:
+            return start, self._data[:, i0:i0 + n].copy()
+        first = self.capacity - i0
+        return start, np.concatenate([self._data[:, i0:], self._data[:, :n - first]], axis=1)
+
+    def tail(self, n: int) -> np.ndarray:
+        """Chronological copy of the newest `n` samples (fewer if not yet filled)."""
+        return self.since(self.total - int(n))[1]
+
+    def view(self) -> np.ndarray:
+        """Chronological copy of everything held."""
+        return self.since(self.oldest)[1]
+
+    def values(self, channel: int) -> np.ndarray:
+        """Unordered view of one channel's held samples (for order-free reductions)."""
+        return self._data[channel, :len(self)]
+
+    def clear(self) -> None:
+        self.total = 0
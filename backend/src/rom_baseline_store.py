@@ -0,0 +1,196 @@
+import asyncio
+import bisect
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+class RomEstimator:
+    """
+    Robust running ROM baseline: a high percentile of the last `window` reps.
+
+    A single outlier rep only moves the baseline while it is inside the window
+    (and, once `min_samples` reps are in, it is first clipped to
+    `outlier_ratio` × the current baseline). Reading `value` is O(1); an update
+    is O(window) on a small sorted list. Updates come from DSP worker threads
+    while the store's writer snapshots the window, so both take `_lock`.
+    """
+
+    def __init__(self, window: int = 50, percentile: float = 0.9,
+                 min_samples: int = 5, outlier_ratio: float = 1.5):
+        self.window = int(window)
+        self.percentile = float(percentile)
+        self.min_samples = int(min_samples)
+        self.outlier_ratio = float(outlier_ratio)
+        self._recent: Deque[float] = deque()
+        self._sorted: List[float] = []
+        self.value: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def update(self, displacement_m: float) -> float:
+        with self._lock:
+            return self._update(float(displacement_m))
+
+    def _update(self, d: float) -> float:
+        if self.value is not None and len(self._recent) >= self.min_samples:
+            d = min(d, self.outlier_ratio * self.value)
+        if len(self._recent) == self.window:
+            old = self._recent.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._recent.append(d)
+        bisect.insort(self._sorted, d)
+        self.value = self._sorted[int(round(self.percentile * (len(self._sorted) - 1)))]
+        return self.value
+
+    def samples(self) -> np.ndarray:
+        return self.snapshot()[1]
+
+    def snapshot(self) -> Tuple[Optional[float], np.ndarray]:
+        """(baseline, window samples), consistent with each other."""
+        with self._lock:
+            return self.value, np.array(self._recent, dtype=float)
+
+    def load(self, samples: np.ndarray):
+        """Restore a window saved by `samples()` (replayed without outlier clipping)."""
+        recent = deque(float(x) for x in samples[-self.window:])
+        with self._lock:
+            self._recent = recent
+            self._sorted = sorted(recent)
+            self.value = (self._sorted[int(round(self.percentile * (len(self._sorted) - 1)))]
+                          if self._sorted else None)
+
+
+class RomBaselines:
+    """
+    Per-lift ROM baselines for one athlete. This is the `rom_baseline` table
+    CalculationService reads (`get`) and feeds (`update`) for every rep.
+    """
+
+    def __init__(self, athlete: Optional[str] = None,
+                 on_update: Optional[Callable[[str, str], None]] = None, **estimator_kwargs):
+        self.athlete = athlete
+        self.on_update = on_update
+        self.estimator_kwargs = estimator_kwargs
+        self.estimators: Dict[str, RomEstimator] = {}
+
+    def get(self, lift: str, default: Optional[float] = None) -> Optional[float]:
+        est = self.estimators.get(lift)
+        return est.value if est is not None else default
+
+    def update(self, lift: str, displacement_m: float) -> float:
+        est = self.estimators.get(lift)
+        if est is None:
+            est = self.estimators[lift] = RomEstimator(**self.estimator_kwargs)
+        value = est.update(displacement_m)
+        if self.on_update is not None:
+            self.on_update(self.athlete, lift)
+        return value
+
+    def as_dict(self) -> Dict[str, float]:
+        return {lift: est.value for lift, est in list(self.estimators.items()) if est.value is not None}
+
+
+class RomBaselineStore:
+    """
+    ROM baselines keyed by (athlete, lift), held in memory and written behind
+    to SQLite.
+
+    `for_athlete()` hands out the athlete's live RomBaselines; updates only mark
+    the (athlete, lift) dirty, and `flush()` (run every `flush_interval` by
+    `run_writer()`, and at shutdown) saves the dirty rolling windows. Updates
+    may come from DSP worker threads, so bookkeeping is under a lock.
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 5.0,
+                 **estimator_kwargs):
+        self.path = path  # None = memory only
+        self.flush_interval = float(flush_interval)
+        self.estimator_kwargs = estimator_kwargs
+        self._athletes: Dict[str, RomBaselines] = {}
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self.writes = 0
+        if self.path:
+            self._load()
+
+    def for_athlete(self, athlete: str) -> RomBaselines:
+        baselines = self._athletes.get(athlete)
+        if baselines is None:
+            with self._lock:
+                baselines = self._athletes.get(athlete)
+                if baselines is None:
+                    baselines = self._athletes[athlete] = RomBaselines(
+                        athlete, on_update=self._mark_dirty, **self.estimator_kwargs)
+        return baselines
+
+    def get(self, athlete: str, lift: str) -> Optional[float]:
+        baselines = self._athletes.get(athlete)
+        return baselines.get(lift) if baselines is not None else None
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {athlete: b.as_dict() for athlete, b in list(self._athletes.items())}
+
+    # ---- Persistence ----
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rom_baselines ("
+            " athlete TEXT NOT NULL, lift TEXT NOT NULL,"
+            " baseline_m REAL, samples BLOB NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (athlete, lift))"
+        )
+        return conn
+
+    def _load(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT athlete, lift, samples FROM rom_baselines").fetchall()
+        for athlete, lift, blob in rows:
+            est = RomEstimator(**self.estimator_kwargs)
+            est.load(np.frombuffer(blob, dtype="<f4"))
+            self.for_athlete(athlete).estimators[lift] = est
+        if rows:
+            print(f"📐 Loaded {len(rows)} ROM baselines from {self.path}")
+
+    def _mark_dirty(self, athlete: str, lift: str):
+        with self._lock:
+            self._dirty.add((athlete, lift))
+
+    def flush(self) -> int:
+        """Write dirty baselines to SQLite; returns how many rows were written."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty or not self.path:
+            return 0
+        try:
+            rows = []
+            for athlete, lift in dirty:
+                value, samples = self._athletes[athlete].estimators[lift].snapshot()
+                rows.append((athlete, lift, value, samples.astype("<f4").tobytes(), time.time()))
+            with self._connect() as conn:
+                conn.executemany("INSERT OR REPLACE INTO rom_baselines VALUES (?, ?, ?, ?, ?)", rows)
+        except Exception:
+            with self._lock:
+                self._dirty |= dirty  # retry on the next flush
+            raise
+        self.writes += len(rows)
+        return len(rows)
+
+    async def run_writer(self):
+        """Background write-behind loop; flushes once more when cancelled."""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    print(f"❌ Error saving ROM baselines: {str(e)}")
+        except asyncio.CancelledError:
+            self.flush()
+            raise
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from calculation_service import RepEvent
+
+
+MAX_RIR = 10.0
+
+
+@dataclass
+class RunningSet:
+    """
+    Live state of the set in progress, updated in O(1) per rep (no pass over
+    earlier reps).
+
+    VL follows the set summary: (first rep speed - slowest so far) / first.
+    RIR comes from a running least-squares line through (rep number, speed):
+    reps left until the fitted speed falls to the lift's minimum velocity
+    threshold (MVT).
+    """
+    mvt: float = 0.25
+    reps: int = 0
+    first_speed: float = 0.0
+    best_speed: float = 0.0
+    min_speed: float = 0.0
+    rom_hits: int = 0
+    tut: float = 0.0
+    # least-squares sums over (k, speed), k = 1..reps
+    s_speed: float = 0.0
+    s_k_speed: float = 0.0
+
+    def add(self, rep: RepEvent) -> float:
+        """Fold in one rep and return its VL (%) relative to the first rep."""
+        v = float(rep.metrics.speed)
+        self.reps += 1
+        if self.reps == 1:
+            self.first_speed = self.best_speed = self.min_speed = v
+        else:
+            self.best_speed = max(self.best_speed, v)
+            self.min_speed = min(self.min_speed, v)
+        self.rom_hits += bool(rep.metrics.rom_hit)
+        self.tut += float(rep.metrics.tut)
+        self.s_speed += v
+        self.s_k_speed += self.reps * v
+        return self._loss(v)
+
+    def _loss(self, v: float) -> float:
+        return (self.first_speed - v) / self.first_speed * 100 if self.first_speed > 0 else 0.0
+
+    @property
+    def vl(self) -> float:
+        return self._loss(self.min_speed)
+
+    def rir(self) -> Optional[float]:
+        """Reps in reserve from the fitted speed decline (None until there are 2 reps)."""
+        n = self.reps
+        if n < 2:
+            return None
+        # Σk and Σk² over 1..n in closed form
+        s_k = n * (n + 1) / 2
+        s_kk = n * (n + 1) * (2 * n + 1) / 6
+        slope = (n * self.s_k_speed - s_k * self.s_speed) / (n * s_kk - s_k * s_k)
+        v_now = (self.s_speed - slope * s_k) / n + slope * n  # fitted speed of the latest rep
+        if v_now <= self.mvt:
+            return 0.0
+        if slope >= 0:  # no slowdown yet
+            return MAX_RIR
+        return min(MAX_RIR, (v_now - self.mvt) / -slope)
+
+    def update(self) -> Dict[str, Any]:
+        """`setUpdate` payload."""
+        rir = self.rir()
+        return {
+            "repsCompleted": self.reps,
+            "avgSpeed": round(self.s_speed / self.reps, 3) if self.reps else 0.0,
+            "firstSpeed": round(self.first_speed, 3),
+            "bestSpeed": round(self.best_speed, 3),
+            "vl": round(self.vl, 1),
+            "romHitRate": round(self.rom_hits / self.reps * 100, 1) if self.reps else 0.0,
+            "tut": round(self.tut, 2),
+            "rir": None if rir is None else round(rir, 1),
+            "ts": int(datetime.now().timestamp() * 1000),
+        }
@@ -0,0 +1,135 @@
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_SEQ_MOD = 1 << 32
+
+
+def _seq_diff(a: int, b: int) -> int:
+    """a - b in u32 serial-number arithmetic (handles wrap-around)."""
+    d = (a - b) % _SEQ_MOD
+    return d - _SEQ_MOD if d >= _SEQ_MOD // 2 else d
+
+
+@dataclass
+class StreamStats:
+    received: int = 0
+    delivered: int = 0
+    duplicates: int = 0   # replays / retransmits dropped
+    reordered: int = 0    # frames that arrived late but in time to fill their slot
+    lost: int = 0         # frames given up on
+    gaps: int = 0         # runs of lost frames
+    restarts: int = 0     # sequence jumped backwards (device reboot)
+
+
+class SequenceTracker:
+    """
+    Puts one device's frames back in sequence order.
+
+    Frames ahead of the expected seq wait in a small reorder buffer; once more
+    than `reorder_window` are waiting, the missing ones are declared lost and
+    delivery resumes at the oldest buffered frame. Frames behind the expected
+    seq (replays after a reconnect, retransmits) are dropped as duplicates,
+    unless the device must have restarted its counter: the frame is so far
+    behind (> `restart_after`), or its timestamp shows it is not a replay
+    (a different time than the frame delivered under the same seq, or older
+    than the start of the current stream).
+
+    push() returns (missing, item) pairs in order, where `missing` is the
+    number of frames lost immediately before `item`.
+    """
+
+    def __init__(self, reorder_window: int = 4, restart_after: int = 1024):
+        self.reorder_window = int(reorder_window)
+        self.restart_after = int(restart_after)
+        self.stats = StreamStats()
+        self._expected: Optional[int] = None
+        self._pending: Dict[int, Any] = {}
+        self._first: Optional[Tuple[int, Optional[float]]] = None  # (seq, ts) the current stream started at
+        self._seen_ts: Dict[int, float] = {}  # ts of the last `restart_after` frames delivered, by seq
+
+    def push(self, seq: int, item: Any, ts: Optional[float] = None) -> List[Tuple[int, Any]]:
+        """`ts`: the frame's device timestamp (optional; lets a reboot be told from a replay)."""
+        self.stats.received += 1
+        seq = int(seq) % _SEQ_MOD
+        if self._expected is None:
+            self._start(seq, ts)
+
+        d = _seq_diff(seq, self._expected)
+        if d < 0:
+            if -d <= self.restart_after and not self._restarted(seq, ts):
+                self.stats.duplicates += 1
+                return []
+            # Counter went back: new stream from this device
+            self.stats.restarts += 1
+            out = self.flush()
+            self._start(seq, ts)
+            return out + self._deliver(seq, item, ts=ts)
+        if seq in self._pending:
+            self.stats.duplicates += 1
+            return []
+        if d == 0:
+            if self._pending:
+                self.stats.reordered += 1
+            return self._deliver(seq, item, ts=ts)
+
+        self._pending[seq] = (item, ts)
+        if len(self._pending) > self.reorder_window:
+            return self._skip_to_oldest()
+        return []
+
+    def flush(self) -> List[Tuple[int, Any]]:
+        """Release everything buffered (end of stream), counting the holes as lost."""
+        out: List[Tuple[int, Any]] = []
+        while self._pending:
+            out.extend(self._skip_to_oldest())
+        return out
+
+    def _start(self, seq: int, ts: Optional[float]):
+        self._expected = seq
+        self._first = (seq, ts)
+        self._seen_ts.clear()
+
+    def _restarted(self, seq: int, ts: Optional[float]) -> bool:
+        """Whether a frame behind the expected seq comes from a rebooted device rather than a replay"""
+        if ts is None:
+            return False
+        seen = self._seen_ts.get(seq)
+        if seen is not None:
+            return ts != seen
+        # Never delivered: a late frame of this stream is fine, one from before it started is not
+        first_seq, first_ts = self._first
+        return (first_ts is not None and ts < first_ts
+                and _seq_diff(seq, first_seq) < -self.reorder_window)
+
+    def _remember(self, seq: int, ts: Optional[float]):
+        if ts is None:
+            return
+        self._seen_ts[seq] = ts
+        if len(self._seen_ts) > self.restart_after:
+            del self._seen_ts[next(iter(self._seen_ts))]  # oldest delivered
+
+    def _deliver(self, seq: int, item: Any, missing: int = 0, ts: Optional[float] = None) -> List[Tuple[int, Any]]:
+        out = [(missing, item)]
+        self.stats.delivered += 1
+        self._remember(seq, ts)
+        nxt = (seq + 1) % _SEQ_MOD
+        while nxt in self._pending:
+            item, ts = self._pending.pop(nxt)
+            out.append((0, item))
+            self.stats.delivered += 1
+            self._remember(nxt, ts)
+            nxt = (nxt + 1) % _SEQ_MOD
+        self._expected = nxt
+        return out
+
+    def _skip_to_oldest(self) -> List[Tuple[int, Any]]:
+        oldest = min(self._pending, key=lambda s: _seq_diff(s, self._expected))
+        missing = _seq_diff(oldest, self._expected)
+        self.stats.lost += missing
+        self.stats.gaps += 1
+        item, ts = self._pending.pop(oldest)
+        return self._deliver(oldest, item, missing, ts)
+
+    def summary(self) -> Dict[str, Any]:
+        return {**asdict(self.stats), "expected": self._expected, "buffered": len(self._pending)}
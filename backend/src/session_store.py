@@ -0,0 +1,208 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from calculation_service import DETAIL_SUMMARY, RepEvent
+from kinematics import OnlineIntegrator
+from rep_wire import pack_arrays
+from ring_buffer import RingBuffer
+from running_set import RunningSet
+from sequence_tracker import SequenceTracker
+
+
+TELEMETRY_CHANNELS = ("t", "accel", "velocity", "position")
+
+
+class SessionTelemetry:
+    """
+    Live telemetry of one session: preallocated rings of t, accel, velocity
+    and position, fed by the session's own integrator so athletes never share
+    velocity state or wipe each other's window.
+    """
+
+    def __init__(self, capacity: int = 500):
+        self.ring = RingBuffer(capacity, channels=len(TELEMETRY_CHANNELS))
+        # Running velocity/position; ZUPT clamps velocity while the bar is at rest
+        self.integrator = OnlineIntegrator(zupt_var=0.05)
+        self.started: Optional[datetime] = None
+        self.pushed = 0  # absolute index of the next sample to push
+
+    def add(self, accel: float, now: Optional[datetime] = None):
+        """Integrate one acceleration sample (O(1)) and append it to the rings"""
+        now = now or datetime.now()
+        if self.started is None:
+            self.started = now
+        t = (now - self.started).total_seconds()
+        v, pos = self.integrator.update(t, accel)
+        self.ring.extend([t], [accel], [v], [pos])
+
+    def payload(self, since: Optional[int] = None, packed: bool = True) -> Dict[str, Any]:
+        """
+        Samples held from absolute index `since` (default: whole window).
+        Socket payloads carry the series as one packed float32 attachment (see
+        rep_wire.pack_arrays); packed=False gives plain lists for JSON. Pass
+        `next` back as `since` to receive only newer samples.
+        """
+        start, block = self.ring.since(self.ring.oldest if since is None else int(since))
+        series = dict(zip(TELEMETRY_CHANNELS, block))
+        return {
+            "start": start,
+            "next": self.ring.total,
+            "series": pack_arrays(series) if packed else {k: v.tolist() for k, v in series.items()},
+        }
+
+    def reset(self):
+        """Start a fresh window and integration (new set)"""
+        self.ring.clear()
+        self.integrator.reset()
+        self.started = None
+        self.pushed = 0
+
+
+@dataclass
+class WorkoutSession:
+    """
+    Everything a live set needs that must outlive one socket connection.
+
+    The segmenter itself (filter state, open island, ROM baselines) lives on
+    the session's DSP lane under `key`, so it survives along with this record.
+    """
+    key: str                     # stable id: "athlete:<id>", "device:<id>" or "sid:<sid>"
+    room: str
+    lift: str = "bench"
+    fs: float = 200.0
+    load_kg: Optional[float] = None
+    program: str = "strength"
+    detail: str = DETAIL_SUMMARY  # rep payload level; "full" adds the float32 plot attachment
+    set_active: bool = False
+    set_started_at: Optional[datetime] = None
+    reps: List[RepEvent] = field(default_factory=list)
+    running: RunningSet = field(default_factory=RunningSet)  # live VL / RIR for the set in progress
+    trackers: Dict[str, SequenceTracker] = field(default_factory=dict)  # per device stream
+    telemetry: SessionTelemetry = field(default_factory=SessionTelemetry)
+    sids: Set[str] = field(default_factory=set)       # attached sockets
+    seen_sids: Dict[str, None] = field(default_factory=dict)  # recent sockets, oldest first (prev_sid resumes)
+    detached_at: Optional[float] = None  # monotonic time the last socket left
+    resumes: int = 0
+
+    @property
+    def athlete(self) -> str:
+        """Id that history is recorded under (socket-scoped sessions share "default")."""
+        return "default" if self.key.startswith("sid:") else self.key
+
+    def tracker(self, stream_key: str) -> SequenceTracker:
+        tracker = self.trackers.get(stream_key)
+        if tracker is None:
+            tracker = self.trackers[stream_key] = SequenceTracker()
+        return tracker
+
+
+class SessionStore:
+    """
+    Workout sessions keyed by a stable device/athlete id.
+
+    Sessions with no attached socket are kept for `ttl_s` (the reconnect grace
+    window) and then evicted by `sweep()`. Beyond `max_sessions`, the least
+    recently used detached sessions are evicted first; sessions with a live
+    socket are never evicted. `on_evict` is called for every eviction.
+
+    Each session remembers its last `max_seen_sids` sockets for `?prev_sid=`
+    resumes, so a session that reconnects all day doesn't grow the sid map.
+    """
+
+    def __init__(self, ttl_s: float = 120.0, max_sessions: int = 512, max_seen_sids: int = 8,
+                 on_evict: Optional[Callable[[WorkoutSession], Any]] = None):
+        self.ttl_s = float(ttl_s)
+        self.max_sessions = int(max_sessions)
+        self.max_seen_sids = int(max_seen_sids)
+        self.on_evict = on_evict
+        self._sessions: "OrderedDict[str, WorkoutSession]" = OrderedDict()  # LRU order
+        self._sid_keys: Dict[str, str] = {}  # recent sid → session key (kept for prev_sid resumes)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self):
+        return iter(list(self._sessions.values()))
+
+    def get(self, key: str) -> Optional[WorkoutSession]:
+        return self._sessions.get(key)
+
+    def for_sid(self, sid: str) -> Optional[WorkoutSession]:
+        key = self._sid_keys.get(sid)
+        return self._sessions.get(key) if key is not None else None
+
+    def key_for_sid(self, sid: str) -> Optional[str]:
+        return self._sid_keys.get(sid)
+
+    def attach(self, key: str, sid: str, room: str) -> Tuple[WorkoutSession, bool]:
+        """Bind a socket to the session `key`; returns (session, resumed)."""
+        session = self._sessions.get(key)
+        resumed = session is not None
+        if session is None:
+            session = WorkoutSession(key=key, room=room)
+            self._sessions[key] = session
+        elif not session.sids:
+            session.resumes += 1
+        session.sids.add(sid)
+        session.detached_at = None
+        self._remember_sid(session, sid)
+        self._sessions.move_to_end(key)
+        self._evict_over_capacity()
+        return session, resumed
+
+    def _remember_sid(self, session: WorkoutSession, sid: str):
+        if self._sid_keys.get(sid, session.key) != session.key:
+            previous = self.detach(sid)  # taken over by this session
+            if previous is not None:
+                previous.seen_sids.pop(sid, None)
+        session.seen_sids.pop(sid, None)
+        session.seen_sids[sid] = None
+        self._sid_keys[sid] = session.key
+        # Forget the oldest detached sockets past the cap
+        excess = len(session.seen_sids) - self.max_seen_sids
+        for old in [seen for seen in session.seen_sids if seen not in session.sids][:max(excess, 0)]:
+            del session.seen_sids[old]
+            if self._sid_keys.get(old) == session.key:
+                del self._sid_keys[old]
+
+    def touch(self, session: WorkoutSession):
+        self._sessions.move_to_end(session.key)
+
+    def detach(self, sid: str) -> Optional[WorkoutSession]:
+        """Unbind a socket; the session stays resumable for `ttl_s`."""
+        session = self.for_sid(sid)
+        if session is None:
+            return None
+        session.sids.discard(sid)
+        if not session.sids:
+            session.detached_at = time.monotonic()
+        return session
+
+    def sweep(self, now: Optional[float] = None) -> List[WorkoutSession]:
+        """Evict sessions detached for longer than the grace window."""
+        now = time.monotonic() if now is None else now
+        expired = [s for s in self._sessions.values()
+                   if s.detached_at is not None and now - s.detached_at > self.ttl_s]
+        for session in expired:
+            self._evict(session)
+        return expired
+
+    def _evict_over_capacity(self):
+        if len(self._sessions) <= self.max_sessions:
+            return
+        for session in list(self._sessions.values()):  # least recently used first
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if not session.sids:
+                self._evict(session)
+
+    def _evict(self, session: WorkoutSession):
+        self._sessions.pop(session.key, None)
+        for sid in session.seen_sids:
+            if self._sid_keys.get(sid) == session.key:
+                del self._sid_keys[sid]
+        if self.on_evict is not None:
+            self.on_evict(session)
@@ -1,8 +1,42 @@
 import httpx
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 
+from shorts_cache import QueryCache, QuotaTracker, SingleFlight
+from video_index import VIDEO_PARTS, VideoIndex
+
+YOUTUBE_API_BASE = os.getenv("YOUTUBE_API_BASE", "https://www.googleapis.com/youtube/v3")
+
+# Outbound HTTP: fail fast on connect, allow a slow search response, cap concurrency
+HTTP_TIMEOUT = httpx.Timeout(connect=3.0, read=8.0, write=5.0, pool=5.0)
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Pooled keep-alive client for YouTube Data API calls. One per application
+    (created in main.py's lifespan and shared by the shorts services), so
+    repeat calls reuse warm connections instead of a new DNS/TCP/TLS handshake.
+    HTTP/2 when the optional `h2` package is installed (httpx[http2]).
+    """
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    return httpx.AsyncClient(http2=http2, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+
+
+async def videos_list(client: httpx.AsyncClient, api_key: str, video_ids, part: str) -> List[Dict[str, Any]]:
+    """One Videos: list call (up to 50 ids); raises on an API error."""
+    params = {"part": part, "id": ",".join(video_ids), "key": api_key}
+    response = await client.get(f"{YOUTUBE_API_BASE}/videos", params=params)
+    data = response.json()
+    if "error" in data:
+        raise Exception(f"YouTube API error: {data['error'].get('message')}")
+    return data.get("items", [])
+
 
 class ShortsQueueResponse(BaseModel):
     queue: List[str]
@@ -16,8 +50,18 @@ class ShortsAPI:
     Uses YouTube Data API v3 for discovery (optional) or serves pre-curated lists.
     """
 
-    def __init__(self):
+    def __init__(self, quota: Optional[QuotaTracker] = None, http: Optional[httpx.AsyncClient] = None,
+                 index: Optional[VideoIndex] = None):
         self.api_key = os.getenv("YOUTUBE_API_KEY")  # Server-side only
+        self.http = http  # shared client; one is created on first use if not given
+        self.index = index if index is not None else VideoIndex()  # video metadata already fetched (shared with curation)
+        self.details_flight = SingleFlight()  # concurrent identical Videos: list lookups share one call
+        self.quota = quota or QuotaTracker(int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000")))
+        self.cache = QueryCache(
+            ttl=float(os.getenv("SHORTS_CACHE_TTL", str(15 * 60))),
+            stale_ttl=float(os.getenv("SHORTS_CACHE_STALE_TTL", str(60 * 60))),
+            max_entries=int(os.getenv("SHORTS_CACHE_SIZE", "256")),
+        )
 
         # Pre-curated fitness Shorts (replace with real IDs)
         self.curated_queue = [
@@ -43,65 +87,88 @@ class ShortsAPI:
         """
         Fetch Shorts from YouTube Data API v3 (optional, requires API key)
 
-        Uses Search: list endpoint with type=video & videoDuration=short
-        Then Videos: list to get details
-
-        https://developers.google.com/youtube/v3/docs/search/list
-        https://developers.google.com/youtube/v3/docs/videos/list
+        Results are cached per (query, max_results): repeated queries are served
+        from memory, stale entries are refreshed in the background, and once the
+        daily quota is spent the last known results (or the curated list) are served.
         """
         if not self.api_key:
             print("[ShortsAPI] YouTube API key not configured, returning curated queue")
             return await self.get_curated_queue(max_results)
 
+        key = (" ".join(query.lower().split()), max_results)
         try:
-            async with httpx.AsyncClient() as client:
-                # Step 1: Search for Shorts
-                search_url = "https://www.googleapis.com/youtube/v3/search"
-                search_params = {
-                    "part": "id",
-                    "type": "video",
-                    "videoDuration": "short",  # Filter for Shorts (< 60s)
-                    "q": query,
-                    "maxResults": max_results,
-                    "key": self.api_key,
-                }
-
-                search_response = await client.get(search_url, params=search_params)
-                search_data = search_response.json()
-
-                if "items" not in search_data or not search_data["items"]:
-                    print("[ShortsAPI] No videos found, returning curated queue")
-                    return await self.get_curated_queue(max_results)
-
-                video_ids = [item["id"]["videoId"] for item in search_data["items"]]
-
-                # Step 2: Get video details (optional, to verify they're embeddable)
-                videos_url = "https://www.googleapis.com/youtube/v3/videos"
-                videos_params = {
-                    "part": "status,contentDetails",
-                    "id": ",".join(video_ids),
-                    "key": self.api_key,
-                }
-
-                videos_response = await client.get(videos_url, params=videos_params)
-                videos_data = videos_response.json()
-
-                # Filter for embeddable videos
-                embeddable_ids = [
-                    video["id"]
-                    for video in videos_data.get("items", [])
-                    if video.get("status", {}).get("embeddable", False)
-                ]
-
-                print(f"[ShortsAPI] Fetched {len(embeddable_ids)} embeddable Shorts from YouTube")
-
-                return ShortsQueueResponse(queue=embeddable_ids)
-
+            video_ids = await self.cache.get(key, lambda: self._search_youtube(query, max_results))
         except Exception as error:
             print(f"[ShortsAPI] Error fetching from YouTube: {error}")
             # Fallback to curated queue
             return await self.get_curated_queue(max_results)
 
+        if not video_ids:
+            print("[ShortsAPI] No videos found, returning curated queue")
+            return await self.get_curated_queue(max_results)
+        return ShortsQueueResponse(queue=list(video_ids))
+
+    async def _search_youtube(self, query: str, max_results: int) -> Tuple[str, ...]:
+        """
+        Uses Search: list endpoint with type=video & videoDuration=short
+        Then Videos: list to get details
+
+        https://developers.google.com/youtube/v3/docs/search/list
+        https://developers.google.com/youtube/v3/docs/videos/list
+        """
+        client = self.client
+        # Step 1: Search for Shorts
+        self.quota.spend("search.list")
+        search_params = {
+            "part": "id",
+            "type": "video",
+            "videoDuration": "short",  # Filter for Shorts (< 60s)
+            "q": query,
+            "maxResults": max_results,
+            "key": self.api_key,
+        }
+
+        search_response = await client.get(f"{YOUTUBE_API_BASE}/search", params=search_params)
+        search_data = search_response.json()
+        if "error" in search_data:
+            raise Exception(f"YouTube API error: {search_data['error'].get('message')}")
+
+        video_ids = [item["id"]["videoId"] for item in search_data.get("items", [])]
+        if not video_ids:
+            return ()
+
+        # Step 2: Get video details (to verify they're embeddable Shorts: videoDuration=short
+        # still allows up to 4 min); only ids the index doesn't know yet are sent, 50 per call
+        videos = await self.index.lookup(video_ids, lambda ids: self._video_details(ids, VIDEO_PARTS))
+
+        # Filter for embeddable videos of 60 s or less
+        short_ids = tuple(video.id for video in videos if video.is_short and video.embeddable)
+
+        print(f"[ShortsAPI] Fetched {len(short_ids)} embeddable Shorts from YouTube for {query!r}")
+        return short_ids
+
+    async def _video_details(self, video_ids: List[str], part: str) -> List[Dict[str, Any]]:
+        async def fetch():
+            self.quota.spend("videos.list")
+            return await videos_list(self.client, self.api_key, video_ids, part)
+
+        return await self.details_flight.do((part, tuple(video_ids)), fetch)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self.http is None:
+            self.http = create_http_client()
+        return self.http
+
+    def stats(self) -> Dict[str, Any]:
+        """Discovery cache and quota counters"""
+        return {
+            "cache": self.cache.stats(),
+            "details": self.details_flight.stats(),
+            "index": self.index.stats(),
+            "quota": self.quota.stats(),
+        }
+
     def add_to_curated_queue(self, video_id: str) -> None:
         """
         Add a videoId to the curated queue (for custom curation)
@@ -113,7 +180,7 @@ class ShortsAPI:
         """
         Remove a videoId from the curated queue
         """
-        self.curated_queue = [vid for vid in self.curated_queue if vid != video_id]
+        self.curated_queue[:] = [vid for vid in self.curated_queue if vid != video_id]
 
     def get_curated_queue_size(self) -> int:
         """
@@ -0,0 +1,243 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TZ = ZoneInfo("America/Los_Angeles")  # YouTube quotas reset at midnight Pacific
+except Exception:
+    QUOTA_TZ = timezone.utc
+
+
+# ---------------- Quota ----------------
+# YouTube Data API v3 cost per call, in quota units
+QUOTA_COSTS = {"search.list": 100, "videos.list": 1}
+DAILY_QUOTA = 10_000
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class QuotaTracker:
+    """
+    Local count of YouTube Data API units spent today. Calls are charged before
+    they are made, so a call that would go over the budget is refused here
+    instead of being rejected (or billed) upstream.
+    """
+
+    def __init__(self, daily_limit: int = DAILY_QUOTA, clock: Callable[[], datetime] = None):
+        self.daily_limit = int(daily_limit)
+        self._clock = clock or (lambda: datetime.now(QUOTA_TZ))
+        self.day = self._clock().date()
+        self.used = 0
+        self.calls: Dict[str, int] = {}
+        self.refused = 0
+
+    def _roll(self):
+        today = self._clock().date()
+        if today != self.day:
+            self.day, self.used, self.calls = today, 0, {}
+
+    def can_spend(self, op: str) -> bool:
+        self._roll()
+        return self.used + QUOTA_COSTS.get(op, 1) <= self.daily_limit
+
+    def spend(self, op: str):
+        """Charge one `op` call; raises QuotaExceeded if it would overrun today's budget."""
+        if not self.can_spend(op):
+            self.refused += 1
+            raise QuotaExceeded(f"{op} needs {QUOTA_COSTS.get(op, 1)} units, "
+                                f"{self.remaining} of {self.daily_limit} left today")
+        self.used += QUOTA_COSTS.get(op, 1)
+        self.calls[op] = self.calls.get(op, 0) + 1
+
+    @property
+    def remaining(self) -> int:
+        self._roll()
+        return max(0, self.daily_limit - self.used)
+
+    def stats(self) -> Dict[str, Any]:
+        self._roll()
+        now = self._clock()
+        reset = datetime.combine(self.day + timedelta(days=1), datetime.min.time(), tzinfo=now.tzinfo)
+        return {
+            "day": self.day.isoformat(),
+            "used": self.used,
+            "limit": self.daily_limit,
+            "remaining": self.remaining,
+            "calls": dict(self.calls),
+            "refused": self.refused,
+            "resetsInSec": int((reset - now).total_seconds()),
+        }
+
+
+# ---------------- Single-flight ----------------
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller starts the
+    upstream call as a task, later callers await that same task until it
+    finishes. A caller that is cancelled doesn't cancel the call for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0    # upstream calls started
+        self.shared = 0   # callers served by someone else's call
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = self._inflight[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an error with no waiters left isn't logged as unhandled
+
+    async def close(self):
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "shared": self.shared, "inflight": len(self._inflight)}
+
+
+# ---------------- Query cache ----------------
+
+@dataclass
+class _Entry:
+    value: Any
+    fetched_at: float
+
+
+class QueryCache:
+    """
+    Bounded LRU of upstream results keyed by query.
+
+    Fresh for `ttl` seconds; for a further `stale_ttl` the cached value is
+    still served at once while one background task re-fetches it
+    (stale-while-revalidate). Past that the caller waits for a fetch, and if
+    the fetch fails (upstream error, quota spent) the expired value is
+    served rather than nothing. Fetches are single-flight per key: a burst
+    of misses (or a miss during a refresh) shares one upstream call.
+    """
+
+    def __init__(self, ttl: float = 15 * 60, stale_ttl: float = 60 * 60, max_entries: int = 256,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = float(ttl)
+        self.stale_ttl = float(stale_ttl)
+        self.max_entries = int(max_entries)
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._flight = SingleFlight()
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self.hits = self.stale_hits = self.misses = self.evictions = 0
+        self.refreshes = self.refresh_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = self._clock() - entry.fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._revalidate(key, fetch)
+                return entry.value
+
+        self.misses += 1
+        try:
+            return await self._flight.do(key, lambda: self._load(key, fetch))
+        except Exception:
+            if entry is not None:
+                self.stale_hits += 1
+                return entry.value
+            raise
+
+    async def _load(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        self.put(key, value)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = _Entry(value, self._clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Cached value regardless of age, without touching LRU order or stats."""
+        entry = self._entries.get(key)
+        return None if entry is None else entry.value
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _revalidate(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]):
+        if key in self._refreshing or key in self._flight:
+            return  # one refresh per key at a time
+        self._refreshing[key] = asyncio.create_task(self._refresh(key, fetch))
+
+    async def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]):
+        try:
+            await self._flight.do(key, lambda: self._load(key, fetch))
+            self.refreshes += 1
+        except Exception as error:
+            # Keep serving the stale value; the next stale read tries again
+            self.refresh_errors += 1
+            print(f"[ShortsCache] Refresh of {key!r} failed: {error}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def close(self):
+        """Cancel in-flight background refreshes (shutdown)."""
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._flight.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "staleHits": self.stale_hits,
+            "misses": self.misses,
+            "hitRate": round((self.hits + self.stale_hits) / lookups * 100, 1) if lookups else 0.0,
+            "evictions": self.evictions,
+            "refreshing": len(self._refreshing),
+            "refreshes": self.refreshes,
+            "refreshErrors": self.refresh_errors,
+            "upstreamCalls": self._flight.calls,
+            "coalesced": self._flight.shared,
+        }
@@ -1,22 +1,40 @@
+import asyncio
 import httpx
 import random
-import re
+import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Deque, Dict, List, Optional, Set
 from urllib.parse import urlencode
 
+from shorts_cache import QuotaExceeded, QuotaTracker, SingleFlight
+from shorts_api import YOUTUBE_API_BASE, create_http_client, videos_list
+from video_index import VIDEO_PARTS, VideoIndex
+
 
 class ShortsCurationService:
     """
     Shorts Curation Service
     Manages YouTube Shorts video queue using YouTube Data API v3
+
+    A background task (`run_prefetch`, started in main.py's lifespan) keeps a
+    pool of validated Shorts IDs, spread over every seed term, and tops it up
+    when it drops below the low watermark; `get_curated_queue` only reads the
+    pool, so callers never wait on YouTube. Until the first fill lands it
+    serves `fallback` (hand-picked IDs; mock IDs if none are given).
     """
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, quota: Optional[QuotaTracker] = None,
+                 http: Optional[httpx.AsyncClient] = None, pool_target: int = 120,
+                 low_watermark: int = 40, min_refill_interval: float = 60.0,
+                 index: Optional[VideoIndex] = None, fallback: Optional[List[str]] = None):
         self.api_key = api_key
-        self.cache: List[str] = []
-        self.cache_timestamp: int = 0
-        self.CACHE_TTL = 15 * 60 * 1000  # 15 minutes in milliseconds
+        self.fallback = fallback  # served while the pool is still cold
+        self.http = http  # shared client; one is created on first use if not given
+        self.index = index if index is not None else VideoIndex()  # video metadata already fetched
+        # Concurrent refills and Videos: list lookups share one upstream call
+        self.flight = SingleFlight()
+        self.quota = quota or QuotaTracker()  # share the app's tracker so both services count
 
         # Curated search terms for fitness content
         self.FITNESS_SEEDS = [
@@ -32,119 +50,190 @@ class ShortsCurationService:
             "lifting technique",
         ]
 
+        # ---- Prefetch pool ----
+        self.pool_target = int(pool_target)
+        self.low_watermark = int(low_watermark)
+        self.min_refill_interval = float(min_refill_interval)
+        self.pool: Dict[str, Deque[str]] = {seed: deque() for seed in self.FITNESS_SEEDS}
+        self.pooled: Set[str] = set()
+        # Recently served IDs: pad the queue when demand outruns the refills
+        self.served: Deque[str] = deque(maxlen=self.pool_target)
+        self._serve_cursor = 0
+        self._seed_cursor = 0
+        self._low = asyncio.Event()
+        self._last_refill = 0.0
+        self._cold_fill: Optional[asyncio.Task] = None
+        self.refills = 0
+
+    def __len__(self) -> int:
+        return len(self.pooled)
+
     async def get_curated_queue(self, count: int = 10) -> List[str]:
         """
         Get a curated queue of Shorts video IDs
-        Uses caching to respect API quotas
-        """
-        # Check cache
-        current_time = int(datetime.now().timestamp() * 1000)
-        if len(self.cache) >= count and current_time - self.cache_timestamp < self.CACHE_TTL:
-            return self.cache[:count]
-
-        # Fetch new shorts
-        try:
-            shorts = await self._fetch_shorts_from_api(count * 2)  # Fetch extra for filtering
-            self.cache = shorts
-            self.cache_timestamp = current_time
-            return shorts[:count]
-        except Exception as error:
-            print(f"Failed to fetch shorts from API: {error}")
-            # Return cached results if available
-            if self.cache:
-                return self.cache[:count]
-            raise error
-
-    async def _fetch_shorts_from_api(self, count: int) -> List[str]:
-        """
-        Fetch shorts from YouTube Data API v3
+        Served from the prefetch pool in O(count), interleaving seed terms
         """
         if not self.api_key:
-            print("YouTube API key not configured, using mock data")
             return self._get_mock_shorts(count)
+        if not self.pooled and not self.served:
+            # Cold start: answer now, fill in the background (one refill however many callers)
+            self._fill_in_background()
+            return (self.fallback or self._get_mock_shorts(count))[:count]
 
-        video_ids: List[str] = []
-        max_results = min(50, count)
+        queue = self._take(count)
+        if len(queue) < count:
+            # Pool ran dry: repeat recent ones rather than waiting on YouTube
+            queue += [vid for vid in reversed(self.served) if vid not in queue][:count - len(queue)]
+        if len(self.pooled) < self.low_watermark:
+            self._low.set()
+        return queue
 
-        # Random seed for variety
-        seed = random.choice(self.FITNESS_SEEDS)
+    def _take(self, count: int) -> List[str]:
+        seeds = self.FITNESS_SEEDS
+        queue: List[str] = []
+        empty = 0
+        while len(queue) < count and self.pooled and empty < len(seeds):
+            bucket = self.pool[seeds[self._serve_cursor % len(seeds)]]
+            self._serve_cursor += 1
+            if not bucket:
+                empty += 1
+                continue
+            empty = 0
+            vid = bucket.popleft()
+            self.pooled.discard(vid)
+            self.served.append(vid)
+            queue.append(vid)
+        return queue
 
-        # Random time window (last 6 months)
-        published_after = (datetime.now() - timedelta(days=180)).isoformat() + "Z"
+    # ---- Background refill ----
+    def _fill_in_background(self):
+        """Start a top-up without waiting on it (joins run_prefetch's if one is in flight)."""
+        if self._cold_fill is not None and not self._cold_fill.done():
+            return
+        if self.refills and time.monotonic() - self._last_refill < self.min_refill_interval:
+            return  # the last fill came back empty: same quota guard as run_prefetch
+        self._cold_fill = asyncio.create_task(self.top_up())
 
-        try:
-            async with httpx.AsyncClient() as client:
-                # 1. Search for short videos
-                search_params = {
-                    "key": self.api_key,
-                    "part": "snippet",
-                    "type": "video",
-                    "q": seed,
-                    "videoDuration": "short",  # <4 min (we'll filter to ≤60s)
-                    "maxResults": str(max_results),
-                    "order": "relevance",
-                    "safeSearch": "moderate",
-                    "publishedAfter": published_after,
-                }
-
-                search_url = f"https://www.googleapis.com/youtube/v3/search?{urlencode(search_params)}"
-                search_response = await client.get(search_url)
-                search_data = search_response.json()
-
-                if "error" in search_data:
-                    raise Exception(f"YouTube API error: {search_data['error']['message']}")
-
-                candidate_ids = [
-                    item["id"]["videoId"]
-                    for item in search_data.get("items", [])
-                    if "id" in item and "videoId" in item["id"]
-                ]
-
-                if not candidate_ids:
-                    return self._get_mock_shorts(count)
-
-                # 2. Get video details to filter true Shorts (≤60s)
-                videos_params = {
-                    "key": self.api_key,
-                    "part": "contentDetails,snippet",
-                    "id": ",".join(candidate_ids),
-                }
-
-                videos_url = f"https://www.googleapis.com/youtube/v3/videos?{urlencode(videos_params)}"
-                videos_response = await client.get(videos_url)
-                videos_data = videos_response.json()
-
-                if "error" in videos_data:
-                    raise Exception(f"YouTube API error: {videos_data['error']['message']}")
-
-                # Filter to ≤60 seconds
-                shorts = [
-                    video["id"]
-                    for video in videos_data.get("items", [])
-                    if self._parse_duration(video.get("contentDetails", {}).get("duration", "")) <= 60
-                    and self._parse_duration(video.get("contentDetails", {}).get("duration", "")) > 0
-                ]
-
-                return shorts if shorts else self._get_mock_shorts(count)
-
-        except Exception as error:
-            print(f"Error fetching from YouTube API: {error}")
-            return self._get_mock_shorts(count)
+    async def run_prefetch(self):
+        """Keep the pool above the low watermark (runs until cancelled)."""
+        if not self.api_key:
+            print("YouTube API key not configured, shorts prefetch disabled")
+            return
+        while True:
+            if len(self.pooled) < self.low_watermark:
+                wait = self._last_refill + self.min_refill_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)  # quota guard between top-ups
+                await self.top_up()
+            self._low.clear()
+            try:
+                await asyncio.wait_for(self._low.wait(), timeout=self.min_refill_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def top_up(self) -> int:
+        """Fill the pool to `pool_target`; returns how many IDs were added."""
+        return await self.flight.do("top_up", self._top_up)
+
+    async def _top_up(self) -> int:
+        self._last_refill = time.monotonic()
+        seeds = self.FITNESS_SEEDS
+        added = 0
+        # Emptiest seed buckets first (ties in round-robin order, continuing where
+        # the last top-up stopped), at most one search per seed per top-up.
+        # A search costs the same for 1 or 50 results, so each asks for 50.
+        start = self._seed_cursor
+        order = sorted(range(len(seeds)), key=lambda i: (len(self.pool[seeds[i]]), (i - start) % len(seeds)))
+        for i in order:
+            if len(self.pooled) >= self.pool_target:
+                break
+            seed = seeds[i]
+            self._seed_cursor = i + 1
+            try:
+                shorts = await self._search_seed(seed, 50)
+            except QuotaExceeded as error:
+                print(f"Shorts prefetch paused: {error}")
+                break
+            except Exception as error:
+                print(f"Shorts prefetch for {seed!r} failed: {error}")
+                continue
+            recent = set(self.served)
+            for vid in shorts:
+                if vid not in self.pooled and vid not in recent:
+                    self.pool[seed].append(vid)
+                    self.pooled.add(vid)
+                    added += 1
+        self.refills += 1
+        print(f"🎬 Shorts pool topped up: +{added} ({len(self.pooled)} ready)")
+        return added
 
-    def _parse_duration(self, duration: str) -> int:
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pooled": len(self.pooled),
+            "target": self.pool_target,
+            "lowWatermark": self.low_watermark,
+            "perSeed": {seed: len(bucket) for seed, bucket in self.pool.items()},
+            "refills": self.refills,
+        }
+
+    # ---- YouTube ----
+    async def _search_seed(self, seed: str, max_results: int) -> List[str]:
         """
-        Parse ISO 8601 duration to seconds
-        Example: PT1M30S -> 90 seconds
+        Search one seed term and keep embeddable videos of ≤60 s; raises on API errors
         """
-        match = re.match(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?", duration)
-        if not match:
-            return 0
+        # Random time window (last 6 months)
+        published_after = (datetime.now() - timedelta(days=180)).isoformat() + "Z"
+
+        client = self.client
+        # 1. Search for short videos
+        self.quota.spend("search.list")
+        search_params = {
+            "key": self.api_key,
+            "part": "snippet",
+            "type": "video",
+            "q": seed,
+            "videoDuration": "short",  # <4 min (we'll filter to ≤60s)
+            "maxResults": str(max_results),
+            "order": "relevance",
+            "safeSearch": "moderate",
+            "publishedAfter": published_after,
+        }
+
+        search_url = f"{YOUTUBE_API_BASE}/search?{urlencode(search_params)}"
+        search_response = await client.get(search_url)
+        search_data = search_response.json()
+
+        if "error" in search_data:
+            raise Exception(f"YouTube API error: {search_data['error']['message']}")
+
+        candidate_ids = [
+            item["id"]["videoId"]
+            for item in search_data.get("items", [])
+            if "id" in item and "videoId" in item["id"]
+        ]
+
+        if not candidate_ids:
+            return []
+
+        # 2. Get video details to filter true Shorts (≤60s) that can be embedded;
+        # only ids the index doesn't know yet are sent, 50 per call
+        videos = await self.index.lookup(candidate_ids, lambda ids: self._video_details(ids, VIDEO_PARTS))
+
+        # Filter to ≤60 seconds
+        return [video.id for video in videos if video.is_short and video.embeddable]
+
+    async def _video_details(self, video_ids: List[str], part: str) -> List[Dict[str, Any]]:
+        async def fetch():
+            self.quota.spend("videos.list")
+            return await videos_list(self.client, self.api_key, video_ids, part)
 
-        hours = int(match.group(1) or 0)
-        minutes = int(match.group(2) or 0)
-        seconds = int(match.group(3) or 0)
+        return await self.flight.do(("videos", part, tuple(video_ids)), fetch)
 
-        return hours * 3600 + minutes * 60 + seconds
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self.http is None:
+            self.http = create_http_client()
+        return self.http
 
     def _get_mock_shorts(self, count: int) -> List[str]:
         """
@@ -172,7 +261,9 @@ class ShortsCurationService:
 
     def clear_cache(self) -> None:
         """
-        Clear cache (useful for testing)
+        Clear the pool (useful for testing)
         """
-        self.cache = []
-        self.cache_timestamp = 0
+        for bucket in self.pool.values():
+            bucket.clear()
+        self.pooled.clear()
+        self.served.clear()
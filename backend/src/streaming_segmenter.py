@@ -0,0 +1,369 @@
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+
+from calculation_service import CalculationService, RepEvent, SetEnd, DETAIL_FULL, DETAIL_SUMMARY, _check_detail
+from dsp_executor import session_state
+from iir_filter import highpass_filter
+from ring_buffer import RingBuffer
+from rom_baseline_store import RomBaselines, RomBaselineStore
+
+
+# ---------------- Streaming filter stages ----------------
+
+class _CenteredMovingAverage:
+    """
+    Streaming equivalent of `_smooth` (centered boxcar, edge padding).
+    Output lags input by k // 2 samples; auxiliary columns are delayed by the
+    same amount so they stay sample-aligned with the smoothed signal.
+    """
+
+    def __init__(self, k: int = 9):
+        self.k = k
+        self.pad = k // 2
+        self._kernel = np.ones(k) / k
+        self._tail: Optional[np.ndarray] = None  # (1 + n_aux, <= k-1) history
+
+    def push(self, x: np.ndarray, *aux: np.ndarray) -> Tuple[np.ndarray, ...]:
+        block = np.vstack([x, *aux]) if aux else x[np.newaxis, :]
+        if block.shape[1] == 0:
+            return tuple(block)
+        if self._tail is None:
+            # Edge padding at stream start, like np.pad(mode="edge")
+            self._tail = np.repeat(block[:, :1], self.pad, axis=1)
+        ext = np.concatenate([self._tail, block], axis=1)
+        self._tail = ext[:, -(self.k - 1):] if self.k > 1 else ext[:, :0]
+        if ext.shape[1] < self.k:
+            return tuple(np.empty((block.shape[0], 0)))
+        y = np.convolve(ext[0], self._kernel, mode="valid")
+        delayed = ext[1:, self.pad:self.pad + y.size]
+        return (y, *delayed)
+
+    def flush(self) -> Tuple[np.ndarray, ...]:
+        """Drain the last k//2 samples using edge padding at the stream end."""
+        if self._tail is None or self.pad == 0:
+            return ()
+        pending = self._tail.shape[1] - self.pad  # held samples not yet emitted
+        if pending <= 0:
+            return ()
+        ext = np.concatenate([self._tail, np.repeat(self._tail[:, -1:], self.pad, axis=1)], axis=1)
+        y = np.convolve(ext[0], self._kernel, mode="valid")[-pending:]
+        delayed = ext[1:, -self.pad - pending:-self.pad]
+        self._tail = None
+        return (y, *delayed)
+
+    def reset(self):
+        self._tail = None
+
+
+# ---------------- Streaming segmenter ----------------
+
+class StreamingSegmenter:
+    """
+    Incremental counterpart of `CalculationService.segment_reps_from_stream`,
+    one instance per live session.
+
+    Every stage keeps its own state between `push()` calls (gravity EMA,
+    smoothing history, integrator, drift high-pass, island tracker), so each
+    sample is processed exactly once and per-chunk cost does not grow with set
+    length. Processed samples live in a bounded ring buffer only long enough
+    to slice out the concentric island when it closes; each RepEvent is
+    returned exactly once, from the push that closes it.
+
+    A stream has no "whole buffer" to detrend, so drift is removed with two
+    cascaded first-order high-pass stages (which also cancel a linear ramp).
+    `segment_reps_from_stream` runs a recorded buffer through this same
+    pipeline, so live and recorded sets give the same reps.
+
+    Lost samples (`push(..., missing=n)`) up to `max_gap_s` are bridged by
+    linear interpolation so the integrator sees a continuous signal; longer
+    gaps reset the pipeline rather than integrate across a hole.
+    """
+
+    def __init__(self, calculation_service: CalculationService, lift: str = "bench",
+                 fs: float = 200.0, buffer_s: float = 10.0,
+                 drift_fc: float = 0.15, warmup_s: float = 0.5, detail: str = DETAIL_FULL,
+                 max_gap_s: float = 0.25, rom_baseline: Optional[RomBaselines] = None):
+        _check_detail(detail)
+        self.calculation_service = calculation_service
+        self.rom_baseline = rom_baseline  # per-lift ROM table (None = service-wide)
+        self.detail = detail
+        self.lift = str(lift).lower()
+        self.fs = float(fs)
+        self.buffer_s = float(buffer_s)
+        self.drift_fc = float(drift_fc)
+        self.warmup_s = float(warmup_s)
+        self.max_gap_s = float(max_gap_s)
+        self.gaps_bridged = 0
+        self.gaps_reset = 0
+
+        # Same rules as the batch segmenter
+        self.min_len = int(0.4 * self.fs)   # ≥0.4 s concentric
+        self.th_frac = 0.02                 # activity threshold vs. recent |v| peak
+
+        # Ring of processed samples: t, vel, acc
+        self.ring = RingBuffer(int(self.buffer_s * self.fs), channels=3)
+        self.reset()
+
+    def reset(self):
+        """Forget all filter state (new set or stream discontinuity)."""
+        self.samples_in = 0
+        self._g: Optional[np.ndarray] = None        # gravity EMA state (3,)
+        self._smooth_acc = _CenteredMovingAverage(9)
+        self._smooth_vel = _CenteredMovingAverage(9)
+        self._prev_ta: Optional[Tuple[float, float]] = None  # last (t, acc) integrated
+        self._v = 0.0                               # integrator state
+        self._hp1: Optional[np.ndarray] = None      # drift high-pass states
+        self._hp2: Optional[np.ndarray] = None
+        self._island_start: Optional[int] = None    # abs ring index of open island
+        self._last_raw: Optional[np.ndarray] = None  # last (ax, ay, az, t) pushed
+        self._peak_idx = np.empty(0, dtype=np.int64)  # monotonic |v| deque over the ring:
+        self._peak_val = np.empty(0)                  # abs indices rising, values falling
+        self.ring.clear()
+
+    # ---- Public API ----
+    def push(self, samples: Dict[str, Any], missing: int = 0) -> List[RepEvent]:
+        """
+        samples: {'ax','ay','az', optional 't'} for the new chunk only.
+        missing: samples lost between the previous chunk and this one.
+        Returns RepEvents for islands that closed within this chunk.
+        """
+        ax = np.asarray(samples.get("ax", []), dtype=float)
+        ay = np.asarray(samples.get("ay", []), dtype=float)
+        az = np.asarray(samples.get("az", []), dtype=float)
+        t = np.asarray(samples.get("t", []), dtype=float)
+        if ax.size == 0:
+            return []
+
+        bridge = missing > 0 and self._last_raw is not None and missing <= int(self.max_gap_s * self.fs)
+        if missing > 0 and not bridge:
+            self.reset()
+            self.gaps_reset += 1
+        if t.size == 0:
+            t = (self.samples_in + (missing if bridge else 0) + np.arange(ax.size, dtype=float)) / self.fs
+        block = np.vstack([ax, ay, az, t])
+        if bridge:
+            # Straight line from the last sample before the gap to the first after it
+            w = np.arange(1, missing + 1) / (missing + 1)
+            last = self._last_raw[:, None]
+            block = np.hstack([last + (block[:, :1] - last) * w, block])
+            self.gaps_bridged += 1
+        self._last_raw = block[:, -1].copy()
+        t = block[3]
+        self.samples_in += t.size
+
+        # Gravity removal (same slow EMA as batch, all axes stacked, state carried)
+        alpha = 1 - np.exp(-2 * np.pi * 0.7 / self.fs)
+        lin, self._g = highpass_filter(block[:3], 1 - alpha, self._g)
+        acc = np.sqrt(np.sum(lin * lin, axis=0))
+
+        acc, t1 = self._smooth_acc.push(acc, t)
+        return self._after_acc_smoothing(t1, acc)
+
+    def flush(self) -> List[RepEvent]:
+        """End of set: drain filter delays and close any island still open."""
+        drained = self._smooth_acc.flush()
+        reps: List[RepEvent] = []
+        if drained:
+            acc, t1 = drained
+            reps.extend(self._after_acc_smoothing(t1, acc))
+        drained = self._smooth_vel.flush()
+        if drained:
+            vel, t2, acc2 = drained
+            reps.extend(self._detect(t2, vel, acc2))
+        if self._island_start is not None:
+            rep = self._close_island(self.ring.total)
+            if rep is not None:
+                reps.append(rep)
+        return reps
+
+    # ---- Pipeline stages ----
+    def _after_acc_smoothing(self, t1: np.ndarray, acc: np.ndarray) -> List[RepEvent]:
+        if acc.size == 0:
+            return []
+
+        # Trapezoidal integration with carried state
+        if self._prev_ta is None:
+            t_ext, a_ext = t1, acc
+            v0 = 0.0
+        else:
+            t_ext = np.concatenate([[self._prev_ta[0]], t1])
+            a_ext = np.concatenate([[self._prev_ta[1]], acc])
+            v0 = self._v
+        incr = np.cumsum(0.5 * (a_ext[1:] + a_ext[:-1]) * (t_ext[1:] - t_ext[:-1]))
+        vel = v0 + (incr if self._prev_ta is not None else np.concatenate([[0.0], incr]))
+        self._prev_ta = (float(t1[-1]), float(acc[-1]))
+        self._v = float(vel[-1])
+
+        # Drift removal: two cascaded first-order high-passes (cancels ramps)
+        beta = 1 - np.exp(-2 * np.pi * self.drift_fc / self.fs)
+        vel, self._hp1 = highpass_filter(vel, beta, self._hp1)
+        vel, self._hp2 = highpass_filter(vel, beta, self._hp2)
+
+        vel, t2, acc2 = self._smooth_vel.push(vel, t1, acc)
+        return self._detect(t2, vel, acc2)
+
+    def _detect(self, t: np.ndarray, vel: np.ndarray, acc: np.ndarray) -> List[RepEvent]:
+        if vel.size == 0:
+            return []
+        first = self.ring.total
+        # Threshold relative to the recent peak (bounded cost)
+        th = self.th_frac * self._running_peak(vel) + 1e-6
+        self.ring.extend(t, vel, acc)
+        active = vel > th
+        warm = int(self.warmup_s * self.fs) - first
+        if warm > 0:
+            active[:warm] = False
+
+        reps: List[RepEvent] = []
+        # Indices (within chunk) where activity toggles
+        prev = self._island_start is not None
+        edges = np.flatnonzero(np.diff(np.concatenate([[prev], active]).astype(np.int8)))
+        for e in edges:
+            abs_i = first + int(e)
+            if active[e]:
+                self._island_start = abs_i
+            else:
+                rep = self._close_island(abs_i)
+                if rep is not None:
+                    reps.append(rep)
+        return reps
+
+    def _running_peak(self, vel: np.ndarray) -> np.ndarray:
+        """
+        |v| peak over the ring-sized window ending at each new sample, so a
+        sample's threshold doesn't depend on how the stream was chunked
+        (for chunks shorter than the ring). Held samples are only seen
+        through their suffix maxima, so the cost follows the chunk, not the
+        ring.
+        """
+        a = np.abs(vel)
+        peak = np.maximum.accumulate(a)
+        first, capacity = self.ring.total, self.ring.capacity
+        idx, val = self._peak_idx, self._peak_val
+        if idx.size:
+            # Loudest held sample still inside each new sample's window
+            pos = np.searchsorted(idx, first + np.arange(vel.size) + 1 - capacity)
+            inside = pos < idx.size
+            peak[inside] = np.maximum(peak[inside], val[pos[inside]])
+
+        # Keep held maxima louder than the whole chunk, then the chunk's own suffix maxima
+        suffix = np.maximum.accumulate(a[::-1])[::-1]
+        new = np.flatnonzero(a > np.append(suffix[1:], -np.inf))
+        old = val.size - np.searchsorted(val[::-1], suffix[0], side="right")
+        idx = np.concatenate([idx[:old], first + new])
+        val = np.concatenate([val[:old], a[new]])
+        start = np.searchsorted(idx, first + vel.size - capacity)  # fell out of the ring
+        self._peak_idx, self._peak_val = idx[start:], val[start:]
+        return peak
+
+    def _close_island(self, end_abs: int) -> Optional[RepEvent]:
+        start_abs = self._island_start
+        self._island_start = None
+        if start_abs is None or end_abs - start_abs < self.min_len:
+            return None
+        first, block = self.ring.since(start_abs)
+        block = block[:, :end_abs - first]
+        if block.shape[1] < 2:
+            return None
+        t_c, v_c, a_c = block
+        return self.calculation_service._compute_rep_from_slice(t_c, v_c, a_c, self.lift, self.detail,
+                                                                 self.rom_baseline)
+
+
+# ---------------- Executor jobs ----------------
+# Module-level so they can be shipped to a DSPExecutor lane (thread or
+# process). Each session's segmenter lives in that lane's session_state.
+
+_service: Optional[CalculationService] = None
+_rom_store: Optional[RomBaselineStore] = None
+
+
+def bind_service(service: CalculationService, rom_store: Optional[RomBaselineStore] = None):
+    """Share the server's CalculationService (and ROM baseline store) with jobs run in this process."""
+    global _service, _rom_store
+    _service = service
+    _rom_store = rom_store
+
+
+def _worker_service() -> CalculationService:
+    global _service
+    if _service is None:
+        _service = CalculationService()  # process-pool worker: one per process
+    return _service
+
+
+def _session_segmenter(session_id: str, lift: str, fs: float, detail: str) -> StreamingSegmenter:
+    state = session_state(session_id)
+    seg = state.get("segmenter")
+    if seg is None or seg.lift != str(lift).lower() or seg.fs != float(fs) or seg.detail != detail:
+        # ROM baselines belong to the athlete, not the segmenter: keep them across rebuilds
+        if "rom_baseline" not in state:
+            state["rom_baseline"] = _session_baselines(session_id)
+        seg = state["segmenter"] = StreamingSegmenter(
+            _worker_service(), lift=lift, fs=fs, detail=detail,
+            rom_baseline=state["rom_baseline"],
+        )
+    return seg
+
+
+def _session_baselines(session_id: str) -> RomBaselines:
+    # The session key doubles as the athlete id. Socket-scoped sessions ("sid:…")
+    # have no stable identity, and process-pool workers can't reach the store:
+    # both get baselines that live as long as the session.
+    if _rom_store is None or session_id.startswith("sid:"):
+        return RomBaselines()
+    return _rom_store.for_athlete(session_id)
+
+
+def segment_chunk(session_id: str, samples: Dict[str, Any], lift: str = "bench",
+                  fs: float = 200.0, detail: str = DETAIL_SUMMARY, missing: int = 0) -> List[RepEvent]:
+    """Push one IMU chunk through the session's segmenter."""
+    return _session_segmenter(session_id, lift, fs, detail).push(samples, missing)
+
+
+def set_summary(reps: List[RepEvent]) -> SetEnd:
+    """End-of-set summary, computed by this process's CalculationService (the service itself doesn't pickle)."""
+    return _worker_service().calculate_set_summary(reps)
+
+
+def flush_session(session_id: str) -> List[RepEvent]:
+    """Drain the session's segmenter at end of set and start the next set fresh."""
+    seg = session_state(session_id).get("segmenter")
+    if seg is None:
+        return []
+    reps = seg.flush()
+    seg.reset()
+    return reps
+
+
+def reset_session(session_id: str):
+    seg = session_state(session_id).get("segmenter")
+    if seg is not None:
+        seg.reset()
+
+
+def merge_chunks(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Concatenate two consecutive IMU chunks (for queue coalescing)."""
+    out = dict(b)
+    for key in ("ax", "ay", "az"):
+        out[key] = np.concatenate([np.asarray(a.get(key, []), dtype=float),
+                                   np.asarray(b.get(key, []), dtype=float)])
+    if "t" in a and "t" in b:
+        out["t"] = np.concatenate([np.asarray(a["t"], dtype=float), np.asarray(b["t"], dtype=float)])
+    else:
+        out.pop("t", None)  # let the segmenter synthesize timestamps
+    return out
+
+
+def coalesce_segment_args(old: Tuple[Any, ...], new: Tuple[Any, ...]) -> Optional[Tuple[Any, ...]]:
+    """DSPExecutor coalesce hook for segment_chunk jobs (chunks with a gap before them don't merge)."""
+    if len(new) > 5 and new[5]:
+        return None
+    return (old[0], merge_chunks(old[1], new[1]), *new[2:5], *old[5:])
+
+
+def shed_segment_args(dropped: Tuple[Any, ...], new: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    """DSPExecutor shed hook for segment_chunk jobs: a dropped chunk becomes a gap before the next one."""
+    lost = len(dropped[1].get("ax", [])) + (dropped[5] if len(dropped) > 5 else 0)
+    missing = new[5] if len(new) > 5 else 0
+    return (*new[:5], missing + lost)
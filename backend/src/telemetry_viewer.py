@@ -0,0 +1,103 @@
+"""
+Live telemetry viewer for live_gateway.
+
+Subscribes to the gateway's throttled "telemetry" feed and plots acceleration,
+velocity and position in a local matplotlib window. The server itself stays
+headless; run this wherever a display is available:
+
+    python telemetry_viewer.py [server_url]
+"""
+
+import asyncio
+import sys
+from collections import deque
+from typing import Any, Dict
+
+import matplotlib.pyplot as plt
+import socketio
+
+from rep_wire import unpack_arrays
+
+
+class TelemetryViewer:
+    def __init__(self, server_url: str = "http://localhost:3001", max_points: int = 500):
+        self.server_url = server_url
+        self.sio = socketio.AsyncClient()
+        self.series = {name: deque(maxlen=max_points) for name in ("t", "accel", "velocity", "position")}
+        self.next_index = None
+        self.refresh_interval = 0.1
+
+        plt.ion()
+        self.fig, self.axes = plt.subplots(3, 1, figsize=(12, 8), sharex=True)
+        self.fig.suptitle("Real-Time Sensor Data")
+        self.lines = {}
+        for ax, (name, label, style) in zip(self.axes, (
+            ("accel", "Acceleration (m/s²)", "r-"),
+            ("velocity", "Velocity (m/s)", "g-"),
+            ("position", "Position (m)", "b-"),
+        )):
+            self.lines[name], = ax.plot([], [], style, label=label.split(" (")[0])
+            ax.set_ylabel(label)
+            ax.grid(True)
+            ax.legend(loc="upper right")
+        self.axes[-1].set_xlabel("Time (s)")
+        plt.tight_layout()
+
+        self._setup_socket_handlers()
+
+    # ---- Socket handlers ----
+    def _setup_socket_handlers(self):
+        @self.sio.event
+        async def connect():
+            print(f"✓ Connected to {self.server_url}")
+            snapshot = await self.sio.call("subscribeTelemetry", {})
+            if snapshot:
+                self._append(snapshot)
+
+        @self.sio.event
+        async def disconnect():
+            print("✗ Disconnected from server")
+
+        @self.sio.event
+        async def telemetry(data):
+            self._append(data)
+
+    def _append(self, payload: Dict[str, Any]):
+        skip = 0
+        if self.next_index is not None:
+            if payload["next"] < self.next_index:
+                # Server window restarted (new set)
+                for values in self.series.values():
+                    values.clear()
+            else:
+                # Overlap between the subscribe snapshot and a push
+                skip = max(0, self.next_index - payload["start"])
+        for name, arr in unpack_arrays(payload["series"]).items():
+            self.series[name].extend(arr[skip:].tolist())
+        self.next_index = payload["next"]
+
+    # ---- Plotting ----
+    def _redraw(self):
+        t = list(self.series["t"])
+        for name, line in self.lines.items():
+            line.set_data(t, list(self.series[name]))
+        for ax in self.axes:
+            ax.relim()
+            ax.autoscale_view()
+        self.fig.canvas.draw_idle()
+        self.fig.canvas.flush_events()
+
+    async def run(self):
+        await self.sio.connect(self.server_url)
+        try:
+            while plt.fignum_exists(self.fig.number):
+                self._redraw()
+                plt.pause(0.001)
+                await asyncio.sleep(self.refresh_interval)
+        finally:
+            await self.sio.disconnect()
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:3001"
+    asyncio.run(TelemetryViewer(url).run())
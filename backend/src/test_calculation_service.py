@@ -0,0 +1,256 @@
+"""
+Checks for calculation_service that don't need a running server.
+
+Run with `python -m pytest test_calculation_service.py` (or directly:
+`python test_calculation_service.py`) from backend/src.
+"""
+
+import warnings
+
+import numpy as np
+
+from calculation_service import (BANDED_DTW_CONFIGS, CalculationService, ReferenceProfileBank, RepEvent, RepMetrics,
+                                 _ema, _ReferenceProfiles, rom_spread)
+from dtw import EXACT, DTWConfig, dtw_distance, dtw_distance_batch, lb_keogh, lb_keogh_envelope
+from iir_filter import ema_filter
+
+
+# ---------------- IIR engine vs the per-sample loop ----------------
+
+def reference_ema(x: np.ndarray, alpha: float) -> np.ndarray:
+    """The original `_ema`: one Python iteration per sample."""
+    if x.size == 0:
+        return x
+    y = np.empty_like(x, dtype=float)
+    y[0] = x[0]
+    for i in range(1, x.size):
+        y[i] = alpha * x[i] + (1 - alpha) * y[i - 1]
+    return y
+
+
+def _gravity_alpha(fs: float) -> float:
+    return 1 - np.exp(-2 * np.pi * 0.7 / fs)
+
+
+def test_ema_matches_loop():
+    rng = np.random.default_rng(0)
+    for fs in (50, 200, 1000):
+        a = _gravity_alpha(fs)
+        for alpha in (a, 1 - a, 0.5, 1e-4, 1.0):
+            for n in (1, 2, 63, 64, 65, 1000, 4097):
+                x = rng.normal(size=(3, n)) * 5 + 9.8
+                want = np.vstack([reference_ema(row, alpha) for row in x])
+                got, zf = ema_filter(x, alpha)
+                assert np.max(np.abs(got - want)) < 1e-9, (fs, alpha, n)
+                assert np.allclose(zf, want[:, -1])
+                assert np.max(np.abs(_ema(x[0], alpha) - want[0])) < 1e-9
+
+
+def test_ema_chunked_equals_one_call():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(3, 5000)) + 9.8
+    alpha = 1 - _gravity_alpha(200)
+    want = np.vstack([reference_ema(row, alpha) for row in x])
+    zi, out = None, []
+    for part in np.array_split(np.arange(x.shape[1]), 13):
+        y, zi = ema_filter(x[:, part], alpha, zi)
+        out.append(y)
+    assert np.max(np.abs(np.hstack(out) - want)) < 1e-9
+
+
+# ---------------- DTW engine vs the nested loop ----------------
+
+def reference_dtw(a: np.ndarray, b: np.ndarray) -> float:
+    """The original `_dtw_distance`: full-window nested-loop recurrence."""
+    n, m = a.size, b.size
+    D = np.full((n + 1, m + 1), np.inf, dtype=float)
+    D[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            cost = abs(a[i - 1] - b[j - 1])
+            D[i, j] = cost + min(D[i - 1, j], D[i, j - 1], D[i - 1, j - 1])
+    return float(D[n, m] / (n + m))
+
+
+def noisy_reps(count: int, n: int = 200, seed: int = 1):
+    """Squat reference curve plus noise, some resampled to other lengths."""
+    rng = np.random.default_rng(seed)
+    _, ref = _ReferenceProfiles.squat(n)
+    reps = []
+    for k in range(count):
+        m = n if k % 3 else int(rng.integers(50, 250))
+        curve = np.interp(np.linspace(0, 1, m), np.linspace(0, 1, n), ref)
+        reps.append(np.clip(curve + rng.normal(0, 0.1, m), 0, None))
+    return ref, reps
+
+
+def test_dtw_exact_matches_loop():
+    ref, reps = noisy_reps(12)
+    for a in reps:
+        want = reference_dtw(a, ref)
+        assert dtw_distance(a, ref, EXACT) == want
+        assert abs(dtw_distance(a, ref, DTWConfig(band=None)) - want) <= 1e-12 * want
+
+
+def test_dtw_band_and_bounds():
+    ref, reps = noisy_reps(12)
+    for a in reps:
+        full = reference_dtw(a, ref)
+        banded = dtw_distance(a, ref, DTWConfig(band=0.1))
+        assert banded >= full - 1e-12  # a band only removes warping paths
+        if a.size == ref.size:
+            upper, lower = lb_keogh_envelope(ref, 20)
+            assert lb_keogh(a, upper, lower) <= banded + 1e-12
+        # Early abandon: inf only when the distance really is past the threshold
+        for threshold in (0.5 * banded, 2 * banded):
+            cfg = DTWConfig(band=0.1, lower_bound=True, abandon_above=threshold)
+            got = dtw_distance(a, ref, cfg)
+            assert (got == np.inf) if banded > threshold else abs(got - banded) < 1e-12
+
+
+def test_dtw_batch_matches_single():
+    ref, reps = noisy_reps(9)
+    A = np.vstack([a for a in reps if a.size == ref.size])
+    for cfg in (EXACT, DTWConfig(band=None), DTWConfig(band=0.1)):
+        want = [dtw_distance(a, ref, cfg) for a in A]
+        assert np.allclose(dtw_distance_batch(A, ref, cfg), want, rtol=1e-12, atol=0)
+    # The exact batch wavefront does the same per-cell operations: identical, any lengths
+    for n in (ref.size, 150, 37, 1):
+        B = np.vstack([np.resize(a, n) for a in reps])
+        assert np.array_equal(dtw_distance_batch(B, ref, EXACT), [reference_dtw(a, ref) for a in B])
+
+
+# ---------------- Batch scoring vs one rep at a time ----------------
+
+def concentric_slices(count: int, seed: int = 5):
+    """(t, vel, acc) slices of varying length, skew and sample spacing."""
+    rng = np.random.default_rng(seed)
+    slices = []
+    for k in range(count):
+        n = int(rng.integers(60, 400))
+        t = np.linspace(0, n / 200, n) if k % 2 else np.sort(rng.uniform(0, n / 200, n))
+        phase = np.linspace(0, 1, n) ** rng.uniform(0.6, 1.6)
+        v = np.sin(np.pi * phase) * 0.5 + rng.normal(0, 0.03, n)
+        slices.append((t, v, np.gradient(v, np.linspace(0, 1, n))))
+    return slices
+
+
+def test_score_reps_batch_matches_per_rep():
+    service = CalculationService()
+    slices = concentric_slices(40)
+    for lift in ("squat", "bench", "deadlift"):
+        batch = service.score_reps_batch(slices, lift)
+        for i, s in enumerate(slices):
+            extras = service._compute_rep_from_slice(*s, lift).extras
+            assert abs(batch.profile_accuracy[i] - extras["profile_accuracy"]) < 1e-6, (lift, i)
+            assert abs(batch.pearson_r[i] - extras["comparison"]["pearson_r"]) < 1e-6, (lift, i)
+            assert abs(batch.dtw[i] - extras["comparison"]["dtw"]) < 1e-6, (lift, i)
+
+
+def test_dtw_is_exact_unless_a_lift_opts_in():
+    bank = ReferenceProfileBank()
+    assert all(bank.get(lift).dtw == EXACT for lift in bank.lifts)
+    assert all(bank.get(lift).envelope is None for lift in bank.lifts)
+    banded = ReferenceProfileBank(dtw_configs={"squat": BANDED_DTW_CONFIGS["squat"]})
+    assert banded.get("squat").dtw.band == 0.10 and banded.get("squat").envelope is not None
+    assert banded.get("bench").dtw == EXACT
+    # Opting in changes dtw only by what the band removes, and both paths still agree per rep
+    slices = concentric_slices(12)
+    exact = CalculationService().score_reps_batch(slices, "squat")
+    service = CalculationService(dtw_configs=BANDED_DTW_CONFIGS)
+    batch = service.score_reps_batch(slices, "squat")
+    assert np.all(batch.dtw >= exact.dtw - 1e-12)
+    for i, s in enumerate(slices):
+        assert abs(batch.dtw[i] - service._compute_rep_from_slice(*s, "squat").extras["comparison"]["dtw"]) < 1e-6
+
+
+def test_score_reps_batch_short_slices():
+    service = CalculationService()
+    one = (np.array([0.0]), np.array([1.0]), np.array([0.0]))
+    batch = service.score_reps_batch([one] + concentric_slices(2), "squat")
+    assert batch.profile_accuracy[0] == 0 and np.isnan(batch.rmse[0])
+    assert batch.profile_accuracy[1] > 0
+
+
+# ---------------- Lift name resolution ----------------
+
+LIFT_NAMES = [
+    # (what users type, canonical lift)
+    ("bench", "bench"),
+    ("Bench Press", "bench"),
+    ("Incline Bench Press", "bench"),
+    ("Squat", "squat"),
+    ("Squats", "squat"),
+    ("Back Squat", "squat"),
+    ("Front Squats", "squat"),
+    ("Deadlift", "deadlift"),
+    ("Deadlifts", "deadlift"),
+    ("Sumo Deadlift", "deadlift"),
+    ("Deadlifting", "deadlift"),
+    ("Romanian Deadlifts", "rdl"),
+    ("Stiff-Leg Deadlift", "rdl"),
+    ("RDL", "rdl"),
+    ("OHP", "ohp"),
+    ("Overhead Press", "ohp"),
+    ("Overhead presses", "ohp"),
+    ("Military Press", "ohp"),
+    ("Barbell Rows", "row"),
+    ("Pendlay Row", "row"),
+    # Not a barbell lift we profile: the default, not a lookalike
+    ("Leg Press", "bench"),
+    ("Bicep Curl", "bench"),
+]
+
+
+def test_lift_name_resolution():
+    bank = ReferenceProfileBank()
+    wrong = [(name, bank.resolve(name), want) for name, want in LIFT_NAMES if bank.resolve(name) != want]
+    assert not wrong, wrong
+
+
+
+# ---------------- ROM variability ----------------
+
+ROMS = [0.40, 0.42, 0.44, 0.38]  # m: mean 0.41, median 0.41, |dev| 1, 1, 3, 3 cm
+
+
+def test_rom_spread_known_input():
+    (sd,), (cv,), (mad,) = rom_spread(np.array(ROMS))
+    assert abs(sd - 100 * np.sqrt(0.002 / 3)) < 1e-9            # sample SD, cm
+    assert abs(cv - 100 * np.sqrt(0.002 / 3) / 0.41) < 1e-9     # % of the mean
+    assert abs(mad - 2.0) < 1e-9                                # cm
+    assert abs(sd - 100 * np.std(ROMS, ddof=1)) < 1e-9
+
+    # Rows are sets; NaN padding and unknown (<= 0) displacements are left out
+    sets = np.array([ROMS + [np.nan, np.nan], [0.0] + ROMS + [-1.0], [0.5, 0.5, 0.5, np.nan, np.nan, np.nan]])
+    sd2, cv2, mad2 = rom_spread(sets)
+    assert np.allclose(sd2, [sd, sd, 0.0]) and np.allclose(cv2, [cv, cv, 0.0]) and np.allclose(mad2, [mad, mad, 0.0])
+
+    # calculate_set_summary reports the same spread (CV as rom_variability)
+    reps = [RepEvent(id=str(i), valid=True, ts=0,
+                     metrics=RepMetrics(tut=1.0, speed=0.5, vl=0.0, rom_hit=True, displacement=d))
+            for i, d in enumerate(ROMS)]
+    summary = CalculationService().calculate_set_summary(reps).summary
+    assert summary.rom_variability == round(cv, 1) and summary.rom_mad == round(mad, 2)
+    assert abs(summary.rom_sd - sd) <= 0.05
+
+
+def test_rom_spread_edge_cases():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # no empty-slice or divide-by-zero warnings
+        # Zero mean: nothing known (all zero / NaN displacement), not a division by zero
+        for d in ([0.0, 0.0, 0.0], [np.nan, np.nan], [[0.0, 0.0], [np.nan, 0.0]]):
+            sd, cv, mad = rom_spread(np.array(d))
+            assert not (sd.any() or cv.any() or mad.any()), d
+        # A single rep (or a single known one) has no spread
+        for d in ([0.42], [0.42, 0.0, np.nan], [[0.42, np.nan], [0.40, 0.44]]):
+            sd, cv, mad = rom_spread(np.array(d))
+            assert sd[0] == cv[0] == mad[0] == 0.0, d
+        assert rom_spread(np.array([[0.42, np.nan], [0.40, 0.44]]))[0][1] > 0
+        assert [a.shape for a in rom_spread(np.empty(0))] == [(1,)] * 3
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
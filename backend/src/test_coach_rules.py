@@ -0,0 +1,111 @@
+"""
+Coach rule table: same tips as the if/elif chain it replaced, malformed
+set summaries, and the ranking time budget.
+
+Run with `python -m pytest test_coach_rules.py` (or directly:
+`python test_coach_rules.py`) from backend/src.
+"""
+
+import itertools
+import timeit
+from typing import Optional
+
+import numpy as np
+
+from calculation_service import CalculationService
+from coach_rules import CoachEngine, set_features
+
+
+def reference_tip(reps: int, vl: float, rom_hit_rate: float, avg_speed: float,
+                  profile_acc: Optional[float] = None) -> str:
+    """The original `_generate_tip` if/elif chain."""
+    if profile_acc is not None:
+        if profile_acc >= 85:
+            note = f" Profile match {int(profile_acc)}%—great rhythm through the sticking region."
+        elif profile_acc >= 70:
+            note = f" Profile match {int(profile_acc)}%—close; keep pushing through the sticking point."
+        else:
+            note = f" Profile match {int(profile_acc)}%—work on technique around the sticking region."
+    else:
+        note = ""
+
+    if vl < 10:
+        extra_reps = int(np.ceil(reps * 0.5))
+        return f"Excellent speed consistency. Likely {extra_reps} reps in reserve—consider adding load." + note
+    if vl > 30:
+        return "High velocity loss—great effort, but watch for form breakdown next set." + note
+
+    if rom_hit_rate < 80:
+        return f"ROM hits {int(rom_hit_rate)}%. Prioritize depth consistency next set." + note
+    if rom_hit_rate == 100:
+        return "Perfect ROM consistency. Keep it up!" + note
+
+    if avg_speed < 0.3:
+        return "Bar speed is low; reduce load or add rest." + note
+    if avg_speed > 0.6:
+        return "Fast velocities—room to progress by 2.5–5% load." + note
+
+    return f"Solid set. VL {int(vl)}%, ROM hits {int(rom_hit_rate)}%." + note
+
+
+def test_tips_match_the_old_chain():
+    service = CalculationService()
+    grid = itertools.product(
+        (1, 5, 8),                                   # reps
+        (0, 9.99, 10, 20, 30, 30.01, 45),            # vl (boundaries of both VL rules)
+        (50, 79.9, 80, 95, 100),                     # rom hit rate
+        (0.1, 0.3, 0.45, 0.6, 0.61),                 # avg speed
+        (None, 50, 69.9, 70, 84.9, 85, 99),          # profile accuracy
+    )
+    wrong = []
+    for case in grid:
+        want = reference_tip(*case)
+        got = service._generate_tip(*case)
+        if got != want:
+            wrong.append((case, got, want))
+    assert not wrong, wrong[:5]
+
+
+def test_malformed_summaries_are_not_errors():
+    engine = CoachEngine()
+    X = set_features([
+        {"summary": "not a dict"},
+        {"summary": None},
+        42,
+        {"summary": {"vl": "fast", "reps": "6", "romHitRate": [90], "avgSpeed": {"x": 1}}},
+        {"vl": "n/a", "romHitRate": "95.5"},
+    ])
+    assert X.shape == (5, 9)
+    assert np.isnan(X[:3, :6]).all()
+    assert X[3, 0] == 6 and np.isnan(X[3, 1:4]).all()
+    assert np.isnan(X[4, 1]) and X[4, 2] == 95.5
+    tips = engine.rank(X)
+    assert tips and tips[0]["id"] == "solid"
+
+
+def test_recent_sets_and_session_dedupe():
+    engine = CoachEngine()
+    sets = [{"summary": {"reps": 8, "vl": 18, "romHitRate": 95, "avgSpeed": 0.50}},
+            {"summary": {"reps": 7, "vl": 24, "romHitRate": 95, "avgSpeed": 0.45}},
+            {"summary": {"reps": 6, "vl": 31, "romHitRate": 95, "avgSpeed": 0.375}}]
+    first = engine.rank(set_features(sets), session="s")
+    assert first[0]["id"] == "fatigue_speed" and "25%" in first[0]["tip"]
+    again = engine.rank(set_features(sets), session="s")
+    assert again[0]["id"] != "fatigue_speed"  # not repeated while there is anything else to say
+
+
+def test_rank_is_under_a_millisecond():
+    engine = CoachEngine()
+    rng = np.random.default_rng(0)
+    sets = [{"summary": {"reps": int(rng.integers(3, 12)), "vl": float(rng.uniform(0, 40)),
+                         "romHitRate": float(rng.uniform(60, 100)), "avgSpeed": float(rng.uniform(0.2, 0.8)),
+                         "profileAcc": float(rng.uniform(50, 100))}} for _ in range(5)]
+    per_call = min(timeit.repeat(lambda: engine.rank(set_features(sets)), number=200, repeat=5)) / 200
+    assert per_call < 1e-3, per_call
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
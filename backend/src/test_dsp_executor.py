@@ -0,0 +1,113 @@
+"""
+DSPExecutor backpressure: a full lane sheds IMU chunks (counting them as a
+gap before the next chunk) but never drops control jobs.
+
+Run with `python -m pytest test_dsp_executor.py` (or directly:
+`python test_dsp_executor.py`) from backend/src.
+"""
+
+import asyncio
+import threading
+
+from dsp_executor import DSPExecutor
+from streaming_segmenter import coalesce_segment_args, shed_segment_args
+
+calls = []
+gate = threading.Event()
+
+
+def blocker():
+    gate.wait(5)
+
+
+def chunk(session_id, samples, lift, fs, detail, missing):
+    calls.append(("chunk", samples["n"], len(samples["ax"]), missing))
+
+
+def control(name):
+    calls.append((name,))
+
+
+def samples(n: int, size: int = 10) -> dict:
+    return {"n": n, "ax": [0.0] * size, "ay": [0.0] * size, "az": [0.0] * size}
+
+
+async def fill_and_drain(policy: str):
+    calls.clear()
+    gate.clear()
+    dsp = DSPExecutor(workers=1, max_queue=4, policy=policy)
+    futures = [dsp.enqueue("s", blocker)]
+    await asyncio.sleep(0.05)  # the blocker is now running, everything else queues behind it
+
+    def send(n):
+        futures.append(dsp.enqueue("s", chunk, "s", samples(n), "squat", 200.0, "summary", 0,
+                                   coalesce=coalesce_segment_args, shed=shed_segment_args))
+
+    for n in range(6):
+        send(n)
+    futures.append(dsp.enqueue("s", control, "reset"))
+    for n in range(6, 12):
+        send(n)
+    futures.append(dsp.enqueue("s", control, "flush"))
+    gate.set()
+    await asyncio.gather(*futures)
+    send(12)  # a gap must not carry across the flush
+    await asyncio.gather(*futures)
+    metrics = dsp.metrics()["sessions"]["s"]
+    await dsp.shutdown()
+    return list(calls), metrics
+
+
+def run(policy: str):
+    return asyncio.run(fill_and_drain(policy))
+
+
+def test_control_jobs_survive_a_full_lane():
+    for policy in DSPExecutor.POLICIES:
+        got, metrics = run(policy)
+        names = [c[0] for c in got]
+        assert names.count("reset") == 1 and names.count("flush") == 1, (policy, got)
+        reset, flush = names.index("reset"), names.index("flush")
+        assert reset < flush, (policy, got)
+        # Chunks stay on their side of each control job
+        assert all(c[1] < 6 for c in got[:reset]), (policy, got)
+        assert all(6 <= c[1] < 12 for c in got[reset + 1:flush]), (policy, got)
+        assert got[flush + 1:] == [("chunk", 12, 10, 0)], (policy, got)
+        assert metrics["dropped"] > 0 or metrics["coalesced"] > 0, (policy, metrics)
+
+
+async def stream_through_full_lane(policy: str, count: int = 12, size: int = 10):
+    calls.clear()
+    gate.clear()
+    dsp = DSPExecutor(workers=1, max_queue=4, policy=policy)
+    futures = [dsp.enqueue("s", blocker)]
+    await asyncio.sleep(0.05)
+    for n in range(count + 1):
+        if n == count:  # the last chunk arrives once the lane has caught up
+            gate.set()
+            await asyncio.gather(*futures)
+        futures.append(dsp.enqueue("s", chunk, "s", samples(n, size), "squat", 200.0, "summary", 0,
+                                   coalesce=coalesce_segment_args, shed=shed_segment_args))
+    await asyncio.gather(*futures)
+    metrics = dsp.metrics()["sessions"]["s"]
+    await dsp.shutdown()
+    return list(calls), metrics
+
+
+def test_dropped_chunks_become_a_gap():
+    # Every sample sent is either delivered or counted as missing before a later chunk
+    for policy in DSPExecutor.POLICIES:
+        got, metrics = asyncio.run(stream_through_full_lane(policy))
+        assert metrics["dropped"] + metrics["coalesced"] > 0, (policy, metrics)
+        delivered = sum(c[2] for c in got)
+        missing = sum(c[3] for c in got)
+        assert delivered + missing == 13 * 10, (policy, got)
+        assert missing == 10 * metrics["dropped"], (policy, got, metrics)
+        assert [c[1] for c in got] == sorted(c[1] for c in got), (policy, got)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,133 @@
+"""
+History rollups: what endSet batches add incrementally must equal what
+`rebuild-rollups` regenerates from the raw set and rep tables, and every
+spelling of an exercise lands in one canonical series.
+
+Run with `python -m pytest test_history_store.py` (or directly:
+`python test_history_store.py`) from backend/src.
+"""
+
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from calculation_service import RepEvent, RepMetrics, SetEnd, SetSummary
+from history_store import _LOAD_SUMS, _ROLLUP_SUMS, HistoryStore
+
+TABLES = {
+    "rollup_daily": ["athlete", "exercise", "program", "day"],
+    "rollup_weekly": ["athlete", "exercise", "program", "week"],
+    "rollup_load": ["athlete", "exercise", "program", "day", "step"],
+}
+# VL edges, loads on a half plate step (rounds up) and between steps, no load
+VLS = (0.0, 9.99, 10.0, 20.0, 29.5, 30.0, 40.0, 55.0)
+LOADS = (None, 60.0, 61.25, 62.4, 101.25, 100.0)
+
+
+def make_set(rng: random.Random, n_reps: int, vl: float):
+    reps = [RepEvent(id=str(i), valid=True, ts=0,
+                     metrics=RepMetrics(tut=rng.uniform(0.8, 1.6), speed=rng.uniform(0.3, 0.9),
+                                        vl=rng.uniform(0, 40), rom_hit=rng.random() < 0.8))
+            for i in range(n_reps)]
+    speeds = [r.metrics.speed for r in reps]
+    summary = SetSummary(reps=n_reps, tut=sum(r.metrics.tut for r in reps),
+                         avg_speed=float(np.mean(speeds)) if reps else 0.0, vl=vl,
+                         rom_hit_rate=100.0 * np.mean([r.metrics.rom_hit for r in reps]) if reps else 0.0,
+                         rom_variability=0.0)
+    return SetEnd(summary=summary, tip=""), reps
+
+
+def record_history(store: HistoryStore, seed: int = 0) -> int:
+    """Three weeks of sets across athletes, lifts and programs, flushed in several batches."""
+    rng = random.Random(seed)
+    start = time.mktime((2026, 3, 1, 12, 0, 0, 0, 0, -1))  # a Sunday: weeks split mid-history
+    count = 0
+    for day in range(21):
+        for athlete in ("athlete:a", "athlete:b"):
+            for exercise in ("Squat", "bench"):
+                for s in range(rng.randint(0, 4)):
+                    summary, reps = make_set(rng, rng.choice([0, 1, 5, 8]), rng.choice(VLS))
+                    store.record_set(athlete, exercise, summary, reps, load_kg=rng.choice(LOADS),
+                                     program=rng.choice(["strength", "hypertrophy"]),
+                                     ts=start + day * 86400 + s * 300)
+                    count += 1
+        if day % 3 == 0:
+            store.flush()  # later batches add onto existing rollup rows
+    store.flush()
+    return count
+
+
+def snapshot(store: HistoryStore):
+    conn = store._connect()
+    out = {}
+    for table, key in TABLES.items():
+        sums = _LOAD_SUMS if table == "rollup_load" else _ROLLUP_SUMS
+        rows = conn.execute(f"SELECT {', '.join(key + sums)} FROM {table} ORDER BY {', '.join(key)}").fetchall()
+        out[table] = ([row[:len(key)] for row in rows], np.array([row[len(key):] for row in rows], dtype=float))
+    return out
+
+
+def test_incremental_rollups_equal_a_rebuild():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(path=os.path.join(tmp, "history.db"))
+        assert record_history(store) > 100
+        incremental = snapshot(store)
+        store.rebuild_rollups()
+        rebuilt = snapshot(store)
+        for table in TABLES:
+            keys, sums = incremental[table]
+            want_keys, want_sums = rebuilt[table]
+            assert keys == want_keys, table
+            assert len(keys) > 0, table
+            assert np.allclose(sums, want_sums, rtol=1e-12, atol=1e-9), table
+
+
+def test_aggregate_is_unchanged_by_a_rebuild():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(path=os.path.join(tmp, "history.db"))
+        record_history(store, seed=1)
+        queries = [(a, e, p) for a in ("athlete:a", "athlete:b") for e in ("squat", "bench")
+                   for p in (None, "strength")]
+        before = [store.aggregate(*q) for q in queries]
+        store.rebuild_rollups()
+        assert [store.aggregate(*q) for q in queries] == before
+        assert sum(b["vlDistribution"]["bins"][-1]["count"] for b in before) > 0
+
+
+
+def test_exercise_spellings_share_one_series():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(path=os.path.join(tmp, "history.db"))
+        rng = random.Random(2)
+        ts = time.mktime((2026, 3, 2, 12, 0, 0, 0, 0, -1))
+        for i, name in enumerate(("Back Squat", "squats", "SQUAT", "squat")):
+            summary, reps = make_set(rng, 5, 20.0)
+            store.record_set("athlete:a", name, summary, reps, load_kg=100.0, ts=ts + i * 300)
+        one = store.aggregate("athlete:a", "squat")
+        assert one["trends"][0]["sets"] == 4 and one["speedAtLoad"]["points"][0]["reps"] == 20
+        assert store.aggregate("athlete:a", "Back Squats") == one
+        rows = store._connect().execute("SELECT DISTINCT exercise FROM sets UNION SELECT exercise FROM reps")
+        assert [r[0] for r in rows] == ["squat"]
+
+
+def test_rebuild_canonicalizes_older_exercise_names():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(path=os.path.join(tmp, "history.db"))
+        record_history(store, seed=3)
+        want = store.aggregate("athlete:a", "squat")
+        # Rows written before names were canonicalized
+        with store._connect() as conn:
+            for table in ("sets", "reps"):
+                conn.execute(f"UPDATE {table} SET exercise = 'back squat' WHERE exercise = 'squat' AND day % 2 = 0")
+        store.rebuild_rollups()
+        assert store.aggregate("athlete:a", "squat") == want
+        assert store._connect().execute("SELECT COUNT(*) FROM sets WHERE exercise = 'back squat'").fetchone() == (0,)
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
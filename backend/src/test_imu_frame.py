@@ -0,0 +1,120 @@
+"""
+Binary IMU frames: round trip, rejection of malformed frames, and size /
+parse time against the JSON chunks they replace.
+
+Run with `python -m pytest test_imu_frame.py` from backend/src, or
+`python test_imu_frame.py` for the JSON comparison table.
+"""
+
+import json
+import timeit
+
+import numpy as np
+
+from imu_frame import FLAG_INT16, HEADER_SIZE, decode_frame, encode_frame
+
+SCALE = 9.81 / 4096  # MPU6050 at ±8 g
+
+
+def samples(n: int = 20, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 3, (n, 3)) + [0, 0, 9.81]
+
+
+def json_chunk(xyz: np.ndarray, seq: int = 7, fs: int = 200) -> str:
+    """The JSON chunk (`ax/ay/az/t` float lists) a device sends for the same samples."""
+    t = 5.0 + np.arange(len(xyz)) / fs
+    return json.dumps({"device": "1234", "seq": seq, "fs": fs, "ax": xyz[:, 0].tolist(),
+                       "ay": xyz[:, 1].tolist(), "az": xyz[:, 2].tolist(), "t": t.tolist()})
+
+
+def parse_json(msg: str) -> dict:
+    data = json.loads(msg)
+    return {k: np.asarray(data[k], dtype=float) for k in ("ax", "ay", "az", "t")}
+
+
+def test_float32_round_trip():
+    xyz = samples()
+    frame = decode_frame(encode_frame(1234, 7, 200, 5_000_000, xyz))
+    assert (frame.device_id, frame.seq, frame.sample_rate, frame.base_ts_us) == (1234, 7, 200, 5_000_000)
+    assert len(frame) == 20 and frame.samples.dtype == np.dtype("<f4")
+    chunk = frame.to_chunk()
+    assert np.allclose(np.stack([chunk["ax"], chunk["ay"], chunk["az"]], axis=1), xyz, atol=1e-5)
+    assert np.allclose(chunk["t"], 5.0 + np.arange(20) / 200)
+
+
+def test_int16_round_trip():
+    xyz = samples()
+    buf = encode_frame(1, (1 << 32) + 3, 200, 0, xyz, int16_scale=SCALE)
+    assert len(buf) == HEADER_SIZE + 20 * 3 * 2 and buf[3] & FLAG_INT16
+    frame = decode_frame(buf)
+    assert frame.seq == 3  # u32 wraps
+    chunk = frame.to_chunk()
+    got = np.stack([chunk["ax"], chunk["ay"], chunk["az"]], axis=1)
+    assert np.max(np.abs(got - xyz)) <= SCALE / 2 + 1e-9
+    # Samples are a view of the received bytes, not a copy
+    assert not frame.samples.flags.writeable and not frame.samples.flags.owndata
+
+
+def test_int16_saturates():
+    frame = decode_frame(encode_frame(1, 0, 200, 0, [[1e6, -1e6, 0.0]], int16_scale=SCALE))
+    assert frame.samples.tolist() == [[32767, -32768, 0]]
+
+
+def test_empty_frame():
+    frame = decode_frame(encode_frame(1, 0, 200, 0, np.empty((0, 3))))
+    assert len(frame) == 0 and frame.to_chunk()["ax"].size == 0
+
+
+def rejects(buf) -> str:
+    try:
+        decode_frame(buf)
+    except ValueError as e:
+        return str(e)
+    raise AssertionError("malformed frame was accepted")
+
+
+def test_malformed_frames_are_rejected():
+    good = encode_frame(1, 0, 200, 0, samples(), int16_scale=SCALE)
+    assert "too short" in rejects(good[:HEADER_SIZE - 1])
+    assert "too short" in rejects(b"")
+    assert "Not an IMU frame" in rejects(b"XX" + good[2:])
+    assert "Not an IMU frame" in rejects(good[:2] + b"\x02" + good[3:])  # unknown version
+    assert "length" in rejects(good[:-1])
+    assert "length" in rejects(good + b"\x00\x00")
+    assert "zero sample rate" in rejects(encode_frame(1, 0, 0, 0, samples(), int16_scale=SCALE))
+    assert decode_frame(bytearray(good)).seq == 0 and decode_frame(memoryview(good)).seq == 0
+
+
+def compare_with_json(n: int = 20, number: int = 2000) -> dict:
+    """Bytes on the wire and parse time (to segmenter-ready arrays) per frame."""
+    xyz = samples(n)
+    msg = json_chunk(xyz)
+    f32 = encode_frame(1234, 7, 200, 0, xyz)
+    i16 = encode_frame(1234, 7, 200, 0, xyz, int16_scale=SCALE)
+    t_json = min(timeit.repeat(lambda: parse_json(msg), number=number, repeat=5)) / number
+    t_f32 = min(timeit.repeat(lambda: decode_frame(f32).to_chunk(), number=number, repeat=5)) / number
+    t_i16 = min(timeit.repeat(lambda: decode_frame(i16).to_chunk(), number=number, repeat=5)) / number
+    return {
+        "bytes": {"json": len(msg.encode()), "float32": len(f32), "int16": len(i16)},
+        "parse_us": {"json": t_json * 1e6, "float32": t_f32 * 1e6, "int16": t_i16 * 1e6},
+    }
+
+
+def test_binary_frames_beat_json():
+    # Target: >= 5x smaller and >= 5x faster to parse than JSON lists at 200 Hz.
+    # Half-second frames; tiny frames parse closer to 5x (fixed per-frame cost).
+    result = compare_with_json(100)
+    size, parse = result["bytes"], result["parse_us"]
+    assert size["json"] >= 5 * size["int16"], size
+    assert parse["json"] >= 5 * parse["int16"], parse
+
+
+if __name__ == "__main__":
+    print("IMU chunk at 200 Hz: JSON lists vs binary frames")
+    for n in (20, 50, 100, 200):
+        result = compare_with_json(n)
+        size, parse = result["bytes"], result["parse_us"]
+        print(f"  {n:>3} samples  bytes json {size['json']:6d}  f32 {size['float32']:5d}  i16 {size['int16']:5d} "
+              f"({size['json'] / size['int16']:4.1f}x)   parse json {parse['json']:7.1f} us  "
+              f"f32 {parse['float32']:5.1f} us  i16 {parse['int16']:5.1f} us ({parse['json'] / parse['int16']:4.1f}x)")
@@ -0,0 +1,98 @@
+"""
+OnlineIntegrator: the same trapezoid as `_trapz_integrate`, ZUPT clamping
+at rest, and drift removal on a still → move → still trace.
+
+Run with `python -m pytest test_kinematics.py` (or directly:
+`python test_kinematics.py`) from backend/src.
+"""
+
+import numpy as np
+
+from calculation_service import _trapz_integrate
+from kinematics import OnlineIntegrator, velocity_leak
+
+FS = 200.0
+STILL, MOVE, REST = 2.0, 1.0, 3.0  # seconds
+PEAK_ACC = 3.0                     # m/s²
+BIAS = 0.05                        # m/s² left over after gravity removal
+
+
+def still_move_still(seed: int = 0):
+    """One full sine of acceleration (bar up and stopped again) between rests, plus bias and noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int((STILL + MOVE + REST) * FS)) / FS
+    moving = (t >= STILL) & (t < STILL + MOVE)
+    a = np.where(moving, PEAK_ACC * np.sin(2 * np.pi * (t - STILL) / MOVE), 0.0)
+    return t, a + BIAS + rng.normal(0, 0.02, t.size), moving
+
+
+def run(integrator: OnlineIntegrator, t: np.ndarray, a: np.ndarray) -> np.ndarray:
+    return np.array([integrator.update(ti, ai) for ti, ai in zip(t, a)])
+
+
+def test_matches_trapz_without_zupt():
+    rng = np.random.default_rng(1)
+    t = np.cumsum(rng.uniform(0.003, 0.007, 1000))  # jittery sample spacing
+    a = rng.normal(0, 2, t.size)
+    out = run(OnlineIntegrator(), t, a)
+    v = _trapz_integrate(a, t)
+    assert np.allclose(out[:, 0], v, rtol=0, atol=1e-9)
+    assert np.allclose(out[:, 1], _trapz_integrate(v, t), rtol=0, atol=1e-9)
+
+
+def test_bad_timestamps_are_skipped():
+    ig = OnlineIntegrator()
+    ig.update(0.0, 1.0)
+    v, x = ig.update(0.1, 1.0)
+    assert ig.update(0.1, 50.0) == (v, x)   # duplicate
+    assert ig.update(0.05, 50.0) == (v, x)  # out of order
+    assert ig.update(0.2, 1.0)[0] == v + 0.1
+
+
+def test_zupt_clamps_at_rest_and_removes_drift():
+    t, a, moving = still_move_still()
+    plain = run(OnlineIntegrator(), t, a)
+    ig = OnlineIntegrator(zupt_var=0.05)
+    out = run(ig, t, a)
+
+    # Without ZUPT the bias integrates into a velocity that never comes back
+    assert plain[-1, 0] > 0.8 * BIAS * t[-1]
+    # With it, velocity is exactly 0 through both rests...
+    first_rest = t < STILL
+    settled = t >= STILL + MOVE + 1.0
+    assert ig.zupt_count == 2 and ig.stationary
+    assert np.all(out[first_rest & (t >= 0.5), 0] == 0)
+    assert np.all(out[settled, 0] == 0)
+    # ...while the move itself follows the trapezoid from the moment the bar left rest
+    i0 = int(np.argmax(moving))
+    v_move = _trapz_integrate(a[i0:], t[i0:])[:moving.sum()]
+    assert np.max(np.abs(out[moving, 0] - v_move)) < 0.02
+    peak_v = PEAK_ACC * MOVE / np.pi
+    assert abs(out[moving, 0].max() - peak_v) < 0.05 * peak_v
+    # Position holds still at rest and lands near the true travel
+    travel = PEAK_ACC * MOVE ** 2 / (2 * np.pi)
+    assert np.ptp(out[settled, 1]) < 1e-3  # only the half step before each clamp
+    assert abs(out[-1, 1] - travel) < 0.15 * travel
+
+
+def test_zupt_ignores_constant_offset():
+    # Gravity left in: the detector measures about its slow baseline, so rest is still rest
+    t, a, _ = still_move_still()
+    ig = OnlineIntegrator(zupt_var=0.05)
+    run(ig, t[t < STILL], a[t < STILL] + 9.81)
+    assert ig.stationary and ig.v == 0
+
+
+def test_velocity_leak_bleeds_velocity():
+    ig = OnlineIntegrator(drift_hooks=[velocity_leak(0.5)])
+    t = np.arange(int(3 * FS)) / FS
+    out = run(ig, t, np.where(t < 0.2, 5.0, 0.0))
+    v_after_push = out[int(0.2 * FS), 0]
+    assert 0 < out[-1, 0] < v_after_push * np.exp(-2.5 / 0.5) * 1.05
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -21,6 +21,7 @@ from typing import List, Dict, Any
 from collections import deque
 
 from calculation_service import CalculationService, RepEvent
+from streaming_segmenter import StreamingSegmenter
 
 
 # ---------------- Simulator ----------------
@@ -74,12 +75,12 @@ class LiveGatewayTester:
         self.vel_proxy = deque(maxlen=1000)   # simple proxy for panel 1
         self.acc_z = deque(maxlen=1000)
 
-        # continuous stream buffers for segmentation
-        self.stream_ax: List[float] = []
-        self.stream_ay: List[float] = []
-        self.stream_az: List[float] = []
-        self.stream_t: List[float] = []
-        self.last_seg_count = 0
+        # incremental segmenter + pending chunk (pushed every 10 samples)
+        self.segmenter = StreamingSegmenter(self.calc, lift="squat", fs=self.sim.sampling_rate)
+        self.chunk_ax: List[float] = []
+        self.chunk_ay: List[float] = []
+        self.chunk_az: List[float] = []
+        self.chunk_t: List[float] = []
 
         # rep bookkeeping
         self.rep_count = 0
@@ -132,7 +133,7 @@ class LiveGatewayTester:
             print("SET COMPLETE (server)")
             print("="*60)
             print(f"Reps: {s['reps']} | TUT: {s['tut']:.1f}s | Avg v: {s['avgSpeed']:.2f} m/s | VL: {s['vl']:.1f}%")
-            print(f"ROM hits: {s['romHitRate']:.1f}% | ROM Var: {s['romVariability']:.1f} cm")
+            print(f"ROM hits: {s['romHitRate']:.1f}% | ROM Var: {s['romVariability']:.1f}% (SD {s.get('romSd', 0):.1f} cm)")
             print("Tip:", data['tip'])
             print("="*60 + "\n")
 
@@ -180,34 +181,39 @@ class LiveGatewayTester:
             self.vel_proxy.append(abs(az) * (1.0 / fs) * 0.1)
             self.acc_z.append(az)
 
-            # add to continuous buffers
-            self.stream_ax.append(ax); self.stream_ay.append(ay); self.stream_az.append(az); self.stream_t.append(t)
+            # add to the pending chunk
+            self.chunk_ax.append(ax); self.chunk_ay.append(ay); self.chunk_az.append(az); self.chunk_t.append(t)
 
-            # every ~0.2s, try to segment reps
-            if len(self.stream_t) % 10 == 0:
-                reps = self.calc.segment_reps_from_stream({
-                    "ax": self.stream_ax, "ay": self.stream_ay, "az": self.stream_az,
-                    "t": self.stream_t, "fs": fs, "lift": "squat"
+            # every ~0.2s, push the new samples; only newly closed reps come back
+            if len(self.chunk_t) == 10:
+                reps = self.segmenter.push({
+                    "ax": self.chunk_ax, "ay": self.chunk_ay, "az": self.chunk_az, "t": self.chunk_t,
                 })
-                if len(reps) > self.last_seg_count:
-                    new = reps[self.last_seg_count:]
-                    for ev in new:
-                        await self._emit_rep(ev)
-                        self.completed_events.append(ev)
-                        # keep latest overlay for dashboard
-                        if ev.extras and "norm_plot" in ev.extras:
-                            self.last_norm_plot = ev.extras["norm_plot"]
-                            self.last_profile_accuracy = ev.extras.get("profile_accuracy", None)
-                        # open per-rep windows
-                        self._show_rep_windows(ev)
-                    self.last_seg_count = len(reps)
+                self.chunk_ax, self.chunk_ay, self.chunk_az, self.chunk_t = [], [], [], []
+                await self._handle_new_reps(reps)
 
             await asyncio.sleep(1.0 / fs)
             elapsed = (datetime.now() - self.set_start).total_seconds()
 
+        if self.chunk_t:
+            await self._handle_new_reps(self.segmenter.push({
+                "ax": self.chunk_ax, "ay": self.chunk_ay, "az": self.chunk_az, "t": self.chunk_t,
+            }))
+        await self._handle_new_reps(self.segmenter.flush())
         await self._end_set()
         self.is_running = False
 
+    async def _handle_new_reps(self, reps: List[RepEvent]):
+        for ev in reps:
+            await self._emit_rep(ev)
+            self.completed_events.append(ev)
+            # keep latest overlay for dashboard
+            if ev.extras and "norm_plot" in ev.extras:
+                self.last_norm_plot = ev.extras["norm_plot"]
+                self.last_profile_accuracy = ev.extras.get("profile_accuracy", None)
+            # open per-rep windows
+            self._show_rep_windows(ev)
+
     async def _emit_rep(self, ev: RepEvent):
         self.rep_count += 1
         rep_dict = {
@@ -363,7 +369,7 @@ Total TUT: {s['tut']:.1f} s
 Avg Speed: {s['avgSpeed']:.2f} m/s
 Velocity Loss: {s['vl']:.1f} %
 ROM Hit Rate: {s['romHitRate']:.1f} %
-ROM Variability: {s['romVariability']:.1f} cm
+ROM Variability: {s['romVariability']:.1f} % (SD {s.get('romSd', 0):.1f} cm)
 
 Tip:
 {tip}
@@ -0,0 +1,162 @@
+"""
+Load-velocity profiles: the online fit against known lines, Huber
+downweighting, fading of old sets, MVT / e1RM, and plan periodization.
+
+Run with `python -m pytest test_load_velocity.py` (or directly:
+`python test_load_velocity.py`) from backend/src.
+"""
+
+import numpy as np
+
+from load_velocity import (DEFAULT_MVT, DELOAD_EVERY, FALLBACK_MVT, PLATE_STEP_KG, LoadVelocityEngine,
+                           LoadVelocityProfile)
+
+DAY = 86400.0
+T0 = 1_700_000_000.0
+INTERCEPT, SLOPE = 1.40, -0.008  # m/s, m/s per kg
+
+
+def line(load):
+    return INTERCEPT + SLOPE * load
+
+
+def test_known_line_is_recovered():
+    p = LoadVelocityProfile("squat")
+    for i, load in enumerate(range(60, 150, 10)):
+        p.add_set(load, line(load), ts=T0 + i * DAY)
+    intercept, slope, sd = p.fit()
+    assert abs(intercept - INTERCEPT) < 1e-9 and abs(slope - SLOPE) < 1e-12 and sd < 1e-6
+    # No near-failure sets: the lift's default MVT, and e1RM where the line meets it
+    assert p.mvt == DEFAULT_MVT["squat"]
+    assert abs(p.e1rm() - (DEFAULT_MVT["squat"] - INTERCEPT) / SLOPE) < 1e-6
+    assert abs(p.velocity_at(100) - line(100)) < 1e-9 and abs(p.load_at(line(120)) - 120) < 1e-6
+
+
+def test_near_failure_sets_set_the_mvt():
+    p = LoadVelocityProfile("bench")
+    for i, load in enumerate((40, 60, 80)):
+        p.add_set(load, line(load), last_speed=line(load) * 0.9, vl=10, ts=T0 + i * DAY)
+    assert p.mvt == DEFAULT_MVT["bench"] and p.mvt_sets == 0
+    p.add_set(100, line(100), last_speed=0.20, vl=40, ts=T0 + 3 * DAY)
+    p.add_set(105, line(105), last_speed=0.16, vl=45, ts=T0 + 4 * DAY)
+    assert abs(p.mvt - 0.18) < 1e-12 and p.summary()["mvtObserved"]
+    assert abs(p.e1rm() - (0.18 - INTERCEPT) / SLOPE) < 1e-6
+
+
+def test_outlier_is_downweighted():
+    rng = np.random.default_rng(0)
+    loads = rng.uniform(60, 140, 12)
+    speeds = line(loads) + rng.normal(0, 0.02, loads.size)
+    p = LoadVelocityProfile("squat")
+    for i, (x, y) in enumerate(zip(loads, speeds)):
+        p.add_set(x, y, ts=T0)
+    weight_before = p.sums[0]
+    p.add_set(70, line(70) - 0.6, ts=T0)  # a mis-detected rep, 0.6 m/s slow
+    assert p.sums[0] - weight_before < 0.2  # well under a full point's weight
+    # Plain least squares with the outlier at full weight is pulled much further
+    x, y = np.append(loads, 70), np.append(speeds, line(70) - 0.6)
+    ols_slope = np.polyfit(x, y, 1)[0]
+    assert abs(p.fit()[1] - SLOPE) < 0.25 * abs(ols_slope - SLOPE)
+
+
+def test_old_sets_fade():
+    # A year of a slower line, then two months at a faster one: the fit follows the recent sets
+    p = LoadVelocityProfile("squat", half_life_days=30)
+    ts = T0
+    for week in range(52):
+        for load in (80, 100, 120):
+            p.add_set(load, line(load) - 0.10, ts=ts)
+        ts += 7 * DAY
+    for week in range(8):
+        for load in (80, 100, 120):
+            p.add_set(load, line(load), ts=ts)
+        ts += 7 * DAY
+    recent = abs(p.velocity_at(100) - line(100))
+    assert recent < 0.04  # vs 0.10 off at the start of the block
+    # Without fading the year of old sets would dominate
+    keep = LoadVelocityProfile("squat", half_life_days=1e9)
+    ts = T0
+    for week in range(60):
+        for load in (80, 100, 120):
+            keep.add_set(load, line(load) - (0.10 if week < 52 else 0.0), ts=ts)
+        ts += 7 * DAY
+    assert abs(keep.velocity_at(100) - line(100)) > 2 * recent
+
+
+def test_lift_names_share_a_profile_and_rdl_has_an_mvt():
+    engine = LoadVelocityEngine()
+    engine.add_set("a", "Back Squat", 100, [0.6, 0.55], ts=T0)
+    engine.add_set("a", "squats", 120, [0.45, 0.40], ts=T0)
+    assert list(engine.profiles) == [("a", "squat")] and engine.profile("a", "SQUAT").points == 2
+    assert engine.profile("a", "Romanian Deadlift").mvt == DEFAULT_MVT["rdl"]
+    assert engine.profile("a", "Leg Extension").lift == "bench"  # unknown names take the default lift
+    assert LoadVelocityProfile("curl").mvt == FALLBACK_MVT
+
+
+def fitted_engine() -> LoadVelocityEngine:
+    engine = LoadVelocityEngine()
+    for i, load in enumerate(range(60, 150, 10)):
+        engine.add_set("a", "squat", load, [line(load)], ts=T0 + i * DAY)
+    return engine
+
+
+def test_plan_progresses_monotonically():
+    engine = fitted_engine()
+    base = engine.profile("a", "squat").e1rm()
+    for program in ("strength", "hypertrophy", "technique"):
+        weeks = engine.plan("a", "squat", 12, program, target_e1rm=base + 12)["plan"]
+        assert [w["week"] for w in weeks] == list(range(1, 13))
+        e1rms = [w["e1rm"] for w in weeks]
+        assert e1rms == sorted(e1rms) and e1rms[0] == round(base, 1) and e1rms[-1] <= base + 12
+        deloads = [w["week"] for w in weeks if w["deload"]]
+        assert deloads == [w for w in range(DELOAD_EVERY, 12, DELOAD_EVERY)]
+        work = [w for w in weeks if not w["deload"]]
+        assert all(a["loadKg"] <= b["loadKg"] for a, b in zip(work, work[1:])), program
+        assert all(a["intensity"] < b["intensity"] for a, b in zip(work, work[1:])), program
+        for w in weeks:
+            assert w["loadKg"] % PLATE_STEP_KG == 0
+            if w["deload"]:
+                prev = weeks[w["week"] - 2]
+                assert w["loadKg"] < prev["loadKg"] and w["sets"] == prev["sets"] - 1
+        # Heavier weeks are slower on the fitted line
+        speeds = [w["targetVelocity"] for w in work]
+        assert all(a >= b for a, b in zip(speeds, speeds[1:]))
+
+
+def test_plan_never_regresses_toward_a_lower_target():
+    engine = fitted_engine()
+    base = engine.profile("a", "squat").e1rm()
+    weeks = engine.plan("a", "squat", 6, target_e1rm=base - 20)["plan"]
+    assert {w["e1rm"] for w in weeks} == {round(base, 1)}
+
+
+def test_plan_without_a_profile_uses_the_given_e1rm():
+    engine = LoadVelocityEngine()
+    assert engine.plan("b", "bench", 4)["plan"] == []
+    weeks = engine.plan("b", "bench", 4, e1rm="100", target_e1rm=110)["plan"]  # JSON strings are coerced
+    assert weeks[0]["e1rm"] == 100 and weeks[0]["targetVelocity"] is None
+
+
+def test_plan_rejects_bad_e1rm():
+    engine = LoadVelocityEngine()
+    bad = [("e1rm", "heavy"), ("e1rm", -100), ("e1rm", 0), ("e1rm", float("nan")), ("e1rm", [100]),
+           ("target_e1rm", "more"), ("target_e1rm", -5), ("target_e1rm", float("inf"))]
+    for field, value in bad:
+        kwargs = {"e1rm": 100.0, field: value}
+        try:
+            engine.plan("b", "bench", 4, **kwargs)
+            assert False, f"{field}={value!r} was accepted"
+        except ValueError as e:
+            assert ("targetE1rm" if field == "target_e1rm" else "e1rm") in str(e)
+    try:
+        engine.plan("b", "bench", 4, "powerbuilding", e1rm=100)
+        assert False, "unknown program was accepted"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,137 @@
+"""
+Rep wire format: packed float32 plot attachments, summary vs full payloads
+round-tripped with dtype and shape checks, and the per-session `detail`
+opt-in on startSet that decides which one a live set sends.
+
+Run with `python -m pytest test_rep_wire.py` (or directly:
+`python test_rep_wire.py`) from backend/src.
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+
+import numpy as np
+import socketio
+
+from calculation_service import DETAIL_FULL, DETAIL_SUMMARY, CalculationService
+from live_gateway import LiveGateway
+from rep_wire import pack_arrays, plots_from_wire, rep_event_to_wire, unpack_arrays
+from test_streaming_segmenter import simulate_set
+
+service = CalculationService()
+
+
+def concentric_slice(n: int = 240, fs: float = 200.0):
+    t = np.arange(n) / fs
+    v = 0.6 * np.sin(np.pi * np.linspace(0, 1, n))
+    return t, v, np.gradient(v, t)
+
+
+def test_pack_arrays_round_trip():
+    shared = np.linspace(0, 1, 7)
+    arrays = {"a": np.arange(5, dtype=np.int64), "b": shared, "c": shared, "empty": np.empty(0)}
+    packed = pack_arrays(arrays)
+    assert packed["dtype"] == "float32" and isinstance(packed["buffer"], bytes)
+    assert len(packed["buffer"]) == 4 * (5 + 7)  # "c" is the same object as "b": stored once
+    assert packed["layout"]["b"] == packed["layout"]["c"]
+    out = unpack_arrays(packed)
+    for name, arr in arrays.items():
+        assert out[name].dtype == np.dtype("<f4") and out[name].shape == arr.shape, name
+        assert np.array_equal(out[name], arr.astype(np.float32)), name
+        assert not out[name].flags.writeable  # views into the received buffer
+    assert pack_arrays({}) == {"dtype": "float32", "layout": {}, "buffer": b""}
+
+
+def test_summary_payload_is_plain_json():
+    ev = service._compute_rep_from_slice(*concentric_slice(), "squat", DETAIL_SUMMARY)
+    payload = rep_event_to_wire(ev)
+    assert "plots" not in payload
+    assert "raw_plot" not in payload["extras"] and "norm_plot" not in payload["extras"]
+    assert json.loads(json.dumps(payload)) == payload
+    assert payload["metrics"]["speed"] == ev.metrics.speed
+    assert payload["extras"]["profile_accuracy"] == ev.extras["profile_accuracy"]
+    assert plots_from_wire(payload) == {}
+
+
+def test_full_payload_round_trip():
+    ev = service._compute_rep_from_slice(*concentric_slice(), "squat", DETAIL_FULL)
+    payload = rep_event_to_wire(ev)
+    plots = plots_from_wire(payload)
+    assert set(plots) == {"raw_plot", "norm_plot"}
+    n_arrays = 0
+    for section in ("raw_plot", "norm_plot"):
+        for name, want in ev.extras[section].items():
+            got = plots[section][name]
+            if isinstance(want, np.ndarray):
+                n_arrays += 1
+                assert got.dtype == np.dtype("<f4") and got.shape == want.shape, (section, name)
+                assert np.allclose(got, want, rtol=1e-6, atol=1e-6), (section, name)
+            else:
+                assert got == want, (section, name)
+    assert n_arrays > 0
+    # Everything but the attachment is JSON, and the rest of the extras match the summary payload
+    rest = {k: v for k, v in payload.items() if k != "plots"}
+    assert json.loads(json.dumps(rest)) == rest
+    summary = rep_event_to_wire(service._compute_rep_from_slice(*concentric_slice(), "squat", DETAIL_SUMMARY))
+    assert {k: v for k, v in payload["extras"].items() if k not in plots} == summary["extras"]
+
+
+async def live_set(detail=None) -> list:
+    """Stream a simulated set through a LiveGateway session; returns the "rep" payloads emitted."""
+    gateway = LiveGateway(socketio.AsyncServer(async_mode="aiohttp"), CalculationService())
+    emitted = []
+
+    async def emit(event, data=None, room=None, **kwargs):
+        if event == "rep":
+            emitted.append(data)
+
+    gateway.sio.emit = emit
+    handlers = gateway.sio.handlers["/"]
+    session, _ = gateway.sessions.attach("device:d1", "sid1", "workout:w")
+    gateway.connected_clients["sid1"] = {"chunks_received": 0, "errors": 0}
+    start = {"lift": "squat", "fs": 200}
+    if detail is not None:
+        start["detail"] = detail
+    await handlers["startSet"]("sid1", start)
+
+    x = simulate_set(reps=3)
+    for i in range(0, x["ax"].size, 40):
+        gateway._queue_segment(session, {k: v[i:i + 40] for k, v in x.items()})
+    while gateway._dsp_tasks:
+        await asyncio.gather(*list(gateway._dsp_tasks))
+    await gateway.cleanup()
+    return emitted, session
+
+
+def run_live_set(detail=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(live_set(detail))
+
+
+def test_live_reps_default_to_summary():
+    reps, session = run_live_set()
+    assert session.detail == DETAIL_SUMMARY and len(reps) == 3
+    assert all("plots" not in r and "profile_accuracy" in r["extras"] for r in reps)
+
+
+def test_session_can_opt_in_to_full_detail():
+    reps, session = run_live_set(DETAIL_FULL)
+    assert session.detail == DETAIL_FULL and len(reps) == 3
+    for r in reps:
+        plots = plots_from_wire(r)
+        assert plots["norm_plot"]["user_v"].dtype == np.dtype("<f4")
+        assert plots["norm_plot"]["user_v"].shape == plots["norm_plot"]["ref_v"].shape
+
+
+def test_unknown_detail_is_ignored():
+    reps, session = run_live_set("everything")
+    assert session.detail == DETAIL_SUMMARY and all("plots" not in r for r in reps)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,96 @@
+"""
+ROM baselines: the robust percentile estimator, SQLite write-behind and
+lift-name resolution.
+
+Run with `python -m pytest test_rom_baseline_store.py` (or directly:
+`python test_rom_baseline_store.py`) from backend/src.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from calculation_service import CalculationService
+from rom_baseline_store import RomBaselineStore, RomEstimator
+
+
+def test_outlier_is_clipped_and_ages_out():
+    est = RomEstimator(window=20, percentile=0.9, min_samples=5, outlier_ratio=1.5)
+    for _ in range(10):
+        est.update(0.50)
+    assert est.value == 0.50
+    # Clipped to 1.5× the baseline, and one rep can't move the 90th percentile
+    est.update(2.0)
+    assert est.value == 0.50 and max(est.samples()) == 0.75
+    for _ in range(20):
+        est.update(0.40)
+    assert est.value == 0.40 and len(est) == 20
+    assert max(est.samples()) == 0.40  # the outlier has left the window
+
+
+def test_percentile_before_min_samples():
+    est = RomEstimator(window=50, percentile=0.9, min_samples=5)
+    for d in (0.5, 0.5, 2.0):  # too few reps to clip against
+        est.update(d)
+    assert est.value == 2.0
+    est.load(np.array([0.3, 0.4, 0.5, 0.6, 0.7]))
+    assert est.value == 0.7 and len(est) == 5
+
+
+def test_flush_and_load_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rom.db")
+        store = RomBaselineStore(path=path, window=10)
+        rng = np.random.default_rng(3)
+        reps = {("athlete:a", "squat"): rng.uniform(0.4, 0.6, 15),
+                ("athlete:a", "bench"): rng.uniform(0.3, 0.4, 4),
+                ("athlete:b", "squat"): rng.uniform(0.5, 0.7, 8)}
+        for (athlete, lift), ds in reps.items():
+            for d in ds:
+                store.for_athlete(athlete).update(lift, d)
+        assert store.flush() == 3
+        assert store.flush() == 0  # nothing dirty
+
+        loaded = RomBaselineStore(path=path, window=10)
+        assert loaded.snapshot().keys() == store.snapshot().keys()
+        for (athlete, lift) in reps:
+            want = store.for_athlete(athlete).estimators[lift].samples()
+            got = loaded.for_athlete(athlete).estimators[lift].samples()
+            assert np.allclose(got, want.astype(np.float32)), (athlete, lift)
+            assert abs(loaded.get(athlete, lift) - store.get(athlete, lift)) < 1e-6
+
+
+def test_failed_flush_keeps_dirty_keys():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rom.db")
+        store = RomBaselineStore(path=path)
+        store.for_athlete("athlete:a").update("squat", 0.5)
+        store.path = os.path.join(tmp, "missing", "rom.db")  # can't be opened
+        try:
+            store.flush()
+            assert False, "expected the flush to fail"
+        except Exception:
+            pass
+        store.for_athlete("athlete:a").update("bench", 0.35)
+        store.path = path
+        assert store.flush() == 2  # the failed key is retried with the new one
+        assert RomBaselineStore(path=path).get("athlete:a", "squat") == 0.5
+
+
+def test_lift_spellings_share_one_baseline():
+    service = CalculationService()
+    store = RomBaselineStore()
+    baselines = store.for_athlete("athlete:a")
+    for name in ("Back Squat", "squats", "squat", "SQUAT"):
+        service._update_rom_baseline(name, 0.5, baselines)
+    assert list(baselines.estimators) == ["squat"]
+    assert len(baselines.estimators["squat"]) == 4
+    assert service._get_rom_baseline("Back Squats", baselines) == 0.5
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
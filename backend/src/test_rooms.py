@@ -0,0 +1,163 @@
+"""
+Workout-room fan-out under load: real Socket.IO clients against a
+LiveGateway served on a local port. Each workout is one device plus two
+frontends; a sensorData sample from the device must reach exactly its own
+two frontends, however many other workouts are connected. Telemetry pushes
+follow the same rule: a subscriber only sees sessions in its own room.
+
+Run with `python -m pytest test_rooms.py` from backend/src, or
+`python test_rooms.py` for the fan-out table.
+"""
+
+import asyncio
+import contextlib
+import io
+
+import socketio
+from aiohttp import web
+
+from calculation_service import CalculationService
+from live_gateway import LiveGateway
+
+ROLES = ("device", "front1", "front2")
+
+
+async def measure_fanout(workouts: int, rooms: bool = True, samples: int = 20) -> dict:
+    """
+    Connect `workouts` device/frontend triples (each in its own room, or all
+    without ?room= when `rooms` is False), send `samples` sensorData from every
+    device and count what each client receives.
+    """
+    sio = socketio.AsyncServer(async_mode="aiohttp")
+    app = web.Application()
+    sio.attach(app)
+    gateway = LiveGateway(sio, CalculationService())
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    received = {}  # (workout, role) -> list of workout ids seen
+    clients, devices = [], []
+    try:
+        for w in range(workouts):
+            query = f"?room=athlete{w}" if rooms else ""
+            for role in ROLES:
+                client = socketio.AsyncClient()
+                seen = received[(w, role)] = []
+                client.on("sensorData", lambda data, seen=seen: seen.append(data["workout"]))
+                await client.connect(f"http://127.0.0.1:{port}/{query}", transports=["websocket"])
+                clients.append(client)
+                if role == "device":
+                    devices.append((w, client))
+
+        sent = 0
+        for _ in range(samples):
+            for w, device in devices:
+                await device.emit("sensorData", {"workout": w, "phase": "concentric"})
+                sent += 1
+
+        # Wait for the relay to go quiet
+        total, idle = -1, 0
+        while idle < 3:
+            await asyncio.sleep(0.1)
+            now = sum(len(seen) for seen in received.values())
+            idle = idle + 1 if now == total else 0
+            total = now
+    finally:
+        for client in clients:
+            await client.disconnect()
+        await gateway.cleanup()
+        await runner.cleanup()
+
+    return {"sent": sent, "delivered": total, "perSample": total / sent, "received": received}
+
+
+async def measure_telemetry(workouts: int, samples: int = 10) -> dict:
+    """
+    One device and one telemetry-subscribed frontend per room; every device
+    streams accel samples. Returns the sessions each frontend was pushed.
+    """
+    sio = socketio.AsyncServer(async_mode="aiohttp")
+    app = web.Application()
+    sio.attach(app)
+    gateway = LiveGateway(sio, CalculationService())
+    gateway.telemetry_interval = 0.02
+    gateway.telemetry_task = asyncio.create_task(gateway.push_telemetry())
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    pushed = {}  # workout -> (session keys pushed, samples pushed)
+    clients, devices = [], []
+    try:
+        for w in range(workouts):
+            device, front = socketio.AsyncClient(), socketio.AsyncClient()
+            keys, counts = set(), []
+            pushed[w] = (keys, counts)
+            front.on("telemetry", lambda data, keys=keys, counts=counts: (
+                keys.add(data["session"]), counts.append(data["next"] - data["start"])))
+            await device.connect(f"http://127.0.0.1:{port}/?room=athlete{w}&device=dev{w}", transports=["websocket"])
+            await front.connect(f"http://127.0.0.1:{port}/?room=athlete{w}", transports=["websocket"])
+            await front.call("subscribeTelemetry", {})
+            clients += [device, front]
+            devices.append(device)
+
+        for i in range(samples):
+            for w, device in enumerate(devices):
+                await device.emit("sensorData", {"accel": {"x": 0.0, "y": 0.0, "z": w + 0.01 * i}})
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.2)
+    finally:
+        for client in clients:
+            await client.disconnect()
+        await gateway.cleanup()
+        await runner.cleanup()
+    return pushed
+
+
+def run_fanout(workouts: int, rooms: bool = True) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):  # gateway logs every connect/disconnect
+        return asyncio.run(measure_fanout(workouts, rooms))
+
+
+def test_fanout_per_sample_is_constant():
+    for workouts in (2, 16):
+        result = run_fanout(workouts)
+        assert result["perSample"] == 2.0, (workouts, result["perSample"])
+
+
+def test_rooms_are_isolated():
+    result = run_fanout(4)
+    for (w, role), seen in result["received"].items():
+        if role == "device":
+            assert seen == []  # the sender is skipped
+        else:
+            assert len(seen) == 20 and set(seen) == {w}
+
+
+def test_telemetry_is_isolated_per_room():
+    with contextlib.redirect_stdout(io.StringIO()):
+        pushed = asyncio.run(measure_telemetry(3))
+    for w, (keys, counts) in pushed.items():
+        assert keys == {f"device:dev{w}"}, (w, keys)
+        assert sum(counts) == 10, (w, counts)
+
+
+def test_default_room_is_shared():
+    # Without ?room= everyone is one workout: every other client gets each sample
+    result = run_fanout(3, rooms=False)
+    assert result["perSample"] == 3 * len(ROLES) - 1
+
+
+if __name__ == "__main__":
+    print("outbound sensorData per inbound sample")
+    for rooms in (False, True):
+        for workouts in (2, 8, 32):
+            result = run_fanout(workouts, rooms)
+            label = "per-workout rooms" if rooms else "default room     "
+            print(f"  {label}  {workouts:3d} workouts ({workouts * len(ROLES):3d} clients): "
+                  f"{result['perSample']:6.2f}")
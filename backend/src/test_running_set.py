@@ -0,0 +1,103 @@
+"""
+RunningSet: VL and RIR after every rep against a batch recomputation over
+all reps so far (set summary for VL, np.polyfit line for RIR).
+
+Run with `python -m pytest test_running_set.py` (or directly:
+`python test_running_set.py`) from backend/src.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+from calculation_service import CalculationService, RepEvent, RepMetrics
+from running_set import MAX_RIR, RunningSet
+
+service = CalculationService()
+
+
+def rep(speed: float, rom_hit: bool = True, tut: float = 1.2) -> RepEvent:
+    return RepEvent(id="r", valid=True, ts=0, metrics=RepMetrics(tut=tut, speed=speed, vl=0.0, rom_hit=rom_hit))
+
+
+def batch_rir(speeds: List[float], mvt: float) -> Optional[float]:
+    """Least-squares line through (rep number, speed) refit from scratch."""
+    if len(speeds) < 2:
+        return None
+    k = np.arange(1, len(speeds) + 1)
+    slope, intercept = np.polyfit(k, speeds, 1)
+    v_now = intercept + slope * len(speeds)
+    if v_now <= mvt:
+        return 0.0
+    if slope >= 0:
+        return MAX_RIR
+    return min(MAX_RIR, (v_now - mvt) / -slope)
+
+
+def batch_vl(speeds: List[float]) -> float:
+    """Set-summary VL over every rep so far: first rep vs the slowest."""
+    return (speeds[0] - min(speeds)) / speeds[0] * 100 if speeds[0] > 0 else 0.0
+
+
+def check_against_batch(speeds: List[float], mvt: float = 0.25):
+    running = RunningSet(mvt=mvt)
+    reps = []
+    for i, v in enumerate(speeds):
+        reps.append(rep(v, rom_hit=i % 3 != 2, tut=1.0 + 0.1 * i))
+        rep_vl = running.add(reps[-1])
+        so_far = speeds[:i + 1]
+        rep_loss = (speeds[0] - v) / speeds[0] * 100 if speeds[0] > 0 else 0.0  # negative when faster
+        assert abs(rep_vl - rep_loss) < 1e-9, i
+        assert abs(running.vl - batch_vl(so_far)) < 1e-9, i
+        want_rir, got_rir = batch_rir(so_far, mvt), running.rir()
+        if want_rir is None:
+            assert got_rir is None, i
+        else:
+            assert abs(got_rir - want_rir) < 1e-6, (i, got_rir, want_rir)
+        # The setUpdate payload agrees with the end-of-set summary (which rounds coarser)
+        update, summary = running.update(), service.calculate_set_summary(reps).summary
+        assert update["repsCompleted"] == summary.reps == i + 1
+        assert update["vl"] == round(batch_vl(so_far), 1) and abs(update["vl"] - summary.vl) <= 0.1
+        assert abs(update["avgSpeed"] - summary.avg_speed) <= 0.005 + 1e-9
+        assert update["romHitRate"] == summary.rom_hit_rate
+        assert abs(update["tut"] - summary.tut) < 1e-9
+        assert update["rir"] == (None if want_rir is None else round(want_rir, 1))
+
+
+def test_steady_slowdown():
+    check_against_batch([0.80 - 0.05 * i for i in range(10)])  # crosses the MVT: RIR reaches 0
+
+
+def test_noisy_sets():
+    rng = np.random.default_rng(0)
+    for n in (2, 5, 12):
+        for _ in range(20):
+            v0 = rng.uniform(0.4, 1.0)
+            speeds = v0 * (1 - rng.uniform(0, 0.08) * np.arange(n)) + rng.normal(0, 0.03, n)
+            check_against_batch(list(np.clip(speeds, 0.05, None)), mvt=rng.uniform(0.15, 0.35))
+
+
+def test_no_slowdown_and_fast_reps():
+    check_against_batch([0.5, 0.55, 0.6, 0.58])      # speeding up: capped at MAX_RIR
+    check_against_batch([0.9, 0.899, 0.898, 0.897])  # barely slowing: capped at MAX_RIR
+
+
+def test_rir_needs_two_reps():
+    running = RunningSet()
+    assert running.rir() is None and running.update()["rir"] is None
+    assert running.update()["avgSpeed"] == 0.0 and running.vl == 0.0
+    running.add(rep(0.7))
+    assert running.rir() is None and running.update()["rir"] is None
+    running.add(rep(0.6))
+    assert running.rir() is not None
+
+
+def test_zero_first_speed():
+    check_against_batch([0.0, 0.4, 0.3])
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
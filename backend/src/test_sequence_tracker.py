@@ -0,0 +1,110 @@
+"""
+SequenceTracker ordering rules: reorder, gaps, duplicates, u32 wraparound
+and device reboots.
+
+Run with `python -m pytest test_sequence_tracker.py` (or directly:
+`python test_sequence_tracker.py`) from backend/src.
+"""
+
+from sequence_tracker import SequenceTracker
+
+FRAME_US = 100_000  # 20 samples at 200 Hz
+
+
+def feed(tracker: SequenceTracker, seqs, ts0: int = 5_000_000, seq0: int = 0):
+    """Push frames (item = seq) with timestamps consistent with their seq; returns what came out."""
+    out = []
+    for seq in seqs:
+        out += tracker.push(seq, seq, ts0 + (seq - seq0) * FRAME_US)
+    return out
+
+
+def test_in_order_passes_straight_through():
+    tracker = SequenceTracker()
+    assert feed(tracker, range(10)) == [(0, s) for s in range(10)]
+    assert tracker.stats.delivered == 10 and tracker.stats.lost == 0
+
+
+def test_reorder_within_window():
+    tracker = SequenceTracker(reorder_window=4)
+    out = feed(tracker, [0, 2, 3, 1, 4])
+    assert out == [(0, 0), (0, 1), (0, 2), (0, 3), (0, 4)]
+    assert tracker.stats.reordered == 1 and tracker.stats.lost == 0
+
+
+def test_gap_is_given_up_after_window():
+    tracker = SequenceTracker(reorder_window=2)
+    out = feed(tracker, [0, 3, 4])
+    assert out == [(0, 0)]
+    out = feed(tracker, [5])  # three frames waiting > window: 1 and 2 are lost
+    assert out == [(2, 3), (0, 4), (0, 5)]
+    assert tracker.stats.lost == 2 and tracker.stats.gaps == 1
+    assert feed(tracker, [1]) == []  # too late: its slot is gone
+    assert tracker.stats.duplicates == 1
+
+
+def test_flush_releases_buffered_frames():
+    tracker = SequenceTracker(reorder_window=4)
+    feed(tracker, [0, 2, 3])
+    assert tracker.flush() == [(1, 2), (0, 3)]
+    assert tracker.summary()["buffered"] == 0
+
+
+def test_duplicates_are_dropped():
+    tracker = SequenceTracker()
+    feed(tracker, range(5))
+    assert feed(tracker, [2, 3, 4]) == []  # replay after a reconnect
+    feed(tracker, [6])
+    assert feed(tracker, [6]) == []         # retransmit of a buffered frame
+    assert tracker.stats.duplicates == 4
+    assert tracker.stats.restarts == 0
+    # Without timestamps a replay is judged by distance alone
+    plain = SequenceTracker()
+    for seq in range(5):
+        plain.push(seq, seq)
+    assert plain.push(1, 1) == [] and plain.stats.duplicates == 1
+
+
+def test_wraparound():
+    tracker = SequenceTracker()
+    top = (1 << 32) - 2
+    seqs = [top, top + 1, 0, 2, 1, 3]
+    out = []
+    for i, seq in enumerate(seqs):
+        out += tracker.push(seq, seq, i)
+    assert [item for _, item in out] == [top, top + 1, 0, 1, 2, 3]
+    assert tracker.stats.restarts == 0 and tracker.stats.duplicates == 0
+
+
+def test_reboot_near_zero_is_a_new_stream():
+    # Counter restarts at 0 well within restart_after of the old expected seq
+    tracker = SequenceTracker(restart_after=1024)
+    feed(tracker, range(300))
+    rebooted = 1_200_000  # device uptime restarted too
+    out = feed(tracker, [0, 1, 2], ts0=rebooted)
+    assert out == [(0, 0), (0, 1), (0, 2)]
+    assert tracker.stats.restarts == 1 and tracker.stats.duplicates == 0
+    assert feed(tracker, [1], ts0=rebooted) == []  # and replays of the new stream are still caught
+
+
+def test_reboot_when_tracking_began_mid_stream():
+    # Server came up while the device was at seq 500: the reboot's seqs were never seen
+    tracker = SequenceTracker(restart_after=1024)
+    feed(tracker, range(500, 600), ts0=60_000_000, seq0=500)
+    out = feed(tracker, [0, 1], ts0=1_000_000)
+    assert out == [(0, 0), (0, 1)] and tracker.stats.restarts == 1
+
+
+def test_reboot_far_behind_without_timestamps():
+    tracker = SequenceTracker(restart_after=16)
+    for seq in range(100):
+        tracker.push(seq, seq)
+    assert tracker.push(0, "new") == [(0, "new")]
+    assert tracker.stats.restarts == 1
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,108 @@
+"""
+SessionStore: resume by key and by prev_sid, TTL expiry, LRU eviction of
+detached sessions, sid map cleanup, and the per-session cap on remembered
+sockets.
+
+Run with `python -m pytest test_session_store.py` (or directly:
+`python test_session_store.py`) from backend/src.
+"""
+
+from session_store import SessionStore
+
+ROOM = "workout:w"
+
+
+def test_reconnect_with_the_same_key_resumes():
+    store = SessionStore()
+    session, resumed = store.attach("device:d1", "s1", ROOM)
+    assert not resumed and session.resumes == 0
+    session.lift = "squat"
+    store.detach("s1")
+    assert session.detached_at is not None and store.for_sid("s1") is session  # kept for prev_sid
+    again, resumed = store.attach("device:d1", "s2", ROOM)
+    assert again is session and resumed and session.resumes == 1 and again.lift == "squat"
+    assert session.sids == {"s2"} and session.detached_at is None
+    # A second socket joining a live session is not a resume
+    store.attach("device:d1", "s3", ROOM)
+    assert session.resumes == 1
+
+
+def test_prev_sid_finds_the_session():
+    store = SessionStore()
+    session, _ = store.attach("sid:s1", "s1", ROOM)
+    store.detach("s1")
+    key = store.key_for_sid("s1")  # what the gateway does for ?prev_sid=s1
+    assert key == "sid:s1"
+    resumed_session, resumed = store.attach(key, "s2", ROOM)
+    assert resumed and resumed_session is session and store.key_for_sid("s2") == "sid:s1"
+    assert store.key_for_sid("unknown") is None
+
+
+def test_ttl_expiry():
+    evicted = []
+    store = SessionStore(ttl_s=120, on_evict=evicted.append)
+    a, _ = store.attach("device:a", "sa", ROOM)
+    b, _ = store.attach("device:b", "sb", ROOM)
+    store.detach("sa")
+    assert store.sweep(a.detached_at + 119) == []  # still inside the grace window
+    assert store.sweep(a.detached_at + 121) == [a]
+    assert evicted == [a] and store.get("device:a") is None and len(store) == 1
+    assert store.key_for_sid("sa") is None  # its sids are forgotten with it
+    # A session with a live socket never expires
+    assert store.sweep(a.detached_at + 1e6) == [] and store.get("device:b") is b
+
+
+def test_lru_evicts_detached_sessions_only():
+    evicted = []
+    store = SessionStore(max_sessions=3, on_evict=evicted.append)
+    for name in ("a", "b", "c"):
+        store.attach(f"device:{name}", f"s{name}", ROOM)
+        store.detach(f"s{name}")
+    store.touch(store.get("device:a"))  # a is now the most recently used
+    store.attach("device:d", "sd", ROOM)
+    assert [s.key for s in evicted] == ["device:b"]
+    assert [s.key for s in store] == ["device:c", "device:a", "device:d"]
+    assert store.key_for_sid("sb") is None and store.key_for_sid("sc") == "device:c"
+
+    # Over capacity with every session live: nothing can go
+    live = SessionStore(max_sessions=2)
+    for name in ("a", "b", "c"):
+        live.attach(f"device:{name}", f"s{name}", ROOM)
+    assert len(live) == 3
+    live.detach("sa")
+    live.attach("device:e", "se", ROOM)  # the next attach evicts the detached one
+    assert [s.key for s in live] == ["device:b", "device:c", "device:e"]
+
+
+def test_remembered_sids_are_capped():
+    store = SessionStore(max_seen_sids=4)
+    session = None
+    for i in range(100):  # a phone that drops its socket all day
+        session, _ = store.attach("athlete:1", f"s{i}", ROOM)
+        store.detach(f"s{i}")
+    assert list(session.seen_sids) == ["s96", "s97", "s98", "s99"]
+    assert len(store._sid_keys) == 4
+    assert store.key_for_sid("s99") == "athlete:1" and store.key_for_sid("s0") is None
+    # Attached sockets are never forgotten, even past the cap
+    for i in range(6):
+        store.attach("athlete:1", f"live{i}", ROOM)
+    assert session.sids <= set(session.seen_sids) and len(session.sids) == 6
+    assert all(store.key_for_sid(f"live{i}") == "athlete:1" for i in range(6))
+
+
+def test_sid_taken_over_by_another_session():
+    store = SessionStore()
+    a, _ = store.attach("sid:s1", "s1", ROOM)
+    b, _ = store.attach("athlete:1", "s1", ROOM)  # same socket re-keyed
+    assert "s1" not in a.sids and "s1" not in a.seen_sids and a.detached_at is not None
+    assert store.for_sid("s1") is b
+    # Evicting the old session leaves the sid with its new owner
+    store.sweep(a.detached_at + store.ttl_s + 1)
+    assert store.get("sid:s1") is None and store.key_for_sid("s1") == "athlete:1"
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
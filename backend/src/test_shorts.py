@@ -0,0 +1,382 @@
+"""
+Shorts discovery against a fake YouTube Data API (httpx.MockTransport), no
+network or API key needed.
+
+Run with `python -m pytest test_shorts.py` (or `python test_shorts.py`) from
+backend/src.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from shorts_api import ShortsAPI, videos_list
+from shorts_cache import QueryCache, QuotaExceeded, QuotaTracker, SingleFlight
+from shorts_curation import ShortsCurationService
+from video_index import VIDEO_PARTS, VideoIndex, VideoMeta
+
+
+# ---------------- Fake YouTube ----------------
+
+class FakeYouTube:
+    """
+    search.list returns `per_query` ids derived from the query (and the
+    current `version`, so a refresh can be told apart from a cached answer);
+    videos.list reports every id as an embeddable 30 s video, except ids in
+    `long` (3 min) and `blocked` (not embeddable); ids in `gone` (deleted or
+    private) are left out of the response. `video_batches` records the ids
+    asked for in each videos.list call.
+    """
+
+    def __init__(self, per_query: int = 5, latency: float = 0.0):
+        self.per_query = per_query
+        self.latency = latency
+        self.version = 0
+        self.calls = {"search": 0, "videos": 0}
+        self.fail = False
+        self.long = set()
+        self.blocked = set()
+        self.gone = set()
+        self.video_batches = []
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        endpoint = request.url.path.rsplit("/", 1)[-1]
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail:
+            return httpx.Response(403, json={"error": {"message": "quotaExceeded"}})
+        params = request.url.params
+        if endpoint == "search":
+            q = params["q"].replace(" ", "_")
+            ids = [f"{q}-{self.version}-{i}" for i in range(self.per_query)]
+            return httpx.Response(200, json={"items": [{"id": {"videoId": v}} for v in ids]})
+        ids = params["id"].split(",")
+        self.video_batches.append(ids)
+        items = [{"id": v, "status": {"embeddable": v not in self.blocked},
+                  "contentDetails": {"duration": "PT3M" if v in self.long else "PT30S"},
+                  "snippet": {"channelId": "UCfake"}} for v in ids if v not in self.gone]
+        return httpx.Response(200, json={"items": items})
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_api(fake: FakeYouTube, clock: FakeClock = None, quota: QuotaTracker = None) -> ShortsAPI:
+    api = ShortsAPI(quota=quota, http=fake.client())
+    api.api_key = "test-key"
+    api.cache = QueryCache(ttl=60, stale_ttl=300, max_entries=8, clock=clock or FakeClock())
+    return api
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def index_fetch(fake: FakeYouTube):
+    """`VideoIndex.lookup` fetch callable: one real videos.list request to the fake."""
+    client = fake.client()
+    return lambda ids: videos_list(client, "test-key", ids, VIDEO_PARTS)
+
+
+# ---------------- Cache ----------------
+
+def test_repeat_query_is_served_from_cache():
+    async def go():
+        fake = FakeYouTube()
+        api = make_api(fake)
+        first = await api.fetch_from_youtube("gym tips", 5)
+        again = await api.fetch_from_youtube("  Gym   Tips ", 5)  # same normalized query
+        other = await api.fetch_from_youtube("squat", 5)
+        assert first.queue == again.queue and first.queue[0].startswith("gym_tips-0")
+        assert other.queue[0].startswith("squat-0")
+        assert fake.calls["search"] == 2
+        assert api.cache.hits == 1 and api.cache.misses == 2
+    run(go())
+
+
+def test_ttl_expiry_refetches():
+    async def go():
+        fake, clock = FakeYouTube(), FakeClock()
+        api = make_api(fake, clock)
+        await api.fetch_from_youtube("gym tips", 5)
+        fake.version = 1
+        clock.now += 60 + 300 + 1  # past fresh and stale windows
+        result = await api.fetch_from_youtube("gym tips", 5)
+        assert result.queue[0].startswith("gym_tips-1")
+        assert fake.calls["search"] == 2
+    run(go())
+
+
+def test_stale_while_revalidate():
+    async def go():
+        fake, clock = FakeYouTube(latency=0.01), FakeClock()
+        api = make_api(fake, clock)
+        await api.fetch_from_youtube("gym tips", 5)
+        fake.version = 1
+        clock.now += 61  # stale but inside the revalidate window
+        stale = await api.fetch_from_youtube("gym tips", 5)
+        assert stale.queue[0].startswith("gym_tips-0")  # answered at once from the cache
+        assert api.cache.stats()["refreshing"] == 1
+        await api.fetch_from_youtube("gym tips", 5)  # second stale read doesn't start another refresh
+        assert api.cache.stats()["refreshing"] == 1
+        await asyncio.sleep(0.1)
+        fresh = await api.fetch_from_youtube("gym tips", 5)
+        assert fresh.queue[0].startswith("gym_tips-1")
+        assert fake.calls["search"] == 2 and api.cache.refreshes == 1
+    run(go())
+
+
+def test_lru_eviction():
+    async def go():
+        fake = FakeYouTube()
+        api = make_api(fake)
+        for i in range(10):
+            await api.fetch_from_youtube(f"q{i}", 5)
+        assert len(api.cache) == 8 and api.cache.evictions == 2
+        assert api.cache.peek(("q0", 5)) is None and api.cache.peek(("q9", 5)) is not None
+    run(go())
+
+
+def test_only_embeddable_shorts_are_returned():
+    async def go():
+        fake = FakeYouTube()
+        fake.long, fake.blocked = {"gym_tips-0-1"}, {"gym_tips-0-3"}
+        api = make_api(fake)
+        result = await api.fetch_from_youtube("gym tips", 5)
+        assert result.queue == ["gym_tips-0-0", "gym_tips-0-2", "gym_tips-0-4"]
+    run(go())
+
+
+# ---------------- Video index ----------------
+
+def test_video_index_batches_only_unknown_ids():
+    async def go():
+        fake, index = FakeYouTube(), VideoIndex()
+        fetch = index_fetch(fake)
+        ids = [f"v{i}" for i in range(120)]
+        metas = await index.lookup(ids + ids[:10], fetch)  # repeats are asked for once
+        assert [len(b) for b in fake.video_batches] == [50, 50, 20]
+        assert sorted(sum(fake.video_batches, [])) == sorted(ids)
+        assert [m.id for m in metas] == ids and all(m.is_short and m.embeddable for m in metas)
+
+        fake.video_batches.clear()
+        metas = await index.lookup(ids[90:] + ["new0", "new1"], fetch)
+        assert fake.video_batches == [["new0", "new1"]]  # the 30 known ids never go upstream
+        assert [m.id for m in metas] == ids[90:] + ["new0", "new1"]
+        assert index.stats()["knownHits"] == 30 and index.batches == 4
+
+        fake.video_batches.clear()
+        assert len(await index.lookup(ids, fetch)) == 120
+        assert fake.video_batches == []
+    run(go())
+
+
+
+def test_video_without_status_is_not_embeddable():
+    details = {"contentDetails": {"duration": "PT30S"}}
+    assert not VideoMeta.from_item({"id": "v0", **details}, 0.0).embeddable
+    assert not VideoMeta.from_item({"id": "v1", "status": {}, **details}, 0.0).embeddable
+    meta = VideoMeta.from_item({"id": "v2", "status": {"embeddable": True}, **details}, 0.0)
+    assert meta.embeddable and meta.is_short
+
+def test_video_index_remembers_unavailable_ids():
+    async def go():
+        fake, index = FakeYouTube(), VideoIndex(max_age_days=30)
+        fetch = index_fetch(fake)
+        fake.gone = {"v1", "v3"}
+        metas = await index.lookup(["v0", "v1", "v2", "v3"], fetch)
+        gone = [m for m in metas if m.id in fake.gone]
+        assert len(metas) == 4 and all(m.duration == 0 and not m.embeddable and not m.is_short for m in gone)
+
+        fake.video_batches.clear()
+        await index.lookup(["v1", "v3", "v4"], fetch)
+        assert fake.video_batches == [["v4"]]  # not asked about again...
+        later = time.time() + 31 * 86400
+        assert index.unknown(["v0", "v1", "v3", "v4"], now=later) == ["v0", "v1", "v3", "v4"]  # ...until they age out
+    run(go())
+
+
+def test_video_index_flush_and_load_round_trip():
+    async def go():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "videos.db")
+            fake = FakeYouTube()
+            fake.long, fake.blocked, fake.gone = {"v1"}, {"v2"}, {"v3"}
+            index = VideoIndex(path=path)
+            ids = [f"v{i}" for i in range(60)]
+            await index.lookup(ids, index_fetch(fake))
+            assert index.flush() == 60
+            assert index.flush() == 0  # nothing dirty
+
+            loaded = VideoIndex(path=path)
+            assert len(loaded) == 60
+            assert all(loaded.get(v) == index.get(v) for v in ids)
+            assert not loaded.get("v1").is_short and not loaded.get("v2").embeddable
+            assert loaded.get("v3").duration == 0
+
+            # A restarted server answers from the loaded index without calling upstream
+            fresh = FakeYouTube()
+            metas = await loaded.lookup(ids, index_fetch(fresh))
+            assert fresh.calls["videos"] == 0 and [m.id for m in metas] == ids
+
+            # Refreshed entries are written again, others left alone
+            loaded.add_items([{"id": "v1", "contentDetails": {"duration": "PT45S"}}])
+            assert loaded.flush() == 1
+            assert VideoIndex(path=path).get("v1").is_short
+    run(go())
+
+
+def test_shorts_api_shares_the_index():
+    async def go():
+        fake, clock = FakeYouTube(), FakeClock()
+        api = make_api(fake, clock)
+        await api.fetch_from_youtube("gym tips", 5)
+        clock.now += 60 + 300 + 1  # query cache expired, same ids come back
+        await api.fetch_from_youtube("gym tips", 5)
+        assert fake.calls == {"search": 2, "videos": 1}
+        assert api.index.stats()["knownHits"] == 5
+    run(go())
+
+
+# ---------------- Single-flight ----------------
+
+def test_burst_of_500_makes_one_upstream_call():
+    async def go():
+        fake = FakeYouTube(latency=0.05)
+        api = make_api(fake)
+        results = await asyncio.gather(*(api.fetch_from_youtube("gym tips", 5) for _ in range(500)))
+        assert fake.calls == {"search": 1, "videos": 1}
+        assert len({tuple(r.queue) for r in results}) == 1
+        assert api.cache.stats()["coalesced"] == 499
+    run(go())
+
+
+def test_curation_cold_burst_joins_one_top_up():
+    async def go():
+        fake = FakeYouTube(per_query=50, latency=0.01)
+        fallback = [f"picked{i}" for i in range(8)]
+        curation = ShortsCurationService("test-key", http=fake.client(), pool_target=60, fallback=fallback)
+        queues = await asyncio.gather(*(curation.get_curated_queue(5) for _ in range(500)))
+        # Answered from the fallback list without waiting on YouTube...
+        assert all(q == fallback[:5] for q in queues)
+        # ...while one top-up fills the pool in the background
+        await curation._cold_fill
+        assert curation.refills == 1
+        assert fake.calls["search"] == 2  # two seeds reach the 60-id target
+        queue = await curation.get_curated_queue(5)
+        assert len(queue) == 5 and not set(queue) & set(fallback)
+    run(go())
+
+
+def test_curation_cold_start_after_a_failed_fill():
+    async def go():
+        fake = FakeYouTube()
+        fake.fail = True
+        curation = ShortsCurationService("test-key", http=fake.client(), min_refill_interval=60)
+        assert len(await curation.get_curated_queue(3)) == 3  # mock IDs without a fallback list
+        await curation._cold_fill
+        assert curation.refills == 1 and len(curation) == 0
+        calls = dict(fake.calls)
+        await curation.get_curated_queue(3)  # inside the refill interval: no new search
+        assert curation._cold_fill.done() and fake.calls == calls
+    run(go())
+
+
+def test_single_flight_cancel_and_errors():
+    async def go():
+        flight = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.02)
+            return 42
+
+        leader = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0.005)
+        leader.cancel()  # the shared call keeps running for the follower
+        assert await follower == 42
+        assert flight.stats() == {"calls": 1, "shared": 1, "inflight": 0}
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*(flight.do("e", boom) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results) and flight.calls == 2
+    run(go())
+
+
+# ---------------- Quota ----------------
+
+def test_quota_exhausted_falls_back():
+    async def go():
+        fake, clock = FakeYouTube(), FakeClock()
+        quota = QuotaTracker(daily_limit=101)  # one search + one videos call
+        api = make_api(fake, clock, quota)
+        cached = await api.fetch_from_youtube("gym tips", 5)
+        assert quota.used == 101
+
+        # New query, no quota left: refused locally, curated list instead
+        result = await api.fetch_from_youtube("squat", 5)
+        assert result.queue == api.curated_queue[:5]
+        assert fake.calls["search"] == 1 and quota.refused == 1
+
+        # Expired query, no quota left: the last known result beats the curated list
+        clock.now += 60 + 300 + 1
+        result = await api.fetch_from_youtube("gym tips", 5)
+        assert result.queue == cached.queue
+    run(go())
+
+
+def test_upstream_error_is_not_cached():
+    async def go():
+        fake = FakeYouTube()
+        api = make_api(fake)
+        fake.fail = True
+        result = await api.fetch_from_youtube("gym tips", 5)
+        assert result.queue == api.curated_queue[:5]
+        fake.fail = False
+        result = await api.fetch_from_youtube("gym tips", 5)
+        assert result.queue[0].startswith("gym_tips-0")
+    run(go())
+
+
+def test_quota_tracker_accounting():
+    now = [datetime(2026, 1, 5, 23, 0)]
+    quota = QuotaTracker(daily_limit=250, clock=lambda: now[0])
+    quota.spend("search.list")
+    quota.spend("videos.list")
+    quota.spend("search.list")
+    assert quota.used == 201 and quota.remaining == 49
+    assert quota.calls == {"search.list": 2, "videos.list": 1}
+    assert not quota.can_spend("search.list") and quota.can_spend("videos.list")
+    try:
+        quota.spend("search.list")
+        assert False, "expected QuotaExceeded"
+    except QuotaExceeded:
+        pass
+    assert quota.refused == 1 and quota.used == 201
+    assert quota.stats()["resetsInSec"] == 3600
+    now[0] += timedelta(hours=1)  # midnight: a new day's budget
+    assert quota.remaining == 250 and quota.calls == {}
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
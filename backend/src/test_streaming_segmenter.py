@@ -0,0 +1,129 @@
+"""
+StreamingSegmenter.push: a simulated set fed in chunks of any size gives
+the same reps as the batch segment_reps_from_stream, each emitted once, at
+a per-push cost that does not grow with the stream.
+
+Run with `python -m pytest test_streaming_segmenter.py` (or directly:
+`python test_streaming_segmenter.py`) from backend/src.
+"""
+
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from calculation_service import CalculationService, RepEvent
+from streaming_segmenter import StreamingSegmenter
+
+FS = 200.0
+service = CalculationService()
+
+
+def simulate_set(reps: int = 6, rest_s: float = 3.0, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Squat-like vertical acceleration (descent, pause, ascent, settle) on top of gravity."""
+    rng = np.random.default_rng(seed)
+    parts = [np.zeros(int(rest_s * FS))]
+    for k in range(reps):
+        n = int((2.0 + 0.1 * k) * FS)  # slower as the set goes on
+        ph = np.arange(n) / n
+        a = np.select([ph < 0.4, ph < 0.5, ph < 0.9],
+                      [-6 * np.sin(ph * np.pi / 0.4), 0.0, 8 * np.sin((ph - 0.5) * np.pi / 0.4)], 0.0)
+        parts += [a, np.zeros(int(0.8 * FS))]
+    az = np.concatenate(parts) + 9.81
+    n = az.size
+    return {"ax": rng.normal(0, 0.01, n), "ay": rng.normal(0, 0.01, n), "az": az + rng.normal(0, 0.01, n)}
+
+
+def stream(x: Dict[str, np.ndarray], sizes: Sequence[int],
+           drop: Tuple[int, int] = None) -> Tuple[List[RepEvent], List[RepEvent], StreamingSegmenter]:
+    """Push `x` in chunks cycling through `sizes`; `drop` = (start, n) samples lost in transit."""
+    seg = StreamingSegmenter(service, lift="squat", fs=FS)
+    pushed, i, k, missing = [], 0, 0, 0
+    while i < x["ax"].size:
+        if drop and i == drop[0]:
+            i, missing = i + drop[1], drop[1]
+            continue
+        end = min(i + sizes[k % len(sizes)], drop[0] if drop and i < drop[0] else x["ax"].size)
+        pushed += seg.push({axis: x[axis][i:end] for axis in ("ax", "ay", "az")}, missing)
+        i, k, missing = end, k + 1, 0
+    return pushed, seg.flush(), seg
+
+
+def signature(reps: List[RepEvent]) -> List[Tuple[float, float]]:
+    return [(round(r.metrics.tut, 6), round(r.metrics.speed, 6)) for r in reps]
+
+
+def test_chunk_size_does_not_change_reps():
+    x = simulate_set()
+    want, tail, _ = stream(x, [20])
+    assert len(want) == 6 and tail == []
+    for sizes in ([1], [7], [64], [7, 64, 333], [199, 3, 50]):
+        got, tail, _ = stream(x, sizes)
+        assert signature(got) == signature(want), sizes
+        assert tail == [], sizes
+
+
+def test_each_rep_is_emitted_once():
+    # Cut mid-ascent of the last rep: push() never returns it, flush() does, exactly once
+    x = {axis: v[:3400] for axis, v in simulate_set().items()}
+    reps, tail, seg = stream(x, [20])
+    assert len(tail) == 1
+    for sizes in ([1], [64], [7, 64, 333]):
+        got, got_tail, _ = stream(x, sizes)
+        assert signature(got) == signature(reps), sizes
+        assert signature(got_tail) == signature(tail), sizes
+    assert seg.flush() == []  # flush also resets: nothing left to emit
+    assert len(set(signature(reps + tail))) == len(reps + tail)
+
+
+
+def test_batch_segmenter_reports_the_same_reps():
+    # A recorded set through segment_reps_from_stream vs the same samples streamed live
+    for x in (simulate_set(), simulate_set(reps=2, rest_s=1.0, seed=3), simulate_set(reps=12, seed=1)):
+        batch = service.segment_reps_from_stream({**x, "fs": FS, "lift": "squat"})
+        for sizes in ([20], [7, 64, 333]):
+            live, tail, _ = stream(x, sizes)
+            assert len(batch) == len(live + tail) > 0, sizes
+            assert signature(batch) == signature(live + tail), sizes
+            for a, b in zip(batch, live + tail):
+                assert abs(a.metrics.displacement - b.metrics.displacement) < 1e-12
+
+def test_per_push_cost_is_flat():
+    x = simulate_set(reps=30)  # ~85 s, far past the 10 s ring
+    seg = StreamingSegmenter(service, lift="squat", fs=FS)
+    times = []
+    for i in range(0, x["ax"].size - 20, 20):
+        started = time.perf_counter()
+        seg.push({axis: x[axis][i:i + 20] for axis in ("ax", "ay", "az")})
+        times.append(time.perf_counter() - started)
+    assert len(seg.ring) == seg.ring.capacity
+    ring_full = seg.ring.capacity // 20
+    early = np.median(times[ring_full:ring_full + 200])
+    late = np.median(times[-200:])
+    assert late < 2.0 * early, (early, late)
+
+
+def test_short_gap_is_bridged():
+    x = simulate_set()
+    want, _, _ = stream(x, [20])
+    got, _, seg = stream(x, [20], drop=(2260, 20))  # 0.1 s lost between reps
+    assert seg.gaps_bridged == 1 and seg.gaps_reset == 0
+    assert len(got) == len(want)
+    assert signature(got[:3]) == signature(want[:3])  # reps finished before the gap are untouched
+
+
+def test_long_gap_resets():
+    x = simulate_set()
+    _, _, seg = stream(x, [20], drop=(2000, 200))  # 1 s lost: too long to bridge
+    assert seg.gaps_reset == 1 and seg.gaps_bridged == 0
+    # A reset starts over: same reps as streaming only what follows the gap
+    got, _, _ = stream(x, [20], drop=(2000, 200))
+    after, _, _ = stream({axis: v[2200:] for axis, v in x.items()}, [20])
+    assert signature(got[-len(after):]) == signature(after)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ {name}")
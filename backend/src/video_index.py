@@ -0,0 +1,183 @@
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+# Videos: list takes at most 50 ids per call (1 quota unit either way)
+VIDEOS_LIST_MAX_IDS = 50
+# Parts the index needs from Videos: list
+VIDEO_PARTS = "contentDetails,snippet,status"
+
+_DURATION = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?")
+
+
+def parse_duration(duration: str) -> int:
+    """
+    Parse ISO 8601 duration to seconds
+    Example: PT1M30S -> 90 seconds
+    """
+    match = _DURATION.match(duration or "")
+    if not match:
+        return 0
+    hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+@dataclass(frozen=True)
+class VideoMeta:
+    id: str
+    duration: int       # seconds (0 = unknown / unavailable)
+    embeddable: bool
+    channel: str
+    fetched_at: float
+
+    @property
+    def is_short(self) -> bool:
+        return 0 < self.duration <= 60
+
+    @classmethod
+    def from_item(cls, item: Dict[str, Any], fetched_at: float) -> "VideoMeta":
+        return cls(
+            id=item["id"],
+            duration=parse_duration(item.get("contentDetails", {}).get("duration", "")),
+            # No status part means we can't tell: don't offer it for embedding
+            embeddable=bool(item.get("status", {}).get("embeddable", False)),
+            channel=item.get("snippet", {}).get("channelId", ""),
+            fetched_at=fetched_at,
+        )
+
+
+class VideoIndex:
+    """
+    Video metadata (duration, embeddable, channel) keyed by video id, held in
+    memory and written behind to SQLite so the catalog survives restarts.
+
+    `lookup()` answers known ids from memory and sends only unknown (or older
+    than `max_age_days`) ids upstream, in batches of up to 50. Ids the API
+    doesn't return (deleted, private) are remembered as unavailable so they
+    aren't asked about again until they age out.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age_days: float = 30.0,
+                 flush_interval: float = 10.0):
+        self.path = path  # None = memory only
+        self.max_age = float(max_age_days) * 86400.0
+        self.flush_interval = float(flush_interval)
+        self._videos: Dict[str, VideoMeta] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+        self.lookups = self.known = self.fetched = self.batches = 0
+        self.writes = 0
+        if self.path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._videos)
+
+    def get(self, video_id: str) -> Optional[VideoMeta]:
+        return self._videos.get(video_id)
+
+    def unknown(self, video_ids: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """Ids (in order, de-duplicated) with no metadata or only expired metadata."""
+        now = time.time() if now is None else now
+        out, seen = [], set()
+        for vid in video_ids:
+            if vid in seen:
+                continue
+            seen.add(vid)
+            meta = self._videos.get(vid)
+            if meta is None or now - meta.fetched_at > self.max_age:
+                out.append(vid)
+        return out
+
+    async def lookup(self, video_ids: List[str],
+                     fetch: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]]) -> List[VideoMeta]:
+        """
+        Metadata for `video_ids` (in order, unavailable ones included); `fetch`
+        makes one Videos: list call with VIDEO_PARTS for up to 50 ids.
+        """
+        now = time.time()
+        missing = self.unknown(video_ids, now)
+        self.lookups += 1
+        self.known += len(set(video_ids)) - len(missing)
+        for i in range(0, len(missing), VIDEOS_LIST_MAX_IDS):
+            batch = missing[i:i + VIDEOS_LIST_MAX_IDS]
+            items = await fetch(batch)
+            self.batches += 1
+            self.add_items(items, now, requested=batch)
+        return [self._videos[vid] for vid in dict.fromkeys(video_ids) if vid in self._videos]
+
+    def add_items(self, items: List[Dict[str, Any]], fetched_at: Optional[float] = None,
+                  requested: Iterable[str] = ()) -> List[VideoMeta]:
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        metas = [VideoMeta.from_item(item, fetched_at) for item in items if "id" in item]
+        returned = {m.id for m in metas}
+        metas += [VideoMeta(vid, 0, False, "", fetched_at) for vid in requested if vid not in returned]
+        with self._lock:
+            for meta in metas:
+                self._videos[meta.id] = meta
+                self._dirty.add(meta.id)
+        self.fetched += len(metas)
+        return metas
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "videos": len(self._videos),
+            "lookups": self.lookups,
+            "knownHits": self.known,
+            "fetched": self.fetched,
+            "batches": self.batches,
+            "writes": self.writes,
+        }
+
+    # ---- Persistence ----
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS video_index ("
+            " id TEXT PRIMARY KEY, duration INTEGER NOT NULL, embeddable INTEGER NOT NULL,"
+            " channel TEXT NOT NULL, fetched_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        return conn
+
+    def _load(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, duration, embeddable, channel, fetched_at FROM video_index").fetchall()
+        for vid, duration, embeddable, channel, fetched_at in rows:
+            self._videos[vid] = VideoMeta(vid, duration, bool(embeddable), channel, fetched_at)
+        if rows:
+            print(f"🎬 Loaded {len(rows)} indexed videos from {self.path}")
+
+    def flush(self) -> int:
+        """Write new/refreshed entries to SQLite; returns how many rows were written."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = [(m.id, m.duration, int(m.embeddable), m.channel, m.fetched_at)
+                    for m in (self._videos[vid] for vid in dirty)]
+        if not rows or not self.path:
+            return 0
+        try:
+            with self._connect() as conn:
+                conn.executemany("INSERT OR REPLACE INTO video_index VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error:
+            with self._lock:
+                self._dirty |= dirty  # retry on the next flush
+            raise
+        self.writes += len(rows)
+        return len(rows)
+
+    async def run_writer(self):
+        """Background write-behind loop; flushes once more when cancelled."""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    print(f"❌ Error saving video index: {str(e)}")
+        except asyncio.CancelledError:
+            self.flush()
+            raise
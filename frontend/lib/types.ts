@@ -6,6 +6,7 @@ export interface RepMetrics {
   speed: number; // Average velocity
   vl: number; // Velocity loss percentage
   romHit: boolean; // ROM target achieved
+  displacement?: number; // Concentric travel in m
 }
 
 export interface RepEvent {
@@ -20,7 +21,10 @@ export interface SetUpdate {
   avgSpeed: number;
   vl: number; // Current VL percentage
   romHitRate: number; // Percentage of reps hitting ROM
-  rir: number; // Reps in reserve estimate
+  rir: number | null; // Reps in reserve estimate (null until 2 reps)
+  firstSpeed?: number;
+  bestSpeed?: number;
+  tut?: number;
   ts: number;
 }
 
@@ -30,7 +34,9 @@ export interface SetSummary {
   avgSpeed: number;
   vlPercentage: number;
   romHitRate: number;
-  romVariability: number; // Coefficient of variation
+  romVariability: number; // Coefficient of variation (%) of rep displacement
+  romSd?: number; // SD of rep displacement (cm)
+  romMad?: number; // Median absolute deviation of rep displacement (cm)
   tip: string; // One concise coaching tip
 }
 